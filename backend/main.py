@@ -9,6 +9,7 @@ from fastapi.exceptions import RequestValidationError
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
 import os
+import asyncio
 
 # Initialize Sentry FIRST (before other imports to catch all errors)
 from services.sentry import init_sentry
@@ -26,15 +27,27 @@ from routes.search import router as search_router
 from routes.analysis import router as analysis_router
 from routes.api_keys import router as api_keys_router
 from routes.users import router as users_router
+from services.anonymous_indexer import git_supports_sparse_clone
+from services.auth import get_auth_service
+from services.dependency_analyzer import close_analysis_pool
+from dependencies import indexer
 
 
 # Lifespan context manager for startup/shutdown
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    # Logs a warning if anonymous clones must fall back
+    await asyncio.to_thread(git_supports_sparse_clone)
+    # Build the Supabase auth client now: fails fast on missing credentials and
+    # keeps client setup off the first authenticated request
+    await asyncio.to_thread(get_auth_service)
     await load_demo_repos()
     yield
-    # Shutdown (cleanup if needed)
+    # Shutdown
+    indexer.close()
+    close_analysis_pool()
+    await indexer.openai_client.close()
 
 
 app = FastAPI(
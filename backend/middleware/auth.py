@@ -20,6 +20,7 @@ Usage:
         ...
 """
 from dataclasses import dataclass
+from functools import cached_property
 from typing import Optional
 import os
 import hashlib
@@ -51,6 +52,11 @@ class AuthContext:
         """Unique ID for rate limiting"""
         return self.user_id or self.api_key_name or "anonymous"
 
+    @cached_property
+    def user_id_hash(self) -> str:
+        """SHA-256 of identifier, computed once per request"""
+        return hashlib.sha256(self.identifier.encode()).hexdigest()
+
 
 # ---------------------------------------------------------------------------
 # Bearer token scheme (auto_error=False allows optional auth)
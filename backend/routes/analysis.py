@@ -1,6 +1,7 @@
 """Analysis routes - dependencies, impact, insights, style."""
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
+import asyncio
 
 from dependencies import (
     dependency_analyzer, style_analyzer,
@@ -35,8 +36,10 @@ async def get_dependency_graph(
         
         # Build fresh
         logger.info("Building fresh dependency graph", repo_id=repo_id)
-        graph_data = dependency_analyzer.build_dependency_graph(repo["local_path"])
-        dependency_analyzer.save_to_cache(repo_id, graph_data)
+        graph_data = await asyncio.to_thread(
+            dependency_analyzer.build_dependency_graph, repo["local_path"]
+        )
+        await asyncio.to_thread(dependency_analyzer.save_to_cache, repo_id, graph_data)
         
         return {**graph_data, "cached": False}
     except Exception as e:
@@ -64,8 +67,10 @@ async def analyze_impact(
         graph_data = dependency_analyzer.load_from_cache(repo_id)
         if not graph_data:
             logger.info("Building dependency graph for impact analysis", repo_id=repo_id)
-            graph_data = dependency_analyzer.build_dependency_graph(repo["local_path"])
-            dependency_analyzer.save_to_cache(repo_id, graph_data)
+            graph_data = await asyncio.to_thread(
+                dependency_analyzer.build_dependency_graph, repo["local_path"]
+            )
+            await asyncio.to_thread(dependency_analyzer.save_to_cache, repo_id, graph_data)
         
         impact = dependency_analyzer.get_file_impact(
             repo["local_path"],
@@ -91,8 +96,10 @@ async def get_repository_insights(
         graph_data = dependency_analyzer.load_from_cache(repo_id)
         if not graph_data:
             logger.info("Building dependency graph for insights", repo_id=repo_id)
-            graph_data = dependency_analyzer.build_dependency_graph(repo["local_path"])
-            dependency_analyzer.save_to_cache(repo_id, graph_data)
+            graph_data = await asyncio.to_thread(
+                dependency_analyzer.build_dependency_graph, repo["local_path"]
+            )
+            await asyncio.to_thread(dependency_analyzer.save_to_cache, repo_id, graph_data)
         
         return {
             "repo_id": repo_id,
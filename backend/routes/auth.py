@@ -2,7 +2,7 @@
 Authentication Routes
 Handles user signup, login, and session management
 """
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Request, status
 from pydantic import BaseModel, EmailStr
 from typing import Optional, Dict, Any
 from services.auth import get_auth_service
@@ -84,14 +84,14 @@ async def refresh(request: RefreshRequest):
 
 
 @router.post("/logout")
-async def logout(user: Dict = Depends(get_current_user)):
+async def logout(request: Request, user: Dict = Depends(get_current_user)):
     """
     Logout current user and invalidate session
     
     Requires: Valid JWT token in Authorization header
     """
     auth_service = get_auth_service()
-    return await auth_service.logout(token="")  # Supabase handles session
+    return await auth_service.logout(token=request.headers.get("Authorization", ""))
 
 
 @router.get("/me")
@@ -9,12 +9,16 @@ Rate limiting strategy (see #93):
 import os
 import re
 import httpx
+import orjson
+from datetime import datetime, timezone
+from time import monotonic
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Request, Response, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, field_validator
-import time
 
 from dependencies import indexer, cache, repo_manager, redis_client
+from services.cache import get_async_redis
 from services.input_validator import InputValidator
 from services.repo_validator import RepoValidator
 from services.observability import logger
@@ -26,9 +30,25 @@ from services.anonymous_indexer import (
 
 router = APIRouter(prefix="/playground", tags=["Playground"])
 
+# Job status SSE stream (GET /playground/index/{job_id}/events)
+JOB_TERMINAL_STATUSES = {"completed", "failed"}
+JOB_EVENTS_HEARTBEAT_SECONDS = 15
+# No stream outlives the job record it follows
+JOB_EVENTS_MAX_SECONDS = AnonymousIndexingJob.JOB_TTL_SECONDS
+
 # Demo repo mapping (populated on startup)
 DEMO_REPO_IDS = {}
 
+# Demo repos listed by GET /playground/repos: (id, name, description)
+DEMO_REPO_CATALOG = (
+    ("flask", "Flask", "Python web framework"),
+    ("fastapi", "FastAPI", "Modern Python API"),
+    ("express", "Express", "Node.js framework"),
+)
+
+# Prebuilt GET /playground/repos response (rebuilt by load_demo_repos)
+PLAYGROUND_REPOS_RESPONSE = {}
+
 # Session cookie config
 SESSION_COOKIE_NAME = "pg_session"
 SESSION_COOKIE_MAX_AGE = 86400  # 24 hours
@@ -111,6 +131,24 @@ async def load_demo_repos():
         logger.info("Loaded demo repos", repos=list(DEMO_REPO_IDS.keys()))
     except Exception as e:
         logger.warning("Could not load demo repos", error=str(e))
+    finally:
+        _build_repos_response()
+
+
+def _build_repos_response():
+    """Rebuild the static /playground/repos response from DEMO_REPO_IDS."""
+    PLAYGROUND_REPOS_RESPONSE["repos"] = [
+        {
+            "id": repo_id,
+            "name": name,
+            "description": description,
+            "available": repo_id in DEMO_REPO_IDS
+        }
+        for repo_id, name, description in DEMO_REPO_CATALOG
+    ]
+
+
+_build_repos_response()
 
 
 def _get_client_ip(req: Request) -> str:
@@ -413,78 +451,51 @@ async def playground_search(
     # Resolve repo_id: priority is repo_id > demo_repo > default "flask"
     repo_id = _resolve_repo_id(request, limiter, limit_result, req)
 
-    start_time = time.time()
+    start_time = monotonic()
 
-    try:
-        sanitized_query = InputValidator.sanitize_string(request.query, max_length=200)
-
-        # Check cache
-        cached_results = cache.get_search_results(sanitized_query, repo_id)
-        if cached_results:
-            return {
-                "results": cached_results,
-                "count": len(cached_results),
-                "cached": True,
-                "remaining_searches": limit_result.remaining,
-                "limit": limit_result.limit,
-            }
-
-        # Search
-        results = await indexer.semantic_search(
-            query=sanitized_query,
-            repo_id=repo_id,
-            max_results=min(request.max_results, 10),
-            use_query_expansion=True,
-            use_reranking=True
-        )
-
-        # Cache results
-        cache.set_search_results(sanitized_query, repo_id, results, ttl=3600)
-
-        search_time = int((time.time() - start_time) * 1000)
+    sanitized_query = InputValidator.sanitize_string(request.query, max_length=200)
 
+    # Check cache
+    cached_results = cache.get_search_results(sanitized_query, repo_id)
+    if cached_results:
         return {
-            "results": results,
-            "count": len(results),
-            "cached": False,
+            "results": cached_results,
+            "count": len(cached_results),
+            "cached": True,
             "remaining_searches": limit_result.remaining,
             "limit": limit_result.limit,
-            "search_time_ms": search_time,
         }
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error("Playground search failed", error=str(e))
-        raise HTTPException(status_code=500, detail=str(e))
 
+    # Search
+    results = await indexer.semantic_search(
+        query=sanitized_query,
+        repo_id=repo_id,
+        max_results=min(request.max_results, 10),
+        use_query_expansion=True,
+        use_reranking=True
+    )
+
+    # Cache results
+    cache.set_search_results(sanitized_query, repo_id, results, ttl=3600)
+
+    search_time = int((monotonic() - start_time) * 1000)
 
-@router.get("/repos")
-async def list_playground_repos():
-    """List available demo repositories."""
     return {
-        "repos": [
-            {
-                "id": "flask",
-                "name": "Flask",
-                "description": "Python web framework",
-                "available": "flask" in DEMO_REPO_IDS
-            },
-            {
-                "id": "fastapi",
-                "name": "FastAPI",
-                "description": "Modern Python API",
-                "available": "fastapi" in DEMO_REPO_IDS
-            },
-            {
-                "id": "express",
-                "name": "Express",
-                "description": "Node.js framework",
-                "available": "express" in DEMO_REPO_IDS
-            },
-        ]
+        "results": results,
+        "count": len(results),
+        "cached": False,
+        "remaining_searches": limit_result.remaining,
+        "limit": limit_result.limit,
+        "search_time_ms": search_time,
     }
 
 
+@router.get("/repos")
+async def list_playground_repos():
+    """List available demo repositories (prebuilt on startup)."""
+    return PLAYGROUND_REPOS_RESPONSE
+
+
 @router.get("/stats")
 async def get_playground_stats():
     """
@@ -630,7 +641,7 @@ async def validate_github_repo(request: ValidateRepoRequest, req: Request):
 
     Response varies based on validation result (see issue #124).
     """
-    start_time = time.time()
+    start_time = monotonic()
 
     # Check cache first
     cache_key = f"validate:{request.github_url}"
@@ -704,7 +715,7 @@ async def validate_github_repo(request: ValidateRepoRequest, req: Request):
         file_count = max(repo_size_kb // 3, 1)
 
     # Build response
-    response_time_ms = int((time.time() - start_time) * 1000)
+    response_time_ms = int((monotonic() - start_time) * 1000)
 
     if file_count > ANONYMOUS_FILE_LIMIT:
         result = {
@@ -777,7 +788,7 @@ async def start_anonymous_indexing(
 
     See issue #125 for full specification.
     """
-    start_time = time.time()
+    start_time = monotonic()
     limiter = _get_limiter()
 
     # --- Step 1: Session validation (get existing or create new) ---
@@ -798,8 +809,6 @@ async def start_anonymous_indexing(
 
     if session_data.indexed_repo:
         # Check if the existing repo has expired
-        from datetime import datetime, timezone
-
         expires_at_str = session_data.indexed_repo.get("expires_at", "")
         is_expired = False
 
@@ -929,7 +938,7 @@ async def start_anonymous_indexing(
 
     # --- Validation passed! Create job and start background indexing ---
 
-    response_time_ms = int((time.time() - start_time) * 1000)
+    response_time_ms = int((monotonic() - start_time) * 1000)
 
     # Initialize job manager
     job_manager = AnonymousIndexingJob(redis_client)
@@ -1008,7 +1017,8 @@ async def start_anonymous_indexing(
 Poll this endpoint to check the status of an anonymous indexing job.
 
 **Status values:**
-- `queued` - Job is waiting to start
+- `queued` - Job is waiting to start; `queue_position` counts waiting jobs
+  across all workers, so it can overstate the wait when several workers run
 - `cloning` - Repository is being cloned from GitHub
 - `processing` - Files are being parsed and indexed
 - `completed` - Indexing finished, `repo_id` available for search
@@ -1183,7 +1193,8 @@ async def get_indexing_status(
     """
     Check the status of an anonymous indexing job.
 
-    Poll this endpoint after starting an indexing job to track progress.
+    Poll this endpoint after starting an indexing job to track progress,
+    or subscribe to /playground/index/{job_id}/events instead of polling.
     Jobs expire after 1 hour.
 
     Status values:
@@ -1193,36 +1204,146 @@ async def get_indexing_status(
     - completed: Indexing finished successfully
     - failed: Indexing failed (check error field)
     """
-    # Validate job_id format
-    if not job_id or not job_id.startswith("idx_"):
-        raise HTTPException(
-            status_code=400,
-            detail={
-                "error": "invalid_job_id",
-                "message": "Invalid job ID format"
-            }
-        )
+    _validate_job_id(job_id)
 
     # Get job from Redis
     job_manager = AnonymousIndexingJob(redis_client)
     job = job_manager.get_job(job_id)
 
     if not job:
+        raise _job_not_found()
+
+    return _job_status_with_queue(job_manager, job_id, job)
+
+
+# =============================================================================
+# GET /playground/index/{job_id}/events - Stream job status (SSE)
+# =============================================================================
+
+@router.get("/index/{job_id}/events")
+async def stream_indexing_status(job_id: str, req: Request):
+    """
+    Stream status updates for an anonymous indexing job (Server-Sent Events).
+
+    Sends the current status immediately, then one event per update until
+    the job completes or fails. Each event's data is the same JSON body
+    GET /playground/index/{job_id} returns; keep polling that endpoint if
+    EventSource isn't available.
+    """
+    _validate_job_id(job_id)
+
+    # Subscribe before reading the snapshot so no update falls in between
+    pubsub = get_async_redis().pubsub()
+    await pubsub.subscribe(AnonymousIndexingJob.events_channel(job_id))
+
+    job_manager = AnonymousIndexingJob(redis_client)
+    job = job_manager.get_job(job_id)
+    if not job:
+        await pubsub.aclose()
+        raise _job_not_found()
+
+    return StreamingResponse(
+        _job_event_stream(job_id, job, job_manager, pubsub, req),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _validate_job_id(job_id: str) -> None:
+    if not job_id or not job_id.startswith("idx_"):
         raise HTTPException(
-            status_code=404,
+            status_code=400,
             detail={
-                "error": "job_not_found",
-                "message": "Job not found or has expired. Jobs expire after 1 hour."
+                "error": "invalid_job_id",
+                "message": "Invalid job ID format"
             }
         )
 
-    # Build response based on status
+
+def _job_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=404,
+        detail={
+            "error": "job_not_found",
+            "message": "Job not found or has expired. Jobs expire after 1 hour."
+        }
+    )
+
+
+async def _job_event_stream(
+    job_id: str,
+    job: dict,
+    job_manager: AnonymousIndexingJob,
+    pubsub,
+    req: Request
+):
+    """
+    Yield SSE frames, merging published field updates into the snapshot.
+
+    Ends when the job finishes, the client disconnects, the job record
+    expires (e.g. its worker died mid-job, so no update will ever come) or,
+    at the latest, after the job TTL.
+    """
+    deadline = monotonic() + JOB_EVENTS_MAX_SECONDS
+    try:
+        response = _job_status_with_queue(job_manager, job_id, job)
+        yield f"data: {orjson.dumps(response).decode()}\n\n"
+
+        while response["status"] not in JOB_TERMINAL_STATUSES and monotonic() < deadline:
+            if await req.is_disconnected():
+                break
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=JOB_EVENTS_HEARTBEAT_SECONDS
+            )
+            if message is None:
+                # Quiet stream: make sure the job still exists
+                current = job_manager.get_job(job_id)
+                if not current:
+                    yield f"data: {orjson.dumps(_job_not_found().detail).decode()}\n\n"
+                    break
+                if current.get("status") == "queued":
+                    # Queue position moves without a job update being published
+                    job = current
+                    response = _job_status_with_queue(job_manager, job_id, job)
+                    yield f"data: {orjson.dumps(response).decode()}\n\n"
+                else:
+                    # Keep proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                continue
+
+            job.update(orjson.loads(message["data"]))
+            response = _job_status_with_queue(job_manager, job_id, job)
+            yield f"data: {orjson.dumps(response).decode()}\n\n"
+    finally:
+        await pubsub.aclose()
+
+
+def _format_epoch_ms(value):
+    """Render an epoch-ms job timestamp as ISO 8601 (older records already are)."""
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc).isoformat()
+    return value
+
+
+def _job_status_with_queue(job_manager: AnonymousIndexingJob, job_id: str, job: dict) -> dict:
+    """Public status body, plus the queue position while the job waits for a slot."""
+    response = _job_status_response(job_id, job)
+    if response["status"] == "queued":
+        position = job_manager.queue_position(job_id)
+        if position is not None:
+            response["queue_position"] = position
+    return response
+
+
+def _job_status_response(job_id: str, job: dict) -> dict:
+    """Build the public status body for a job record."""
     status = job.get("status", "unknown")
     response = {
         "job_id": job_id,
         "status": status,
         "created_at": job.get("created_at"),
-        "updated_at": job.get("updated_at"),
+        "updated_at": _format_epoch_ms(job.get("updated_at")),
     }
 
     # Add repo info
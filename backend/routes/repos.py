@@ -2,12 +2,12 @@
 from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, Depends
 from pydantic import BaseModel
 from typing import Optional
-import hashlib
+import asyncio
 import time
 import git
 
 from dependencies import (
-    indexer, repo_manager, metrics,
+    indexer, repo_manager, metrics, cache,
     get_repo_or_404, user_limits, repo_validator
 )
 from services.input_validator import InputValidator
@@ -63,18 +63,19 @@ async def add_repository(
         )
     
     try:
-        # Clone repo first
-        user_id_hash = hashlib.sha256(user_id.encode()).hexdigest()
-        repo = repo_manager.add_repo(
+        # Clone repo first (blocking git/network I/O - run off the event loop)
+        repo = await asyncio.to_thread(
+            repo_manager.add_repo,
             name=request.name,
             git_url=request.git_url,
             branch=request.branch,
             user_id=user_id,
-            api_key_hash=user_id_hash
+            api_key_hash=auth.user_id_hash
         )
+        user_limits.invalidate_usage_cache(user_id)
         
         # Analyze repo size - #94
-        analysis = repo_validator.analyze_repo(repo["local_path"])
+        analysis = await asyncio.to_thread(repo_validator.analyze_repo, repo["local_path"])
         
         # Fail CLOSED if analysis failed (security: don't allow unknown-size repos)
         if not analysis.success:
@@ -148,7 +149,7 @@ async def index_repository(
         repo = get_repo_or_404(repo_id, user_id)
         
         # Re-check size limits before indexing (in case tier changed or repo updated)
-        analysis = repo_validator.analyze_repo(repo["local_path"])
+        analysis = await asyncio.to_thread(repo_validator.analyze_repo, repo["local_path"])
         
         # Fail CLOSED if analysis failed
         if not analysis.success:
@@ -203,6 +204,7 @@ async def index_repository(
         repo_manager.update_status(repo_id, "indexed")
         repo_manager.update_file_count(repo_id, total_functions)
         repo_manager.update_last_commit(repo_id, current_commit)
+        cache.invalidate_repo(repo_id)
         
         duration = time.time() - start_time
         metrics.record_indexing(repo_id, duration, total_functions)
@@ -218,10 +220,10 @@ async def index_repository(
     except HTTPException:
         raise
     except Exception as e:
+        # Mark the repo failed, then let the global handler report and return 500
         logger.error("Indexing failed", repo_id=repo_id, error=str(e))
-        capture_exception(e)
         repo_manager.update_status(repo_id, "error")
-        raise HTTPException(status_code=500, detail=str(e))
+        raise
 
 
 async def _authenticate_websocket(websocket: WebSocket) -> Optional[dict]:
@@ -259,7 +261,7 @@ async def websocket_index(websocket: WebSocket, repo_id: str):
         return
     
     # Check size limits before WebSocket indexing
-    analysis = repo_validator.analyze_repo(repo["local_path"])
+    analysis = await asyncio.to_thread(repo_validator.analyze_repo, repo["local_path"])
     
     # Fail CLOSED if analysis failed
     if not analysis.success:
@@ -301,6 +303,7 @@ async def websocket_index(websocket: WebSocket, repo_id: str):
         
         repo_manager.update_status(repo_id, "indexed")
         repo_manager.update_file_count(repo_id, total_functions)
+        cache.invalidate_repo(repo_id)
         
         try:
             await websocket.send_json({
@@ -1,16 +1,49 @@
 """User routes - profile and usage information."""
-from fastapi import APIRouter, Depends
+import asyncio
+import hashlib
+import json
+
+from fastapi import APIRouter, Depends, Request, Response
 
 from dependencies import user_limits
 from middleware.auth import require_auth, AuthContext
 from services.observability import logger
-from services.user_limits import TIER_LIMITS, UserTier
+from services.user_limits import TIER_LIMITS, UserTier, FREE_USAGE_DEFAULTS
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
+# Static response for API-key callers (no user_id); built once at import
+_FREE_CAN_ADD_REPO = {
+    "allowed": True,
+    "message": "OK",
+    "tier": "free",
+    "limit": TIER_LIMITS[UserTier.FREE].max_repos,
+}
+
+
+def _etag_response(request: Request, response: Response, payload: dict):
+    """
+    Attach an ETag to payload, or return 304 if the client already has it.
+
+    Usage/limits change rarely, so clients revalidate instead of re-downloading.
+    """
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+    etag = f'"{digest[:16]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return payload
+
 
 @router.get("/usage")
-def get_user_usage(auth: AuthContext = Depends(require_auth)):
+async def get_user_usage(
+    request: Request,
+    response: Response,
+    auth: AuthContext = Depends(require_auth)
+):
     """
     Get current user's usage and limits.
     
@@ -25,33 +58,16 @@ def get_user_usage(auth: AuthContext = Depends(require_auth)):
     if not user_id:
         logger.warning("Usage check without user_id", identifier=auth.identifier)
         # Return free tier defaults for API key users
-        free_limits = TIER_LIMITS[UserTier.FREE]
-        return {
-            "tier": "free",
-            "repositories": {
-                "current": 0,
-                "limit": free_limits.max_repos,
-                "display": f"0/{free_limits.max_repos}"
-            },
-            "limits": {
-                "max_files_per_repo": free_limits.max_files_per_repo,
-                "max_functions_per_repo": free_limits.max_functions_per_repo,
-                "playground_searches_per_day": free_limits.playground_searches_per_day,
-            },
-            "features": {
-                "priority_indexing": free_limits.priority_indexing,
-                "mcp_access": free_limits.mcp_access,
-            }
-        }
+        return _etag_response(request, response, FREE_USAGE_DEFAULTS)
     
-    usage = user_limits.get_usage_summary(user_id)
+    usage = await asyncio.to_thread(user_limits.get_usage_summary, user_id)
     logger.info("Usage retrieved", user_id=user_id, tier=usage.get("tier"))
     
-    return usage
+    return _etag_response(request, response, usage)
 
 
 @router.get("/limits/check-repo-add")
-def check_can_add_repo(auth: AuthContext = Depends(require_auth)):
+async def check_can_add_repo(auth: AuthContext = Depends(require_auth)):
     """
     Check if user can add another repository.
     
@@ -62,13 +78,7 @@ def check_can_add_repo(auth: AuthContext = Depends(require_auth)):
     
     if not user_id:
         # API key users - return allowed with free tier info
-        free_limits = TIER_LIMITS[UserTier.FREE]
-        return {
-            "allowed": True, 
-            "message": "OK",
-            "tier": "free",
-            "limit": free_limits.max_repos
-        }
+        return _FREE_CAN_ADD_REPO
     
-    result = user_limits.check_repo_count(user_id)
+    result = await asyncio.to_thread(user_limits.check_repo_count, user_id)
     return result.to_dict()
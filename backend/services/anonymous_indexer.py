@@ -4,10 +4,15 @@ Anonymous Indexing Service (#125)
 Handles job management and background indexing for anonymous users.
 Jobs are tracked in Redis with progress updates.
 """
+import os
+import re
 import uuid
-import json
+import orjson
+import time
 import shutil
 import asyncio
+import subprocess
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime, timezone, timedelta
 from typing import Optional
@@ -15,10 +20,99 @@ from dataclasses import dataclass, asdict
 from enum import Enum
 
 import git
+from redis.exceptions import ResponseError
 
 from services.observability import logger, metrics, capture_exception
 
 
+# Only these files are checked out for indexing (mirrors the indexer's languages)
+SPARSE_CHECKOUT_PATTERNS = ("*.py", "*.js", "*.jsx", "*.ts", "*.tsx")
+# `sparse-checkout set --no-cone` needs git 2.35+
+MIN_SPARSE_GIT_VERSION = (2, 35)
+
+
+@lru_cache(maxsize=1)
+def git_supports_sparse_clone() -> bool:
+    """Check once whether the local git can do a partial + sparse clone."""
+    try:
+        out = subprocess.run(
+            ["git", "--version"], capture_output=True, text=True, timeout=5
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        out = ""
+
+    match = re.search(r"(\d+)\.(\d+)", out)
+    supported = bool(match) and tuple(map(int, match.groups())) >= MIN_SPARSE_GIT_VERSION
+    if not supported:
+        logger.warning("git too old for sparse clone, using full shallow clone",
+                       git_version=out.strip() or "unknown")
+    return supported
+
+
+async def _run_git(*args: str, timeout: float) -> None:
+    """Run a git command, killing it if it outlives the timeout."""
+    proc = await asyncio.create_subprocess_exec(
+        "git", *args,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+        env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+    )
+    try:
+        _, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise
+
+    if proc.returncode != 0:
+        raise git.GitCommandError(["git", *args], proc.returncode, stderr.decode(errors="replace"))
+
+
+async def clone_for_indexing(git_url: str, path: Path, branch: str, timeout: float) -> None:
+    """
+    Shallow-clone only the files the indexer reads.
+
+    Uses a blobless partial clone with sparse checkout so images, lockfiles
+    and other non-code blobs are never downloaded.
+    """
+    deadline = time.monotonic() + timeout
+    base = ["clone", "--depth=1", "--single-branch", "--branch", branch]
+
+    if not git_supports_sparse_clone():
+        await _run_git(*base, "--", git_url, str(path), timeout=timeout)
+        return
+
+    await _run_git(*base, "--filter=blob:none", "--sparse", "--", git_url, str(path), timeout=timeout)
+    await _run_git(
+        "-C", str(path), "sparse-checkout", "set", "--no-cone", *SPARSE_CHECKOUT_PATTERNS,
+        timeout=max(deadline - time.monotonic(), 0)
+    )
+
+
+# RAM-backed scratch space is preferred when it has room for a few clones
+SHM_DIR = "/dev/shm"
+SHM_MIN_FREE_BYTES = 1 << 30  # 1 GiB
+
+
+def _resolve_temp_dir() -> str:
+    """
+    Pick where anonymous clones are written.
+
+    ANON_TEMP_DIR wins; otherwise use /dev/shm when it has enough free
+    space (so clone + index never touch disk), else /tmp.
+    """
+    configured = os.getenv("ANON_TEMP_DIR")
+    if configured:
+        return configured
+    try:
+        st = os.statvfs(SHM_DIR)
+        if st.f_bavail * st.f_frsize >= SHM_MIN_FREE_BYTES:
+            return os.path.join(SHM_DIR, "anon_repos")
+    except (OSError, AttributeError):
+        pass
+    return "/tmp/anon_repos"
+
+
 class JobStatus(str, Enum):
     """Job status values."""
     QUEUED = "queued"
@@ -51,23 +145,48 @@ class JobStats:
         return asdict(self)
 
 
+# Merge fields into an existing job hash, refresh its TTL and publish the
+# change, atomically. Returns 0 (and writes nothing) if the job is gone.
+# KEYS[1] = job key; ARGV = ttl, channel, event payload, field, value, ...
+_UPDATE_JOB_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 4))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('PUBLISH', ARGV[2], ARGV[3])
+return 1
+"""
+
+
+def _now_ms() -> int:
+    """Wall-clock epoch milliseconds for job "updated_at" (formatted by the API on read)."""
+    return time.time_ns() // 1_000_000
+
+
 class AnonymousIndexingJob:
     """
     Manages anonymous indexing jobs in Redis.
 
-    Redis key: anon_job:{job_id}
+    Redis key: anon_job:{job_id} (hash, one JSON-encoded value per field)
+    Updates are also published on anon_job_events:{job_id}
     TTL: 1 hour for job metadata
     """
 
     REDIS_PREFIX = "anon_job:"
+    EVENTS_PREFIX = "anon_job_events:"
+    QUEUE_KEY = "anon_job_queue"  # ZSET of jobs waiting for a slot
     JOB_TTL_SECONDS = 3600  # 1 hour for job metadata
     REPO_TTL_HOURS = 24  # 24 hours for indexed data
-    TEMP_DIR = "/tmp/anon_repos"
+    TEMP_DIR = _resolve_temp_dir()
     CLONE_TIMEOUT_SECONDS = 120  # 2 minutes for clone
     INDEX_TIMEOUT_SECONDS = 300  # 5 minutes for indexing
+    PROGRESS_INTERVAL_SECONDS = 0.25  # Min gap between progress writes
 
     def __init__(self, redis_client):
         self.redis = redis_client
+        # Sent as EVALSHA; redis-py loads it on first NOSCRIPT
+        self._update_script = redis_client.register_script(_UPDATE_JOB_LUA) if redis_client else None
         # Ensure temp directory exists
         Path(self.TEMP_DIR).mkdir(parents=True, exist_ok=True)
 
@@ -122,34 +241,70 @@ class AnonymousIndexingJob:
             "error": None,
             "error_message": None,
             "created_at": now.isoformat(),
-            "updated_at": now.isoformat(),
+            "updated_at": _now_ms(),
             "expires_at": expires_at.isoformat(),
         }
 
         if self.redis:
-            key = self._get_key(job_id)
-            self.redis.setex(key, self.JOB_TTL_SECONDS, json.dumps(job_data))
+            self._write_fields(job_id, job_data)
             logger.info("Created indexing job", job_id=job_id, session_id=session_id[:8])
 
         return job_data
 
+    @classmethod
+    def events_channel(cls, job_id: str) -> str:
+        """Pub/Sub channel that receives every field update for a job."""
+        return f"{cls.EVENTS_PREFIX}{job_id}"
+
+    def _write_fields(self, job_id: str, fields: dict) -> None:
+        """HSET the given fields (JSON-encoded) and set the TTL in one round trip."""
+        key = self._get_key(job_id)
+        pipe = self.redis.pipeline()
+        pipe.hset(key, mapping={k: orjson.dumps(v) for k, v in fields.items()})
+        pipe.expire(key, self.JOB_TTL_SECONDS)
+        pipe.execute()
+
+    def _update_fields(self, job_id: str, fields: dict) -> bool:
+        """
+        Merge fields into an existing job and publish them to subscribers.
+
+        One atomic server-side call; returns False if the job has expired.
+        """
+        args = [self.JOB_TTL_SECONDS, self.events_channel(job_id), orjson.dumps(fields)]
+        for name, value in fields.items():
+            args.extend((name, orjson.dumps(value)))
+        return bool(self._update_script(keys=[self._get_key(job_id)], args=args))
+
     def get_job(self, job_id: str) -> Optional[dict]:
         """Get job data from Redis."""
         if not self.redis:
             return None
 
         key = self._get_key(job_id)
-        data = self.redis.get(key)
+        try:
+            data = self.redis.hgetall(key)
+        except ResponseError as e:
+            # WRONGTYPE: a job stored as a JSON string before jobs were hashes
+            logger.warning("Unreadable job record in Redis", job_id=job_id, error=str(e))
+            return None
 
         if not data:
             return None
 
         try:
-            return json.loads(data)
-        except json.JSONDecodeError:
+            job = {
+                (k.decode() if isinstance(k, bytes) else k): orjson.loads(v)
+                for k, v in data.items()
+            }
+        except (orjson.JSONDecodeError, UnicodeDecodeError):
             logger.error("Invalid job data in Redis", job_id=job_id)
             return None
 
+        # Only a full job record counts, not some other hash under this key
+        if "job_id" not in job:
+            return None
+        return job
+
     def update_status(
         self,
         job_id: str,
@@ -164,27 +319,23 @@ class AnonymousIndexingJob:
         if not self.redis:
             return False
 
-        job = self.get_job(job_id)
-        if not job:
-            logger.warning("Job not found for update", job_id=job_id)
-            return False
-
-        job["status"] = status.value
-        job["updated_at"] = datetime.now(timezone.utc).isoformat()
-
+        fields = {
+            "status": status.value,
+            "updated_at": _now_ms(),
+        }
         if progress:
-            job["progress"] = progress.to_dict()
+            fields["progress"] = progress.to_dict()
         if stats:
-            job["stats"] = stats.to_dict()
+            fields["stats"] = stats.to_dict()
         if repo_id:
-            job["repo_id"] = repo_id
+            fields["repo_id"] = repo_id
         if error:
-            job["error"] = error
-            job["error_message"] = error_message
-
-        key = self._get_key(job_id)
-        self.redis.setex(key, self.JOB_TTL_SECONDS, json.dumps(job))
+            fields["error"] = error
+            fields["error_message"] = error_message
 
+        if not self._update_fields(job_id, fields):
+            logger.warning("Job not found for update", job_id=job_id)
+            return False
         return True
 
     def update_progress(
@@ -195,19 +346,58 @@ class AnonymousIndexingJob:
         files_total: int,
         current_file: Optional[str] = None
     ) -> bool:
-        """Update job progress (called during indexing)."""
+        """
+        Update job progress (called during indexing).
+
+        Writes only the changing fields, without reading the job back first.
+        """
+        if not self.redis:
+            return False
+
         progress = JobProgress(
             files_total=files_total,
             files_processed=files_processed,
             functions_found=functions_found,
             current_file=current_file
         )
-        return self.update_status(job_id, JobStatus.PROCESSING, progress=progress)
+        return self._update_fields(job_id, {
+            "status": JobStatus.PROCESSING.value,
+            "progress": progress.to_dict(),
+            "updated_at": _now_ms(),
+        })
 
     def get_temp_path(self, job_id: str) -> Path:
         """Get temp directory path for job."""
         return Path(self.TEMP_DIR) / job_id
 
+    def enqueue(self, job_id: str) -> None:
+        """Record a job waiting for a slot (scored by arrival time)."""
+        if not self.redis:
+            return
+        now = time.time()
+        pipe = self.redis.pipeline()
+        pipe.zadd(self.QUEUE_KEY, {job_id: now})
+        # Drop entries left behind by a worker that died mid-wait
+        pipe.zremrangebyscore(self.QUEUE_KEY, "-inf", now - self.JOB_TTL_SECONDS)
+        pipe.execute()
+
+    def dequeue(self, job_id: str) -> None:
+        """Remove a job from the wait queue."""
+        if self.redis:
+            self.redis.zrem(self.QUEUE_KEY, job_id)
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """
+        1-based position among waiting jobs, or None if not waiting.
+
+        The queue is shared by all workers but slots are per worker, so with
+        several workers this is an upper bound on the jobs ahead, not exact.
+        """
+        if not self.redis:
+            return None
+        rank = self.redis.zrank(self.QUEUE_KEY, job_id)
+        return rank + 1 if isinstance(rank, int) else None
+
     def cleanup_temp(self, job_id: str) -> None:
         """Clean up temp directory for job."""
         temp_path = self.get_temp_path(job_id)
@@ -219,6 +409,11 @@ class AnonymousIndexingJob:
                 logger.warning("Failed to cleanup temp", job_id=job_id, error=str(e))
 
 
+# Per-process cap on concurrent clone+index jobs (disk, bandwidth, embedding fan-out)
+MAX_CONCURRENT_JOBS = int(os.getenv("ANON_MAX_CONCURRENT_JOBS", "4"))
+_job_slots = asyncio.Semaphore(MAX_CONCURRENT_JOBS)
+
+
 async def run_indexing_job(
     job_manager: AnonymousIndexingJob,
     indexer,
@@ -235,13 +430,64 @@ async def run_indexing_job(
     """
     Background task to clone and index a repository.
 
-    This runs asynchronously after the endpoint returns.
-    Updates Redis with progress and final status.
+    Waits (status stays "queued", with a queue position) until one of the
+    MAX_CONCURRENT_JOBS slots is free, then runs the job.
 
     Args:
         max_files: If set, limit indexing to first N files (for partial indexing)
     """
-    import time
+    started = False
+    try:
+        job_manager.enqueue(job_id)
+        async with _job_slots:
+            job_manager.dequeue(job_id)
+            started = True
+            await _index_job(
+                job_manager, indexer, limiter, job_id, session_id,
+                github_url, owner, repo_name, branch, file_count, max_files
+            )
+    except Exception as e:
+        if started:
+            raise
+        # _index_job reports its own failures; this one happened while queueing
+        metrics.increment("anon_indexing_failed")
+        logger.error("Queueing indexing job failed", job_id=job_id, error=str(e))
+        capture_exception(e, operation="anonymous_indexing_queue", job_id=job_id)
+        try:
+            job_manager.update_status(
+                job_id,
+                JobStatus.FAILED,
+                error="indexing_failed",
+                error_message=str(e)
+            )
+        except Exception as update_error:
+            logger.warning("Failed to mark job failed", job_id=job_id, error=str(update_error))
+    finally:
+        # No-op normally; clears the entry if we were cancelled while waiting
+        try:
+            job_manager.dequeue(job_id)
+        except Exception as e:
+            logger.warning("Failed to remove job from queue", job_id=job_id, error=str(e))
+
+
+async def _index_job(
+    job_manager: AnonymousIndexingJob,
+    indexer,
+    limiter,
+    job_id: str,
+    session_id: str,
+    github_url: str,
+    owner: str,
+    repo_name: str,
+    branch: str,
+    file_count: int,
+    max_files: Optional[int] = None
+) -> None:
+    """
+    Clone and index a repository.
+
+    Updates Redis with progress and final status.
+    """
     start_time = time.time()
     temp_path = job_manager.get_temp_path(job_id)
     repo_id = job_manager.generate_repo_id(job_id)
@@ -253,20 +499,11 @@ async def run_indexing_job(
 
         git_url = f"https://github.com/{owner}/{repo_name}.git"
 
-        # Clone in thread pool (git operations are blocking)
-        loop = asyncio.get_event_loop()
         try:
-            await asyncio.wait_for(
-                loop.run_in_executor(
-                    None,
-                    lambda: git.Repo.clone_from(
-                        git_url,
-                        temp_path,
-                        branch=branch,
-                        depth=1,  # Shallow clone
-                        single_branch=True
-                    )
-                ),
+            await clone_for_indexing(
+                git_url,
+                temp_path,
+                branch,
                 timeout=job_manager.CLONE_TIMEOUT_SECONDS
             )
         except asyncio.TimeoutError:
@@ -279,8 +516,16 @@ async def run_indexing_job(
         # --- Step 2: Index repository ---
         job_manager.update_status(job_id, JobStatus.PROCESSING)
 
-        # Progress callback for real-time updates
+        # Progress callback for real-time updates, coalesced so large repos
+        # don't write to Redis on every file
+        last_progress_at = 0.0
+
         async def progress_callback(files_processed: int, functions_found: int, total: int):
+            nonlocal last_progress_at
+            now = time.monotonic()
+            if files_processed < total and now - last_progress_at < job_manager.PROGRESS_INTERVAL_SECONDS:
+                return
+            last_progress_at = now
             job_manager.update_progress(
                 job_id,
                 files_processed=files_processed,
@@ -363,5 +608,5 @@ async def run_indexing_job(
         capture_exception(e, operation="anonymous_indexing", job_id=job_id)
 
     finally:
-        # --- Always cleanup ---
-        job_manager.cleanup_temp(job_id)
+        # --- Always cleanup (rmtree is blocking, keep it off the loop) ---
+        await asyncio.to_thread(job_manager.cleanup_temp, job_id)
@@ -3,12 +3,22 @@ Supabase Authentication Service
 Handles JWT verification and user management
 """
 from fastapi import HTTPException, status
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
+from collections import OrderedDict
+from functools import lru_cache
 import os
+import time
+import hashlib
 import jwt
 from datetime import datetime
 from supabase import create_client, Client
 
+from services.observability import logger
+
+# In-process cache of verified tokens (keyed by token hash)
+JWT_CACHE_MAX_ENTRIES = 10_000
+JWT_CACHE_TTL_SECONDS = 300
+
 
 class SupabaseAuthService:
     """Supabase authentication and user management"""
@@ -20,13 +30,112 @@ class SupabaseAuthService:
         
         if not all([self.supabase_url, self.supabase_key]):
             raise ValueError("Supabase credentials not configured")
+        if not self.jwt_secret:
+            logger.warning("SUPABASE_JWT_SECRET not set; every token cache miss will call the Supabase API")
         
         self.client: Client = create_client(self.supabase_url, self.supabase_key)
+        
+        # token hash -> (cache expiry epoch, user dict)
+        self._jwt_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # token hash -> token exp, for tokens revoked via logout
+        self._revoked: Dict[str, float] = {}
+    
+    @staticmethod
+    def _strip_bearer(token: str) -> str:
+        """Remove "Bearer " prefix if present"""
+        return token[7:] if token.startswith("Bearer ") else token
+    
+    @staticmethod
+    def _token_key(token: str) -> str:
+        return hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+    
+    @staticmethod
+    def _unverified_exp(token: str) -> Optional[float]:
+        """The token's exp claim without checking its signature (None if absent or not a JWT)"""
+        try:
+            return jwt.decode(token, options={"verify_signature": False}).get("exp")
+        except jwt.InvalidTokenError:
+            return None
+    
+    def _decode_locally(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Verify an HS256 Supabase token with the project JWT secret.
+        
+        Returns None when local verification isn't possible (no secret
+        configured, different signing algorithm) so the caller can fall
+        back to the Supabase API. Expired tokens raise.
+        """
+        if not self.jwt_secret:
+            return None
+        try:
+            claims = jwt.decode(
+                token,
+                self.jwt_secret,
+                algorithms=["HS256"],
+                audience="authenticated",
+            )
+        except jwt.ExpiredSignatureError:
+            raise
+        except jwt.InvalidTokenError:
+            return None
+        
+        return {
+            "user_id": claims["sub"],
+            "email": claims.get("email"),
+            "created_at": None,  # Not part of the access token claims
+            "metadata": claims.get("user_metadata") or {},
+            "exp": claims.get("exp"),
+        }
+    
+    def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._jwt_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at <= time.time():
+            self._jwt_cache.pop(key, None)
+            return None
+        self._jwt_cache.move_to_end(key)
+        return user
+    
+    def _cache_put(self, key: str, user: Dict[str, Any], exp: Optional[float]) -> None:
+        expires_at = time.time() + JWT_CACHE_TTL_SECONDS
+        if exp:
+            expires_at = min(expires_at, exp)
+        self._jwt_cache[key] = (expires_at, user)
+        self._jwt_cache.move_to_end(key)
+        while len(self._jwt_cache) > JWT_CACHE_MAX_ENTRIES:
+            self._jwt_cache.popitem(last=False)
+    
+    def revoke_token(self, token: str) -> None:
+        """
+        Stop accepting a token in this process until it expires.
+        
+        Needed because locally-verified tokens never hit Supabase again.
+        """
+        token = self._strip_bearer(token)
+        if not token:
+            return
+        key = self._token_key(token)
+        self._jwt_cache.pop(key, None)
+        
+        now = time.time()
+        exp = self._unverified_exp(token)
+        self._revoked[key] = exp or now + JWT_CACHE_TTL_SECONDS
+        
+        # Expired tokens are rejected anyway, no need to remember them
+        for k in [k for k, t in self._revoked.items() if t <= now]:
+            del self._revoked[k]
     
     def verify_jwt(self, token: str) -> Dict[str, Any]:
         """
         Verify Supabase JWT token and return user data
         
+        Tokens are verified locally with the JWT secret when possible and
+        the result is cached in-process (bounded, at most 5 minutes and
+        never past the token's exp). The Supabase API is only called on a
+        cache miss that can't be verified locally.
+        
         Args:
             token: JWT token from Authorization header (format: "Bearer <token>")
             
@@ -37,9 +146,24 @@ class SupabaseAuthService:
             HTTPException: If token is invalid or expired
         """
         try:
-            # Remove "Bearer " prefix if present
-            if token.startswith("Bearer "):
-                token = token[7:]
+            token = self._strip_bearer(token)
+            key = self._token_key(token)
+            
+            if key in self._revoked:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Token has been revoked"
+                )
+            
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+            
+            local = self._decode_locally(token)
+            if local is not None:
+                exp = local.pop("exp")
+                self._cache_put(key, local, exp)
+                return local
             
             # Use Supabase client to verify token and get user
             response = self.client.auth.get_user(token)
@@ -50,13 +174,18 @@ class SupabaseAuthService:
                     detail="Invalid or expired token"
                 )
             
-            return {
+            user = {
                 "user_id": response.user.id,
                 "email": response.user.email,
                 "created_at": response.user.created_at,
                 "metadata": response.user.user_metadata
             }
+            # Supabase accepted the token, so its exp can be trusted to bound the cache
+            self._cache_put(key, user, self._unverified_exp(token))
+            return user
             
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -179,6 +308,7 @@ class SupabaseAuthService:
     
     async def logout(self, token: str) -> Dict[str, str]:
         """Sign out user and invalidate session"""
+        self.revoke_token(token)
         try:
             await self.client.auth.sign_out()
             return {"message": "Logged out successfully"}
@@ -189,13 +319,7 @@ class SupabaseAuthService:
             )
 
 
-# Global instance
-_auth_service: Optional[SupabaseAuthService] = None
-
-
+@lru_cache(maxsize=None)
 def get_auth_service() -> SupabaseAuthService:
-    """Get or create auth service singleton"""
-    global _auth_service
-    if _auth_service is None:
-        _auth_service = SupabaseAuthService()
-    return _auth_service
+    """Get or create auth service singleton (built once at startup, see main.lifespan)"""
+    return SupabaseAuthService()
@@ -3,8 +3,12 @@ Cache Service
 Redis-based caching for search results and embeddings
 """
 import redis
-import json
+import redis.asyncio
+import socket
+import orjson
+import zlib
 import hashlib
+from array import array
 from typing import Optional, List, Dict
 import os
 from dotenv import load_dotenv
@@ -17,32 +21,90 @@ load_dotenv()
 REDIS_URL = os.getenv("REDIS_URL")  # Railway/Cloud Redis URL
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "64"))
+
+
+def _keepalive_options() -> Dict[int, int]:
+    """TCP keepalive tuning, limited to the options this platform exposes"""
+    wanted = {"TCP_KEEPIDLE": 60, "TCP_KEEPINTVL": 10, "TCP_KEEPCNT": 3}
+    return {
+        getattr(socket, name): value
+        for name, value in wanted.items()
+        if hasattr(socket, name)
+    }
+
+
+# JSON payloads at least this big are zlib-compressed before SETEX
+COMPRESS_MIN_BYTES = 512
+
+
+def _encode(value) -> bytes:
+    """Serialize to JSON, compressing large payloads (code snippets compress ~3x)"""
+    payload = orjson.dumps(value)
+    if len(payload) >= COMPRESS_MIN_BYTES:
+        return zlib.compress(payload, 1)
+    return payload
+
+
+def _decode(raw: bytes):
+    # A zlib stream starts with 0x78 ('x'); a JSON document never does
+    if raw[:1] == b"x":
+        raw = zlib.decompress(raw)
+    return orjson.loads(raw)
+
+
+_async_redis: Optional["redis.asyncio.Redis"] = None
+
+
+def get_async_redis() -> "redis.asyncio.Redis":
+    """
+    Shared asyncio Redis client for long-lived subscriptions (SSE job events).
+
+    Created lazily on first use, pointing at the same server as CacheService.
+    """
+    global _async_redis
+    if _async_redis is None:
+        options = dict(
+            socket_connect_timeout=5,
+            socket_keepalive=True,
+            health_check_interval=30,
+        )
+        if REDIS_URL:
+            _async_redis = redis.asyncio.from_url(REDIS_URL, **options)
+        else:
+            _async_redis = redis.asyncio.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0, **options)
+    return _async_redis
 
 
 class CacheService:
     """Redis cache for search results and embeddings"""
     
     def __init__(self):
+        # Bounded pool shared by everything using cache.redis (limiter, jobs);
+        # callers wait for a free connection instead of opening more
+        pool_kwargs = dict(
+            max_connections=REDIS_MAX_CONNECTIONS,
+            timeout=5,
+            socket_connect_timeout=5,
+            socket_timeout=5,
+            socket_keepalive=True,
+            socket_keepalive_options=_keepalive_options(),
+            health_check_interval=30,
+        )
         try:
             # Use REDIS_URL if available (Railway/Cloud), otherwise use host/port
             if REDIS_URL:
-                self.redis = redis.from_url(
-                    REDIS_URL,
-                    decode_responses=False,
-                    socket_connect_timeout=5,
-                    socket_timeout=5
-                )
+                pool = redis.BlockingConnectionPool.from_url(REDIS_URL, **pool_kwargs)
                 logger.info("Redis connected via URL")
             else:
-                self.redis = redis.Redis(
+                pool = redis.BlockingConnectionPool(
                     host=REDIS_HOST,
                     port=REDIS_PORT,
                     db=0,
-                    decode_responses=False,
-                    socket_connect_timeout=5,
-                    socket_timeout=5
+                    **pool_kwargs
                 )
                 logger.info("Redis connected", host=REDIS_HOST, port=REDIS_PORT)
+            self.redis = redis.Redis(connection_pool=pool)
             
             # Test connection
             self.redis.ping()
@@ -51,10 +113,12 @@ class CacheService:
             self.redis = None
     
     def _make_key(self, prefix: str, *args) -> str:
-        """Generate cache key"""
-        parts = [str(arg) for arg in args]
-        hash_input = ":".join(parts)
-        hash_val = hashlib.md5(hash_input.encode()).hexdigest()[:12]
+        """Generate cache key (6-byte BLAKE2b digest, 12 hex chars)"""
+        if len(args) == 1 and isinstance(args[0], bytes):
+            hash_input = args[0]
+        else:
+            hash_input = ":".join(map(str, args)).encode()
+        hash_val = hashlib.blake2b(hash_input, digest_size=6).hexdigest()
         return f"{prefix}:{hash_val}"
 
     def get(self, key: str) -> Optional[Dict]:
@@ -70,7 +134,7 @@ class CacheService:
             cached = self.redis.get(key)
             if cached:
                 metrics.increment("cache_hits")
-                return json.loads(cached)
+                return _decode(cached)
             metrics.increment("cache_misses")
         except Exception as e:
             logger.error("Cache read error", operation="get", key=key[:50], error=str(e))
@@ -91,7 +155,7 @@ class CacheService:
             return False
         
         try:
-            self.redis.setex(key, ttl, json.dumps(value))
+            self.redis.setex(key, ttl, _encode(value))
             return True
         except Exception as e:
             logger.error("Cache write error", operation="set", key=key[:50], error=str(e))
@@ -104,11 +168,11 @@ class CacheService:
             return None
         
         try:
-            key = self._make_key("search", repo_id, query)
+            key = self._search_key(repo_id, query)
             cached = self.redis.get(key)
             if cached:
                 metrics.increment("cache_hits")
-                return json.loads(cached)
+                return _decode(cached)
             metrics.increment("cache_misses")
         except Exception as e:
             logger.error("Cache read error", operation="get_search_results", error=str(e))
@@ -123,27 +187,43 @@ class CacheService:
         results: List[Dict],
         ttl: int = 3600
     ):
-        """Cache search results"""
+        """Cache search results and track the key under the repo for invalidation"""
         if not self.redis:
             return
         
         try:
-            key = self._make_key("search", repo_id, query)
-            self.redis.setex(key, ttl, json.dumps(results))
+            key = self._search_key(repo_id, query)
+            index_key = self._repo_index_key(repo_id)
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.setex(key, ttl, _encode(results))
+            pipe.sadd(index_key, key)
+            # Outlive the entries it tracks; stale members are harmless on DEL
+            pipe.expire(index_key, ttl * 2)
+            pipe.execute()
         except Exception as e:
             logger.error("Cache write error", operation="set_search_results", error=str(e))
             metrics.increment("cache_errors")
     
+    # Per-repo keys carry a {repo_id} hash tag so that, under Redis Cluster,
+    # a repo's results and its index SET share one slot (multi-key DEL works)
+    def _search_key(self, repo_id: str, query: str) -> str:
+        return self._make_key(f"search:{{{repo_id}}}", query)
+    
+    @staticmethod
+    def _repo_index_key(repo_id: str) -> str:
+        """SET of search cache keys written for a repository"""
+        return f"repo_keys:{{{repo_id}}}"
+    
     def get_embedding(self, text: str) -> Optional[List[float]]:
         """Get cached embedding"""
         if not self.redis:
             return None
         
         try:
-            key = self._make_key("emb", text[:100])
+            key = self._make_key("emb32", text.encode())
             cached = self.redis.get(key)
             if cached:
-                return json.loads(cached)
+                return array("f", cached).tolist()
         except Exception as e:
             logger.error("Cache read error", operation="get_embedding", error=str(e))
             metrics.increment("cache_errors")
@@ -151,13 +231,13 @@ class CacheService:
         return None
     
     def set_embedding(self, text: str, embedding: List[float], ttl: int = 86400):
-        """Cache embedding"""
+        """Cache embedding as packed float32 (4 bytes per dimension)"""
         if not self.redis:
             return
         
         try:
-            key = self._make_key("emb", text[:100])
-            self.redis.setex(key, ttl, json.dumps(embedding))
+            key = self._make_key("emb32", text.encode())
+            self.redis.setex(key, ttl, array("f", embedding).tobytes())
         except Exception as e:
             logger.error("Cache write error", operation="set_embedding", error=str(e))
             metrics.increment("cache_errors")
@@ -168,10 +248,11 @@ class CacheService:
             return
         
         try:
-            pattern = f"search:*{repo_id}*"
-            keys = self.redis.keys(pattern)
+            index_key = self._repo_index_key(repo_id)
+            keys = self.redis.smembers(index_key)
+            # Single DEL: every tracked key is in the index key's slot
+            self.redis.delete(*keys, index_key)
             if keys:
-                self.redis.delete(*keys)
                 logger.info("Cache invalidated", repo_id=repo_id, keys_removed=len(keys))
         except Exception as e:
             logger.error("Cache invalidation error", repo_id=repo_id, error=str(e))
@@ -2,109 +2,232 @@
 Dependency Analyzer
 Extracts imports and builds dependency graph for codebase understanding
 """
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from operator import itemgetter
 from pathlib import Path
-from typing import List, Dict, Set
+from typing import List, Dict, Set, Optional, Tuple
+import hashlib
+import heapq
+import multiprocessing
+import os
 import re
+import threading
+import time
+
+import orjson
 
 # Tree-sitter
 import tree_sitter_python as tspython
 import tree_sitter_javascript as tsjavascript
-from tree_sitter import Language, Parser
+from tree_sitter import Language, Parser, Query, QueryCursor
 
 from services.observability import logger, capture_exception, track_time, metrics
 
+# Parsing fans out to worker processes once a repo has this many files;
+# below it, pool start-up costs more than it saves
+PARALLEL_MIN_FILES = 200
+PARALLEL_CHUNK_SIZE = 32
+MAX_PARSE_WORKERS = int(os.getenv("DEPENDENCY_PARSE_WORKERS", "0")) or os.cpu_count() or 1
+
+PY_LANGUAGE = Language(tspython.language())
+JS_LANGUAGE = Language(tsjavascript.language())
+
+# Import queries, compiled once per process: tree-sitter walks the tree in C
+# and returns only the captures
+PY_IMPORT_QUERY = Query(PY_LANGUAGE, """
+(import_statement) @import
+(import_from_statement) @import_from
+""")
+JS_IMPORT_QUERY = Query(JS_LANGUAGE, """
+(import_statement source: (string (string_fragment) @source))
+(export_statement source: (string (string_fragment) @source))
+(call_expression
+  function: (identifier) @_fn
+  arguments: (arguments . (string (string_fragment) @source))
+  (#eq? @_fn "require"))
+""")
+
+CODE_EXTENSIONS = {'.py', '.js', '.jsx', '.ts', '.tsx'}
+SKIP_DIRS = {'node_modules', '.git', '__pycache__', 'venv', 'env', 'dist', 'build'}
+
+# Supabase writes for save_to_cache: rows per upsert request, requests in flight
+FILE_DEPS_UPSERT_BATCH = 1000
+FILE_DEPS_UPSERT_WORKERS = 8
+
+# Per-repo cache of analyzed imports, keyed by file mtime/size ("" disables)
+DEPENDENCY_CACHE_DIR = os.getenv(
+    "DEPENDENCY_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "opencodeintel", "deps")
+)
+# Bump when import extraction or the entry format changes, so old entries are not reused
+DEPENDENCY_CACHE_VERSION = 1
+# Cache files of repos not rebuilt for this long (deleted repos, old versions) are removed
+DEPENDENCY_CACHE_MAX_AGE_DAYS = float(os.getenv("DEPENDENCY_CACHE_MAX_AGE_DAYS", "30"))
+
+# Optional cap on how deep (in AST levels) import captures may start. Query
+# traversal stops descending below it: 1 = module-level imports only, 3 also
+# covers imports in top-level if/try blocks and function bodies. Unset walks
+# the whole tree so lazy imports inside functions/methods are graphed too
+IMPORT_MAX_DEPTH = int(os.getenv("DEPENDENCY_IMPORT_MAX_DEPTH", "0")) or None
+
+# Probe order when resolving imports to internal files, by importing file's
+# language: relative extensions (each also tried as base/index + ext) and
+# suffixes for absolute module paths
+RESOLVE_RELATIVE_EXTENSIONS = {
+    'python': ('.py',),
+    'javascript': ('', '.js', '.jsx', '.ts', '.tsx'),
+    'typescript': ('', '.ts', '.tsx', '.js', '.jsx'),
+}
+RESOLVE_ABSOLUTE_SUFFIXES = {
+    'python': ('.py', '/__init__.py'),
+    'javascript': ('.js', '.ts'),
+    'typescript': ('.ts', '.js'),
+}
+
+LANGUAGE_BY_EXTENSION = {
+    '.py': 'python',
+    '.js': 'javascript',
+    '.jsx': 'javascript',
+    '.ts': 'typescript',
+    '.tsx': 'typescript',
+}
+
+LANGUAGES = {
+    'python': PY_LANGUAGE,
+    'javascript': JS_LANGUAGE,
+    'typescript': JS_LANGUAGE,
+}
+
+# Parsers are stateful and not safe to share across threads; keep one per
+# thread and language, created on first use and reused for every file
+_parser_pool = threading.local()
+
+
+def _get_parser(language: str) -> Parser:
+    parser = getattr(_parser_pool, language, None)
+    if parser is None:
+        parser = Parser(LANGUAGES[language])
+        setattr(_parser_pool, language, parser)
+    return parser
+
+
+# Serial analysis reads this many files ahead of the parser
+READ_AHEAD_FILES = 16
+
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+# One analyzer per worker process, built on first use
+_worker_analyzer = None
+
+
+def _analyze_worker(file_path: str) -> Dict:
+    """Process-pool entry point for analyze_file_dependencies"""
+    global _worker_analyzer
+    if _worker_analyzer is None:
+        _worker_analyzer = DependencyAnalyzer()
+    return _worker_analyzer.analyze_file_dependencies(file_path)
+
+
+# Worker processes for large-repo analysis, shared by every graph build
+_analysis_pool: Optional[ProcessPoolExecutor] = None
+_analysis_pool_lock = threading.Lock()
+
+
+def _get_analysis_pool() -> ProcessPoolExecutor:
+    """Worker processes for dependency analysis, started on first use"""
+    global _analysis_pool
+    with _analysis_pool_lock:
+        if _analysis_pool is None:
+            # spawn: forking a threaded server process can deadlock on held locks
+            _analysis_pool = ProcessPoolExecutor(
+                max_workers=MAX_PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _analysis_pool
+
+
+def close_analysis_pool() -> None:
+    """Stop the analysis worker processes (they are restarted on next use)"""
+    global _analysis_pool
+    with _analysis_pool_lock:
+        if _analysis_pool is not None:
+            _analysis_pool.shutdown(wait=False, cancel_futures=True)
+            _analysis_pool = None
+
 
 class DependencyAnalyzer:
     """Analyze code dependencies and build dependency graph"""
     
     def __init__(self):
-        # Initialize parsers
-        self.parsers = {
-            'python': Parser(Language(tspython.language())),
-            'javascript': Parser(Language(tsjavascript.language())),
-            'typescript': Parser(Language(tsjavascript.language())),
-        }
         logger.info("DependencyAnalyzer initialized")
     
     def _detect_language(self, file_path: str) -> str:
         """Detect language from file extension"""
-        ext = Path(file_path).suffix.lower()
-        lang_map = {
-            '.py': 'python',
-            '.js': 'javascript',
-            '.jsx': 'javascript',
-            '.ts': 'typescript',
-            '.tsx': 'typescript',
-        }
-        return lang_map.get(ext, 'unknown')
+        ext = os.path.splitext(file_path)[1].lower()
+        return LANGUAGE_BY_EXTENSION.get(ext, 'unknown')
+    
+    @staticmethod
+    def _import_captures(query: Query, tree_node) -> Dict[str, list]:
+        cursor = QueryCursor(query)
+        if IMPORT_MAX_DEPTH is not None:
+            cursor.set_max_start_depth(IMPORT_MAX_DEPTH)
+        return cursor.captures(tree_node)
+    
+    @staticmethod
+    def _decode_names(names: Set[memoryview]) -> Set[str]:
+        return {str(name, 'utf-8') for name in names}
     
     def _extract_python_imports(self, tree_node, source_code: bytes) -> Set[str]:
-        """Extract import statements from Python AST"""
-        imports = set()
-        
-        if tree_node.type in ['import_statement', 'import_from_statement']:
-            import_text = source_code[tree_node.start_byte:tree_node.end_byte].decode('utf-8')
-            
-            if import_text.startswith('from'):
-                match = re.match(r'from\s+([\w.]+)\s+import', import_text)
-                if match:
-                    imports.add(match.group(1))
-            elif import_text.startswith('import'):
-                modules = re.findall(r'import\s+([\w.,\s]+)', import_text)
-                if modules:
-                    for module_list in modules:
-                        for module in module_list.split(','):
-                            module = module.strip().split(' as ')[0]
-                            if module:
-                                imports.add(module)
-        
-        for child in tree_node.children:
-            imports.update(self._extract_python_imports(child, source_code))
-        
-        return imports
+        """Extract imported module names from a Python AST"""
+        # Collect zero-copy slices (hashable, compared by content) and decode
+        # each distinct name once
+        source = memoryview(source_code)
+        names = set()
+        captures = self._import_captures(PY_IMPORT_QUERY, tree_node)
+        
+        # from X import y  ->  X (relative modules keep their dots)
+        for node in captures.get('import_from', []):
+            module = node.child_by_field_name('module_name')
+            if module is not None:
+                names.add(source[module.start_byte:module.end_byte])
+        
+        # import a.b, c as d  ->  a.b, c
+        for node in captures.get('import', []):
+            for name in node.children_by_field_name('name'):
+                if name.type == 'aliased_import':
+                    name = name.child_by_field_name('name')
+                names.add(source[name.start_byte:name.end_byte])
+        
+        return self._decode_names(names)
     
     def _extract_js_imports(self, tree_node, source_code: bytes) -> Set[str]:
-        """Extract import statements from JavaScript/TypeScript AST"""
-        imports = set()
-        
-        if tree_node.type == 'import_statement':
-            import_text = source_code[tree_node.start_byte:tree_node.end_byte].decode('utf-8')
-            matches = re.findall(r'from\s+["\']([^"\']+)["\']', import_text)
-            if not matches:
-                matches = re.findall(r'import\s+["\']([^"\']+)["\']', import_text)
-            for match in matches:
-                imports.add(match)
-        
-        if tree_node.type == 'export_statement':
-            export_text = source_code[tree_node.start_byte:tree_node.end_byte].decode('utf-8')
-            matches = re.findall(r'from\s+["\']([^"\']+)["\']', export_text)
-            for match in matches:
-                imports.add(match)
-        
-        if tree_node.type == 'call_expression':
-            call_text = source_code[tree_node.start_byte:tree_node.end_byte].decode('utf-8')
-            if 'require(' in call_text:
-                match = re.search(r'require\(["\']([^"\']+)["\']\)', call_text)
-                if match:
-                    imports.add(match.group(1))
-        
-        for child in tree_node.children:
-            imports.update(self._extract_js_imports(child, source_code))
-        
-        return imports
+        """Extract import/re-export sources and require() paths from a JavaScript/TypeScript AST"""
+        source = memoryview(source_code)
+        captures = self._import_captures(JS_IMPORT_QUERY, tree_node)
+        return self._decode_names({
+            source[node.start_byte:node.end_byte] for node in captures.get('source', [])
+        })
     
-    def analyze_file_dependencies(self, file_path: str) -> Dict:
-        """Analyze a single file's dependencies"""
+    def analyze_file_dependencies(self, file_path: str, source_code: Optional[bytes] = None) -> Dict:
+        """Analyze a single file's dependencies (reads the file unless source_code is given)"""
         language = self._detect_language(file_path)
         
-        if language not in self.parsers:
+        if language not in LANGUAGES:
             return {"file": file_path, "imports": [], "language": language}
         
         try:
-            with open(file_path, 'rb') as f:
-                source_code = f.read()
+            if source_code is None:
+                with open(file_path, 'rb') as f:
+                    source_code = f.read()
             
-            tree = self.parsers[language].parse(source_code)
+            tree = _get_parser(language).parse(source_code)
             
             if language == 'python':
                 imports = self._extract_python_imports(tree.root_node, source_code)
@@ -122,39 +245,193 @@ class DependencyAnalyzer:
             logger.error("Error analyzing file", file_path=file_path, error=str(e))
             return {"file": str(file_path), "imports": [], "language": language, "error": str(e)}
     
+    def _analyze_serial(self, paths: List[str]) -> List[Dict]:
+        """
+        Analyze files in order on this thread while a reader thread keeps up
+        to READ_AHEAD_FILES reads in flight, so parsing doesn't wait on I/O.
+        """
+        results = []
+        pending = deque()
+        upcoming = iter(paths)
+        
+        with ThreadPoolExecutor(max_workers=1) as reader:
+            for path in islice(upcoming, READ_AHEAD_FILES):
+                pending.append((path, reader.submit(_read_bytes, path)))
+            
+            while pending:
+                path, read = pending.popleft()
+                next_path = next(upcoming, None)
+                if next_path is not None:
+                    pending.append((next_path, reader.submit(_read_bytes, next_path)))
+                
+                try:
+                    source_code = read.result()
+                except OSError:
+                    source_code = None  # Re-read inside analyze to report the error
+                results.append(self.analyze_file_dependencies(path, source_code))
+        
+        return results
+    
+    def _analyze_files(self, paths: List[str]) -> List[Dict]:
+        """Analyze files (results in input order), in parallel for large repos"""
+        if len(paths) < PARALLEL_MIN_FILES or MAX_PARSE_WORKERS < 2:
+            return self._analyze_serial(paths)
+        
+        try:
+            executor = _get_analysis_pool()
+            return list(executor.map(_analyze_worker, paths, chunksize=PARALLEL_CHUNK_SIZE))
+        except (BrokenProcessPool, OSError) as e:
+            logger.warning("Parallel dependency analysis failed, running serially", error=str(e))
+            # A broken pool can't take new work; start a fresh one next time
+            close_analysis_pool()
+            return self._analyze_serial(paths)
+    
+    def _find_code_files(self, repo_path: Path) -> List[Path]:
+        """
+        Discover code files with an explicit stack of os.scandir() iterators.
+        
+        Skipped directories are pruned before descending (never enumerated),
+        and file type comes from the directory entry, not an extra stat.
+        Symlinks are not followed.
+        """
+        code_files = []
+        stack = [str(repo_path)]
+        
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_symlink():
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in SKIP_DIRS:
+                                stack.append(entry.path)
+                            continue
+                        if os.path.splitext(entry.name)[1] in CODE_EXTENSIONS:
+                            code_files.append(Path(entry.path))
+            except OSError as e:
+                logger.warning("Skipping unreadable directory", path=directory, error=str(e))
+        
+        return code_files
+    
+    # ===== PER-FILE DISK CACHE =====
+    
+    @staticmethod
+    def _file_cache_path(repo_path: Path) -> str:
+        # The format version and depth cap change results, so they are part of the cache identity
+        key = f"{repo_path.resolve()}:{IMPORT_MAX_DEPTH}:{DEPENDENCY_CACHE_VERSION}"
+        digest = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        return os.path.join(DEPENDENCY_CACHE_DIR, f"{digest}.json")
+    
+    def _load_file_cache(self, cache_path: str) -> Dict[str, list]:
+        try:
+            with open(cache_path, 'rb') as f:
+                return orjson.loads(f.read())
+        except FileNotFoundError:
+            return {}
+        except (OSError, orjson.JSONDecodeError) as e:
+            logger.warning("Ignoring unreadable dependency cache", path=cache_path, error=str(e))
+            return {}
+    
+    def _save_file_cache(self, cache_path: str, entries: Dict[str, list]) -> None:
+        try:
+            os.makedirs(DEPENDENCY_CACHE_DIR, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(orjson.dumps(entries))
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning("Could not write dependency cache", path=cache_path, error=str(e))
+    
+    def _prune_file_cache(self, keep: str) -> None:
+        """Remove cache files (other than keep) last used more than DEPENDENCY_CACHE_MAX_AGE_DAYS ago"""
+        cutoff = time.time() - DEPENDENCY_CACHE_MAX_AGE_DAYS * 86400
+        try:
+            entries = list(os.scandir(DEPENDENCY_CACHE_DIR))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if entry.path != keep and entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                continue
+    
+    def _analyze_with_cache(self, repo_path: Path, code_files: List[Path]) -> List[Dict]:
+        """
+        Analyze files, reusing results for files unchanged since the last build.
+        
+        The cache holds one JSON file per repo mapping relative path to
+        [mtime_ns, size, imports, language]; files whose stat matches skip
+        read + parse entirely. Disabled when DEPENDENCY_CACHE_DIR is empty.
+        """
+        if not DEPENDENCY_CACHE_DIR:
+            return self._analyze_files([str(file_path) for file_path in code_files])
+        
+        cache_path = self._file_cache_path(repo_path)
+        cached = self._load_file_cache(cache_path)
+        fresh = {}
+        results: List[Dict] = [None] * len(code_files)
+        misses = []  # (position, relative path, stat stamp)
+        
+        for i, file_path in enumerate(code_files):
+            relative_path = str(file_path.relative_to(repo_path))
+            try:
+                st = file_path.stat()
+                stamp = [st.st_mtime_ns, st.st_size]
+            except OSError:
+                stamp = None
+            
+            entry = cached.get(relative_path)
+            if stamp and entry and entry[:2] == stamp:
+                fresh[relative_path] = entry
+                results[i] = {"file": str(file_path), "imports": entry[2], "language": entry[3]}
+            else:
+                misses.append((i, relative_path, stamp))
+        
+        analyses = self._analyze_files([str(code_files[i]) for i, _, _ in misses])
+        for (i, relative_path, stamp), analysis in zip(misses, analyses):
+            results[i] = analysis
+            if stamp and "error" not in analysis:
+                fresh[relative_path] = stamp + [analysis['imports'], analysis['language']]
+        
+        logger.debug("Dependency cache", hits=len(code_files) - len(misses), misses=len(misses))
+        if misses or len(fresh) != len(cached):
+            self._save_file_cache(cache_path, fresh)
+        else:
+            # Mark the file as in use so pruning keeps it
+            try:
+                os.utime(cache_path)
+            except OSError:
+                pass
+        self._prune_file_cache(cache_path)
+        return results
+    
     def build_dependency_graph(self, repo_path: str) -> Dict:
         """Build complete dependency graph for repository"""
         repo_path = Path(repo_path)
         
-        # Discover code files
-        code_files = []
-        extensions = {'.py', '.js', '.jsx', '.ts', '.tsx'}
-        skip_dirs = {'node_modules', '.git', '__pycache__', 'venv', 'env', 'dist', 'build'}
-        
-        for file_path in repo_path.rglob('*'):
-            if file_path.is_dir():
-                continue
-            if any(skip in file_path.parts for skip in skip_dirs):
-                continue
-            if file_path.suffix in extensions:
-                code_files.append(file_path)
+        code_files = self._find_code_files(repo_path)
         
         logger.info("Building dependency graph", file_count=len(code_files))
         
         # Analyze each file
         file_dependencies = {}
+        file_languages = {}
         all_imports = set()
         
-        for file_path in code_files:
+        analyses = self._analyze_with_cache(repo_path, code_files)
+        for file_path, analysis in zip(code_files, analyses):
             relative_path = str(file_path.relative_to(repo_path))
-            analysis = self.analyze_file_dependencies(str(file_path))
             
             file_dependencies[relative_path] = analysis['imports']
+            file_languages[relative_path] = analysis['language']
             all_imports.update(analysis['imports'])
         
-        # Build graph structure
-        nodes = []
-        edges = []
+        # Graph is kept as parallel columns (file_* dicts keyed by path,
+        # edge_sources/edge_targets) and only turned into per-node/per-edge
+        # dicts for the response
         internal_files = set(file_dependencies.keys())
         
         # DEBUG: Show sample of what we're working with
@@ -167,43 +444,55 @@ class DependencyAnalyzer:
                 logger.debug("Sample file imports", file=f, imports=imports[:3])
                 break
         
-        # Create nodes
-        for file_path in file_dependencies.keys():
-            language = self._detect_language(file_path)
-            nodes.append({
-                "id": file_path,
-                "label": Path(file_path).name,
-                "type": "file",
-                "language": language,
-                "import_count": len(file_dependencies[file_path])
-            })
-        
-        # Create edges
-        resolved_count = 0
+        # Resolve edges (probe order depends on the importing file's language)
+        resolution_indexes = {
+            language: self._build_resolution_index(
+                internal_files,
+                RESOLVE_RELATIVE_EXTENSIONS[language],
+                RESOLVE_ABSOLUTE_SUFFIXES[language]
+            )
+            for language in set(file_languages.values()) & RESOLVE_RELATIVE_EXTENSIONS.keys()
+        }
+        edge_sources: List[str] = []
+        edge_targets: List[str] = []
         failed_count = 0
         for source_file, imports in file_dependencies.items():
+            resolution_index = resolution_indexes.get(file_languages[source_file])
+            if resolution_index is None:
+                failed_count += len(imports)
+                continue
             for imported_module in imports:
                 target_file = self._resolve_import_to_file(
-                    imported_module, 
+                    imported_module,
                     source_file,
-                    internal_files,
-                    repo_path
+                    resolution_index
                 )
                 
                 if target_file:
-                    resolved_count += 1
-                    edges.append({
-                        "source": source_file,
-                        "target": target_file,
-                        "type": "import"
-                    })
+                    edge_sources.append(source_file)
+                    edge_targets.append(target_file)
                 else:
                     failed_count += 1
         
-        logger.info("Import resolution complete", resolved=resolved_count, external=failed_count)
+        logger.info("Import resolution complete", resolved=len(edge_sources), external=failed_count)
         
         # Calculate metrics
-        graph_metrics = self._calculate_graph_metrics(file_dependencies, edges)
+        graph_metrics = self._calculate_graph_metrics(edge_sources, edge_targets)
+        
+        nodes = [
+            {
+                "id": file_path,
+                "label": os.path.basename(file_path),
+                "type": "file",
+                "language": file_languages[file_path],
+                "import_count": len(imports)
+            }
+            for file_path, imports in file_dependencies.items()
+        ]
+        edges = [
+            {"source": source, "target": target, "type": "import"}
+            for source, target in zip(edge_sources, edge_targets)
+        ]
         
         logger.info("Dependency graph built", nodes=len(nodes), edges=len(edges))
         metrics.increment("dependency_graphs_built")
@@ -218,14 +507,55 @@ class DependencyAnalyzer:
             "external_dependencies": list(all_imports - set(internal_files))[:50]
         }
 
+    @staticmethod
+    def _build_resolution_index(
+        internal_files: Set[str],
+        relative_extensions: Tuple[str, ...],
+        absolute_suffixes: Tuple[str, ...]
+    ) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """
+        Map every import base that can resolve to an internal file, once per graph.
+        
+        Returns (relative, absolute): relative import bases (``base`` and
+        ``base/index``, each plus an extension) and absolute module paths to
+        the file they resolve to. When several files match a base, the one
+        earliest in probe order wins.
+        """
+        relative: Dict[str, Tuple[int, str]] = {}
+        absolute: Dict[str, Tuple[int, str]] = {}
+        
+        def claim(index, base, rank, file_path):
+            current = index.get(base)
+            if current is None or rank < current[0]:
+                index[base] = (rank, file_path)
+        
+        for file_path in internal_files:
+            directory, _, name = file_path.rpartition('/')
+            directory = directory or '.'
+            for i, ext in enumerate(relative_extensions):
+                if not file_path.endswith(ext):
+                    continue
+                # base + ext, then base/index + ext
+                claim(relative, file_path[:len(file_path) - len(ext)], 2 * i, file_path)
+                if name == 'index' + ext:
+                    claim(relative, directory, 2 * i + 1, file_path)
+            for rank, suffix in enumerate(absolute_suffixes):
+                if file_path.endswith(suffix):
+                    claim(absolute, file_path[:-len(suffix)], rank, file_path)
+        
+        return (
+            {base: f for base, (_, f) in relative.items()},
+            {base: f for base, (_, f) in absolute.items()},
+        )
+    
     def _resolve_import_to_file(
         self,
         import_path: str,
         source_file: str,
-        internal_files: Set[str],
-        repo_path: Path
-    ) -> str:
-        """Resolve an import to an actual file in the repo"""
+        resolution_index: Tuple[Dict[str, str], Dict[str, str]]
+    ) -> Optional[str]:
+        """Resolve an import to an actual file in the repo (one dict lookup)"""
+        relative_index, absolute_index = resolution_index
         
         # External dependency check
         if not import_path.startswith('.') and not import_path.startswith('/'):
@@ -233,11 +563,9 @@ class DependencyAnalyzer:
             if '/' not in import_path:
                 return None
         
-        source_path = Path(source_file)
-        source_dir = source_path.parent
-        
         # Relative imports
         if import_path.startswith('.'):
+            source_dir = Path(source_file).parent
             clean_import = import_path.lstrip('./')
             
             levels_up = import_path.count('../')
@@ -250,87 +578,42 @@ class DependencyAnalyzer:
             else:
                 potential_base = source_dir / clean_import
             
-            extensions = ['', '.ts', '.tsx', '.js', '.jsx', '.py']
-            
-            for ext in extensions:
-                # Build the potential path
-                test_path = str(potential_base) + ext
-                
-                # Check if this relative path exists in internal files
-                if test_path in internal_files:
-                    return test_path
-                
-                # Try with /index
-                index_path = str(potential_base / ('index' + ext))
-                if index_path in internal_files:
-                    return index_path
+            return relative_index.get(str(potential_base))
         
         # Python absolute imports
-        if not import_path.startswith('.'):
-            module_path = import_path.replace('.', '/')
-            
-            for ext in ['.py', '.js', '.ts']:
-                test_path = module_path + ext
-                if test_path in internal_files:
-                    return test_path
-                
-                init_path = f"{module_path}/__init__.py"
-                if init_path in internal_files:
-                    return init_path
-        
-        return None
+        return absolute_index.get(import_path.replace('.', '/'))
     
-    def _calculate_graph_metrics(self, dependencies: Dict, edges: List) -> Dict:
-        """Calculate graph metrics"""
-        in_degree = {}
-        out_degree = {}
-        
-        for edge in edges:
-            source = edge['source']
-            target = edge['target']
-            
-            out_degree[source] = out_degree.get(source, 0) + 1
-            in_degree[target] = in_degree.get(target, 0) + 1
-        
-        most_critical = sorted(
-            [(file, degree) for file, degree in in_degree.items()],
-            key=lambda x: x[1],
-            reverse=True
-        )[:10]
+    def _calculate_graph_metrics(self, edge_sources: List[str], edge_targets: List[str]) -> Dict:
+        """Calculate graph metrics from parallel edge source/target columns"""
+        # Counter counts a plain list in C: no Python frame per edge
+        out_degree = Counter(edge_sources)
+        in_degree = Counter(edge_targets)
         
-        most_complex = sorted(
-            [(file, degree) for file, degree in out_degree.items()],
-            key=lambda x: x[1],
-            reverse=True
-        )[:10]
+        # Bounded heap instead of sorting every file (same order, ties included)
+        most_critical = heapq.nlargest(10, in_degree.items(), key=itemgetter(1))
+        most_complex = heapq.nlargest(10, out_degree.items(), key=itemgetter(1))
         
         return {
             "most_critical_files": [{"file": f, "dependents": d} for f, d in most_critical],
             "most_complex_files": [{"file": f, "dependencies": d} for f, d in most_complex],
             "avg_dependencies": sum(out_degree.values()) / len(out_degree) if out_degree else 0,
-            "total_edges": len(edges)
+            "total_edges": len(edge_sources)
         }
     
     def get_file_impact(self, repo_path: str, file_path: str, graph_data: Dict) -> Dict:
         """Calculate impact of changing a specific file"""
-        dependents_map = {}
-        dependencies_map = {}
-        
+        # Only the reverse map is needed for the BFS; forward edges are
+        # collected for this file alone in the same pass
+        dependents_map = defaultdict(list)
+        direct_dependencies = []
         for edge in graph_data['edges']:
             source = edge['source']
-            target = edge['target']
-            
-            if target not in dependents_map:
-                dependents_map[target] = []
-            dependents_map[target].append(source)
-            
-            if source not in dependencies_map:
-                dependencies_map[source] = []
-            dependencies_map[source].append(target)
+            dependents_map[edge['target']].append(source)
+            if source == file_path:
+                direct_dependencies.append(edge['target'])
         
         direct_dependents = dependents_map.get(file_path, [])
         all_dependents = self._find_transitive_dependents(file_path, dependents_map)
-        direct_dependencies = dependencies_map.get(file_path, [])
         
         # Calculate risk based on impact
         risk_level = "low"
@@ -363,18 +646,17 @@ class DependencyAnalyzer:
     
     def _find_transitive_dependents(self, file_path: str, dependents_map: Dict) -> List[str]:
         """Find all files that transitively depend on this file (BFS)"""
-        visited = set()
-        queue = [file_path]
+        if file_path not in dependents_map:
+            return []
+        
+        # Mark on enqueue so each file is queued at most once
+        visited = {file_path}
+        queue = deque([file_path])
         
         while queue:
-            current = queue.pop(0)
-            if current in visited:
-                continue
-            
-            visited.add(current)
-            
-            for dependent in dependents_map.get(current, []):
+            for dependent in dependents_map.get(queue.popleft(), ()):
                 if dependent not in visited:
+                    visited.add(dependent)
                     queue.append(dependent)
         
         visited.discard(file_path)
@@ -382,21 +664,14 @@ class DependencyAnalyzer:
     
     def _find_test_files(self, file_path: str, nodes: List[Dict]) -> List[str]:
         """Find test files related to this file"""
-        file_name = Path(file_path).stem
-        test_patterns = [
-            f"test_{file_name}",
-            f"{file_name}_test",
-            f"{file_name}.test",
-            f"{file_name}.spec"
-        ]
-        
-        test_files = []
-        for node in nodes:
-            node_name = Path(node['id']).stem
-            if any(pattern in node_name for pattern in test_patterns):
-                test_files.append(node['id'])
+        name = re.escape(Path(file_path).stem)
+        # test_X, X_test, X.test, X.spec anywhere in the node's file stem
+        test_pattern = re.compile(rf"test_{name}|{name}(?:_test|\.test|\.spec)")
         
-        return test_files
+        return [
+            node['id'] for node in nodes
+            if test_pattern.search(os.path.splitext(os.path.basename(node['id']))[0])
+        ]
 
     
     # ===== SUPABASE CACHING =====
@@ -421,15 +696,16 @@ class DependencyAnalyzer:
                 internal_deps_map[source] = []
             internal_deps_map[source].append(target)
         
+        # Reverse map in one pass over the edges (each dependent listed once)
+        depended_by_map = defaultdict(list)
+        for source, targets in internal_deps_map.items():
+            for target in dict.fromkeys(targets):
+                depended_by_map[target].append(source)
+        
         for file_path, imports in dependencies.items():
             # Get resolved internal dependencies for this file
             internal_deps = internal_deps_map.get(file_path, [])
-            
-            # Build reverse dependencies
-            depended_by = []
-            for other_file, other_deps in internal_deps_map.items():
-                if file_path in other_deps:
-                    depended_by.append(other_file)
+            depended_by = depended_by_map.get(file_path, [])
             
             file_deps.append({
                 "file_path": file_path,
@@ -439,14 +715,7 @@ class DependencyAnalyzer:
                 "dependent_count": len(depended_by)
             })
         
-        # Clear old dependencies
-        db.clear_file_dependencies(repo_id)
-        
-        # Bulk insert new dependencies
-        logger.info("Saving file dependencies to Supabase", repo_id=repo_id, count=len(file_deps))
-        db.upsert_file_dependencies(repo_id, file_deps)
-        
-        # Save repository insights
+        # Repository insights
         metrics = graph_data.get("metrics", {})
         insights = {
             "total_files": len(dependencies),
@@ -459,7 +728,20 @@ class DependencyAnalyzer:
             }
         }
         
-        db.upsert_repository_insights(repo_id, insights)
+        logger.info("Saving file dependencies to Supabase", repo_id=repo_id, count=len(file_deps))
+        chunks = [
+            file_deps[i:i + FILE_DEPS_UPSERT_BATCH]
+            for i in range(0, len(file_deps), FILE_DEPS_UPSERT_BATCH)
+        ]
+        with ThreadPoolExecutor(max_workers=FILE_DEPS_UPSERT_WORKERS) as executor:
+            # Insights are independent of the per-file rows: overlap them
+            insights_write = executor.submit(db.upsert_repository_insights, repo_id, insights)
+            
+            # Clear old dependencies, then insert the new ones in parallel batches
+            db.clear_file_dependencies(repo_id)
+            list(executor.map(lambda chunk: db.upsert_file_dependencies(repo_id, chunk), chunks))
+            insights_write.result()
+        
         logger.info("Cached dependency graph in Supabase", repo_id=repo_id)
     
     def load_from_cache(self, repo_id: str) -> Dict:
@@ -0,0 +1,84 @@
+"""
+Embedding Cache
+On-disk SQLite store of embeddings keyed by a hash of (model, text), so
+re-indexing unchanged code skips the OpenAI call
+"""
+import hashlib
+import os
+import sqlite3
+from array import array
+from typing import List, Optional
+
+from services.observability import logger
+
+# Keys per SELECT ... IN (...) (well under SQLite's bound-parameter limit)
+LOOKUP_CHUNK_SIZE = 500
+
+
+class EmbeddingCache:
+    """Float32 embeddings in a local SQLite file, oldest rows pruned past max_rows"""
+
+    def __init__(self, path: str, model: str, max_rows: int = 200_000):
+        self.path = path
+        self.model = model
+        self.max_rows = max_rows
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        # WAL: readers don't block the writer (several server processes share the file)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vec BLOB NOT NULL)"
+        )
+        return conn
+
+    def _key(self, text: str) -> bytes:
+        # The model is part of the key: vectors from different models don't mix
+        return hashlib.blake2b(f"{self.model}\0{text}".encode(), digest_size=16).digest()
+
+    def get_many(self, texts: List[str]) -> List[Optional[array]]:
+        """Cached embedding per text (None for misses), in input order"""
+        keys = [self._key(text) for text in texts]
+        found = {}
+        try:
+            conn = self._connect()
+            try:
+                for i in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+                    chunk = keys[i:i + LOOKUP_CHUNK_SIZE]
+                    placeholders = ",".join("?" * len(chunk))
+                    found.update(conn.execute(
+                        f"SELECT key, vec FROM embeddings WHERE key IN ({placeholders})", chunk
+                    ))
+            finally:
+                conn.close()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Embedding cache read failed", path=self.path, error=str(e))
+
+        return [array("f", found[key]) if key in found else None for key in keys]
+
+    def put_many(self, texts: List[str], embeddings: List[array]) -> None:
+        """Store embeddings, then drop the oldest rows beyond max_rows"""
+        rows = [(self._key(text), embedding.tobytes()) for text, embedding in zip(texts, embeddings)]
+        if not rows:
+            return
+
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    # REPLACE assigns a new rowid, so rowid order is write order
+                    conn.executemany("INSERT OR REPLACE INTO embeddings (key, vec) VALUES (?, ?)", rows)
+                    excess = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] - self.max_rows
+                    if excess > 0:
+                        conn.execute(
+                            "DELETE FROM embeddings WHERE rowid IN "
+                            "(SELECT rowid FROM embeddings ORDER BY rowid LIMIT ?)",
+                            (excess,)
+                        )
+            finally:
+                conn.close()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Embedding cache write failed", path=self.path, error=str(e))
@@ -9,27 +9,39 @@ Improvements (v2):
 - Keyword boosting for exact matches
 """
 import os
-from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 import asyncio
-from collections import defaultdict
+import mmap
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 # Tree-sitter for parsing
 import tree_sitter_python as tspython
 import tree_sitter_javascript as tsjavascript
-from tree_sitter import Language, Parser
+from tree_sitter import Language, Parser, Query, QueryCursor
 
 # AI/ML
+import httpx
 from openai import AsyncOpenAI
 from pinecone import Pinecone, ServerlessSpec
+from pinecone.exceptions import PineconeProtocolError
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
+import tiktoken
 
 # Utils
+import base64
 import hashlib
+import random
+from array import array
+from functools import lru_cache
 from dotenv import load_dotenv
 import time
 
 # Search enhancement
 from services.search_enhancer import SearchEnhancer
+from services.embedding_cache import EmbeddingCache
 
 # Observability
 from services.observability import logger, trace_operation, track_time, capture_exception, add_breadcrumb, metrics
@@ -39,7 +51,307 @@ load_dotenv()
 # Configuration
 # Note: If using existing Pinecone index, match the dimension (1536 for small, 3072 for large)
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
-EMBEDDING_DIMENSIONS = 3072 if "large" in EMBEDDING_MODEL else 1536
+NATIVE_EMBEDDING_DIMENSIONS = 3072 if "large" in EMBEDDING_MODEL else 1536
+# text-embedding-3 models can return shortened vectors (e.g. 512): less Pinecone
+# storage, upload and query work for a small recall loss
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS") or NATIVE_EMBEDDING_DIMENSIONS)
+# Only sent when shortening, so older models without the parameter keep working
+EMBEDDING_REQUEST_OPTIONS = (
+    {"dimensions": EMBEDDING_DIMENSIONS}
+    if EMBEDDING_DIMENSIONS != NATIVE_EMBEDDING_DIMENSIONS else {}
+)
+# Shortened vectors get their own index by default, so switching is non-destructive
+DEFAULT_INDEX_NAME = (
+    "codeintel" if EMBEDDING_DIMENSIONS == NATIVE_EMBEDDING_DIMENSIONS
+    else f"codeintel-d{EMBEDDING_DIMENSIONS}"
+)
+
+# On-disk embedding cache ("" disables); oldest rows pruned beyond the cap
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "opencodeintel", "embeddings.sqlite3")
+)
+EMBEDDING_CACHE_MAX_ROWS = int(os.getenv("EMBEDDING_CACHE_MAX_ROWS", "200000"))
+
+# One pooled HTTP/2 connection set to OpenAI, kept warm between requests:
+# search queries skip the TCP+TLS handshake, and concurrent embedding
+# batches multiplex over a few connections
+OPENAI_HTTP_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=40,
+    keepalive_expiry=30.0
+)
+OPENAI_HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+# The SDK retries rate limits, 5xx and connection errors with jittered
+# exponential backoff, honoring Retry-After; a batch that still fails is
+# left out of the index rather than upserted as a zero vector
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "6"))
+
+
+def _create_openai_client() -> AsyncOpenAI:
+    http_client = httpx.AsyncClient(
+        http2=True,
+        limits=OPENAI_HTTP_LIMITS,
+        timeout=OPENAI_HTTP_TIMEOUT
+    )
+    return AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        http_client=http_client,
+        max_retries=OPENAI_MAX_RETRIES
+    )
+
+
+# Talk to Pinecone over gRPC (protobuf, multiplexed) instead of REST/JSON;
+# needs the pinecone[grpc] extra, falls back to REST without it
+PINECONE_USE_GRPC = os.getenv("PINECONE_USE_GRPC", "").lower() in ("1", "true", "yes")
+
+
+def _create_pinecone_client():
+    if PINECONE_USE_GRPC:
+        try:
+            from pinecone.grpc import PineconeGRPC
+            return PineconeGRPC(api_key=os.getenv("PINECONE_API_KEY"))
+        except ImportError as e:
+            logger.warning("Pinecone gRPC client unavailable, using REST", error=str(e))
+    return Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+
+
+# Pinecone upserts are retried on rate limits, server errors and dropped
+# connections (vector ids are deterministic, so a repeated upsert is harmless)
+PINECONE_MAX_RETRIES = int(os.getenv("PINECONE_MAX_RETRIES", "5"))
+PINECONE_RETRY_MAX_DELAY = 30.0
+
+
+def _pinecone_retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """Seconds to wait before retrying a failed Pinecone call, None if it won't succeed on retry"""
+    # ApiException.status in older clients, status_code in newer ones
+    status = getattr(error, "status", None) or getattr(error, "status_code", None)
+    if status is None:
+        if not isinstance(error, (OSError, PineconeProtocolError, Urllib3HTTPError)):
+            return None
+    elif status != 429 and status < 500:
+        return None
+    
+    headers = getattr(error, "headers", None) or {}
+    retry_after = headers.get("retry-after") or headers.get("Retry-After")
+    if retry_after:
+        try:
+            return min(float(retry_after), PINECONE_RETRY_MAX_DELAY)
+        except ValueError:
+            pass
+    # Full jitter: parallel upsert batches don't retry in lockstep
+    return random.uniform(0, min(PINECONE_RETRY_MAX_DELAY, 2.0 ** attempt))
+
+
+def _call_with_pinecone_retry(fn, **kwargs):
+    """
+    Call a Pinecone index method, backing off and retrying transient
+    failures. Blocking (sleeps between attempts); run it off the event loop.
+    """
+    for attempt in range(PINECONE_MAX_RETRIES + 1):
+        try:
+            return fn(**kwargs)
+        except Exception as e:
+            delay = _pinecone_retry_delay(e, attempt) if attempt < PINECONE_MAX_RETRIES else None
+            if delay is None:
+                raise
+            logger.warning("Pinecone call failed, retrying",
+                           operation=getattr(fn, "__name__", "call"),
+                           attempt=attempt + 1, delay=round(delay, 2), error=str(e))
+            time.sleep(delay)
+
+
+# Code stored per vector in Pinecone metadata (longer code is truncated)
+METADATA_CODE_CHARS = 1000
+
+# "int8" rounds stored vectors to integers in [-127, 127] (per-vector scale)
+# before upsert. Pinecone still stores float32, so this only shortens REST/JSON
+# upsert payloads (~4x) and is skipped on the gRPC client, whose floats are fixed
+# width. The rounding is permanent and costs some recall on close matches
+EMBEDDING_DTYPE = os.getenv("EMBEDDING_DTYPE", "float32")
+
+# Extensions to index (tuple for str.endswith)
+CODE_EXTENSIONS = ('.py', '.js', '.jsx', '.ts', '.tsx')
+
+LANGUAGE_BY_EXTENSION = {
+    '.py': 'python',
+    '.js': 'javascript',
+    '.jsx': 'javascript',
+    '.ts': 'typescript',
+    '.tsx': 'typescript',
+}
+
+# Directories never indexed
+SKIP_DIRS = frozenset({'node_modules', '.git', '__pycache__', 'venv', 'env', 'dist', 'build', '.next', '.vscode'})
+
+# Files are parsed in worker processes: tree-sitter parsing and the AST walk
+# are CPU-bound and hold the GIL, so gathering them on the event loop is serial
+MAX_PARSE_WORKERS = int(os.getenv("INDEXER_PARSE_WORKERS", "0")) or os.cpu_count() or 1
+
+# Grammars are loaded once per process (each worker builds them on import)
+# and shared by every parser and query
+PY_LANGUAGE = Language(tspython.language())
+JS_LANGUAGE = Language(tsjavascript.language())
+
+LANGUAGES = {
+    'python': PY_LANGUAGE,
+    'javascript': JS_LANGUAGE,
+    'typescript': JS_LANGUAGE,
+}
+
+# Definitions extracted for indexing, compiled once per language. Matching
+# runs inside tree-sitter; Python only sees the captured nodes. Queries are
+# immutable and safe to share across threads
+PY_DEFINITION_QUERY = Query(PY_LANGUAGE, "[(function_definition) (class_definition)] @definition")
+JS_DEFINITION_QUERY = Query(
+    JS_LANGUAGE, "[(function_declaration) (method_definition) (arrow_function)] @definition"
+)
+
+DEFINITION_QUERIES = {
+    'python': PY_DEFINITION_QUERY,
+    'javascript': JS_DEFINITION_QUERY,
+    'typescript': JS_DEFINITION_QUERY,
+}
+
+
+def _extract_definitions(tree_node, source_code: bytes, language: str) -> List[Dict]:
+    """Extract function/class definitions from AST, in document order"""
+    captures = QueryCursor(DEFINITION_QUERIES[language]).captures(tree_node)
+    # Captures come grouped by pattern, not by position; outer nodes first on ties
+    nodes = sorted(captures.get('definition', ()), key=lambda n: (n.start_byte, -n.end_byte))
+    
+    functions = []
+    # Released on exit so a memory-mapped source can be closed right after
+    with memoryview(source_code) as view:
+        for node in nodes:
+            name_node = node.child_by_field_name('name')
+            name = str(view[name_node.start_byte:name_node.end_byte], 'utf-8') if name_node else 'anonymous'
+            
+            functions.append({
+                'name': name,
+                'type': node.type,
+                'code': str(view[node.start_byte:node.end_byte], 'utf-8'),
+                'start_line': node.start_point[0],
+                'end_line': node.end_point[0],
+            })
+    
+    return functions
+
+
+def _parse_name_status(diff: str) -> Tuple[List[str], List[str]]:
+    """
+    Split `git diff --name-status -z` output into (files to index, files
+    whose vectors should just go). Renames count as a removal of the old
+    path plus a change of the new one.
+    """
+    changed, removed = [], []
+    # NUL-separated: paths with newlines or quoting survive intact
+    fields = iter(diff.split('\0'))
+    for status in fields:
+        if not status:
+            continue
+        path = next(fields)
+        if status[0] in 'RC':
+            # Rename/copy: source path, then destination path
+            if status[0] == 'R':
+                removed.append(path)
+            changed.append(next(fields))
+        elif status[0] == 'D':
+            removed.append(path)
+        else:
+            changed.append(path)
+    return changed, removed
+
+
+def _vector_id(repo_id: str, file_path: str, start_line: int) -> str:
+    """
+    Pinecone ID for a definition. Must stay stable across releases: re-indexing
+    relies on upsert overwriting the vector stored under the same ID.
+    """
+    key = f"{repo_id}:{file_path}:{start_line}".encode()
+    return hashlib.md5(key, usedforsecurity=False).hexdigest()
+
+
+def _probe_vector() -> List[float]:
+    """Query vector for metadata-filter-only matching; any non-zero vector will do"""
+    probe = [0.0] * EMBEDDING_DIMENSIONS
+    probe[0] = 1.0
+    return probe
+
+
+def _to_float32(embedding) -> array:
+    """Embedding from the API (base64-packed float32, or a list) as an array"""
+    if isinstance(embedding, str):
+        return array("f", base64.b64decode(embedding))
+    return array("f", embedding)
+
+
+def _quantize_int8(embedding: array) -> List[float]:
+    """
+    Scale a vector so its largest component is +/-127 and round each
+    component. Cosine similarity ignores the scale, so queries keep using
+    the raw float embedding.
+    """
+    peak = max(map(abs, embedding), default=0.0)
+    if not peak:
+        return embedding.tolist()
+    scale = 127.0 / peak
+    return [float(round(x * scale)) for x in embedding]
+
+
+@lru_cache(maxsize=1)
+def _token_encoding() -> Optional[tiktoken.Encoding]:
+    """
+    Tokenizer of the embedding model, or None if it can't be loaded (tiktoken
+    downloads its BPE files on first use, which fails offline).
+    """
+    try:
+        return tiktoken.encoding_for_model(EMBEDDING_MODEL)
+    except Exception as e:
+        logger.warning("Tokenizer unavailable, estimating tokens from length", error=str(e))
+        return None
+
+
+def _count_tokens(texts: List[str]) -> List[int]:
+    """Token count per text (about 4 characters a token without a tokenizer)"""
+    encoding = _token_encoding()
+    if encoding is None:
+        return [len(text) // 4 + 1 for text in texts]
+    return [len(tokens) for tokens in encoding.encode_ordinary_batch(texts)]
+
+
+# Files at least this big are memory-mapped for parsing instead of read;
+# below it the extra mmap/munmap calls cost more than the copy they save
+MMAP_MIN_BYTES = 64 * 1024
+
+
+# Parsers are stateful and not safe to share across threads (and can't be
+# pickled to workers); keep one per thread and language, created on first
+# use and reused for every file that thread or worker process parses
+_parser_pool = threading.local()
+
+
+def _get_parser(language: str) -> Parser:
+    parser = getattr(_parser_pool, language, None)
+    if parser is None:
+        parser = Parser(LANGUAGES[language])
+        setattr(_parser_pool, language, parser)
+    return parser
+
+
+def _parse_file_worker(file_path: str, language: str) -> List[Dict]:
+    """Parse one file and extract its definitions (process-pool entry point)"""
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < MMAP_MIN_BYTES:
+            return _parse_source(f.read(), language)
+        # Large files are parsed straight from the page cache, not copied into bytes
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as source_code:
+            return _parse_source(source_code, language)
+
+
+def _parse_source(source_code, language: str) -> List[Dict]:
+    tree = _get_parser(language).parse(source_code)
+    return _extract_definitions(tree.root_node, source_code, language)
 
 
 class OptimizedCodeIndexer:
@@ -47,20 +359,27 @@ class OptimizedCodeIndexer:
     
     # Batch sizes for optimal performance
     EMBEDDING_BATCH_SIZE = 100  # OpenAI allows up to 2048
+    EMBEDDING_INPUT_CHARS = 8000  # Per-text truncation (8191 token limit)
+    EMBEDDING_BATCH_TOKENS = 250_000  # Per request (OpenAI rejects more than 300k)
+    EMBEDDING_CONCURRENCY = 8  # Embedding requests in flight per indexer
     FILE_BATCH_SIZE = 10  # Process files in parallel
     PINECONE_UPSERT_BATCH = 100  # Pinecone batch upsert
+    PINECONE_UPSERT_CONCURRENCY = 8  # Upsert requests in flight per call
+    PINECONE_DELETE_BATCH = 1000  # File paths per delete-by-filter request
+    PINECONE_DELETE_QUERY_TOP_K = 1000  # IDs found per query when deleting by ID instead
     
     def __init__(self):
         # Initialize OpenAI
-        self.openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.openai_client = _create_openai_client()
         
         # Initialize search enhancer
         self.search_enhancer = SearchEnhancer(self.openai_client)
         
         # Initialize Pinecone
-        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+        pc = _create_pinecone_client()
+        self._pinecone_grpc = type(pc).__module__.startswith("pinecone.grpc")
         
-        index_name = os.getenv("PINECONE_INDEX_NAME", "codeintel")
+        index_name = os.getenv("PINECONE_INDEX_NAME") or DEFAULT_INDEX_NAME
         
         # Check if index exists and has correct dimensions
         existing_indexes = pc.list_indexes().names()
@@ -68,6 +387,13 @@ class OptimizedCodeIndexer:
             # Use existing index (dimension already set)
             index_info = pc.describe_index(index_name)
             logger.info("Using existing Pinecone index", index=index_name, dimension=index_info.dimension)
+            if index_info.dimension != EMBEDDING_DIMENSIONS:
+                logger.warning(
+                    "Pinecone index dimension does not match embeddings",
+                    index=index_name,
+                    index_dimension=index_info.dimension,
+                    embedding_dimension=EMBEDDING_DIMENSIONS
+                )
         else:
             logger.info("Creating Pinecone index", index=index_name, dimension=EMBEDDING_DIMENSIONS)
             pc.create_index(
@@ -82,119 +408,311 @@ class OptimizedCodeIndexer:
         
         self.index = pc.Index(index_name)
         
-        # Initialize tree-sitter parsers
-        self.parsers = {
-            'python': self._create_parser(Language(tspython.language())),
-            'javascript': self._create_parser(Language(tsjavascript.language())),
-            'typescript': self._create_parser(Language(tsjavascript.language())),
-        }
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
+        # Shared bound on embedding requests in flight, created on first use
+        self._embedding_slots: Optional[asyncio.Semaphore] = None
+        
+        # Embeddings of previously indexed code, reused across (re-)indexing runs
+        self.embedding_cache = (
+            EmbeddingCache(
+                EMBEDDING_CACHE_PATH,
+                # Shortened vectors must not be served for full-size ones
+                f"{EMBEDDING_MODEL}:{EMBEDDING_DIMENSIONS}" if EMBEDDING_REQUEST_OPTIONS else EMBEDDING_MODEL,
+                EMBEDDING_CACHE_MAX_ROWS
+            )
+            if EMBEDDING_CACHE_PATH else None
+        )
         
         logger.info("OptimizedCodeIndexer initialized", model=EMBEDDING_MODEL)
     
-    def _create_parser(self, language) -> Parser:
-        """Create a tree-sitter parser"""
-        parser = Parser(language)
-        return parser
-    
     def _detect_language(self, file_path: str) -> Optional[str]:
         """Detect programming language from file extension"""
-        ext = Path(file_path).suffix.lower()
-        lang_map = {
-            '.py': 'python',
-            '.js': 'javascript',
-            '.jsx': 'javascript',
-            '.ts': 'typescript',
-            '.tsx': 'typescript',
-        }
-        return lang_map.get(ext)
+        return LANGUAGE_BY_EXTENSION.get(os.path.splitext(file_path)[1].lower())
     
-    def _discover_code_files(self, repo_path: str) -> List[Path]:
-        """Find all code files in repository"""
-        repo_path = Path(repo_path)
-        code_files = []
-        
-        # Extensions to index
-        extensions = {'.py', '.js', '.jsx', '.ts', '.tsx'}
+    def _discover_code_files(self, repo_path: str) -> List[str]:
+        """
+        Find all code files in repository.
         
-        # Directories to skip
-        skip_dirs = {'node_modules', '.git', '__pycache__', 'venv', 'env', 'dist', 'build', '.next', '.vscode'}
+        Skipped directories are pruned in place so os.walk never descends
+        into them; symlinked directories are not followed.
+        """
+        code_files = []
         
-        for file_path in repo_path.rglob('*'):
-            # Skip directories
-            if file_path.is_dir():
-                continue
-            
-            # Skip if in excluded directory
-            if any(skip in file_path.parts for skip in skip_dirs):
-                continue
-            
-            # Check extension
-            if file_path.suffix in extensions:
-                code_files.append(file_path)
+        for dir_path, dir_names, file_names in os.walk(repo_path):
+            dir_names[:] = [d for d in dir_names if d not in SKIP_DIRS]
+            code_files.extend(
+                os.path.join(dir_path, name)
+                for name in file_names
+                if name.endswith(CODE_EXTENSIONS)
+            )
         
         return code_files
     
-    async def _create_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings in batch using configured model"""
+    async def _create_embeddings_batch(self, texts: List[str]) -> List[array]:
+        """
+        Generate embeddings in batch using configured model.
+        
+        Requested as base64 and unpacked straight into float32 arrays (4 bytes
+        per dimension) instead of one Python float object per dimension.
+        """
         if not texts:
             return []
         
         try:
             # Truncate texts if too long (8191 token limit)
-            truncated_texts = [text[:8000] for text in texts]
+            truncated_texts = [text[:self.EMBEDDING_INPUT_CHARS] for text in texts]
             
             response = await self.openai_client.embeddings.create(
                 model=EMBEDDING_MODEL,
-                input=truncated_texts
+                input=truncated_texts,
+                encoding_format="base64",
+                **EMBEDDING_REQUEST_OPTIONS
             )
             
             # Return embeddings in order
-            return [item.embedding for item in response.data]
+            return [_to_float32(item.embedding) for item in response.data]
             
         except Exception as e:
             logger.error("Error creating batch embeddings", error=str(e), batch_size=len(texts))
             capture_exception(e, operation="create_embeddings", batch_size=len(texts))
             # Return zero vectors on error
-            return [[0.0] * EMBEDDING_DIMENSIONS for _ in texts]
+            return [array("f", bytes(4 * EMBEDDING_DIMENSIONS)) for _ in texts]
     
-    def _extract_functions(self, tree_node, source_code: bytes) -> List[Dict]:
-        """Extract function/class definitions from AST"""
-        functions = []
-        
-        # Function/class node types
-        target_types = {
-            'function_definition',
-            'class_definition',
-            'function_declaration',
-            'method_definition',
-            'arrow_function',
-        }
-        
-        if tree_node.type in target_types:
-            # Extract function name
-            name_node = None
-            for child in tree_node.children:
-                if child.type == 'identifier':
-                    name_node = child
-                    break
-            
-            name = source_code[name_node.start_byte:name_node.end_byte].decode('utf-8') if name_node else 'anonymous'
-            
-            code = source_code[tree_node.start_byte:tree_node.end_byte].decode('utf-8')
-            
-            functions.append({
-                'name': name,
-                'type': tree_node.type,
-                'code': code,
-                'start_line': tree_node.start_point[0],
-                'end_line': tree_node.end_point[0],
+    async def _embed_texts(self, texts: List[str]) -> List[array]:
+        """
+        Embed texts, output order matching input. Each distinct text is
+        embedded once (copy-pasted functions and stubs repeat); texts already
+        in the embedding cache skip the API, and the rest are sent in
+        EMBEDDING_BATCH_SIZE chunks with up to EMBEDDING_CONCURRENCY
+        requests in flight.
+        """
+        if not texts:
+            return []
+        
+        unique_texts = list(dict.fromkeys(texts))
+        if len(unique_texts) < len(texts):
+            embedded = dict(zip(unique_texts, await self._embed_unique(unique_texts)))
+            return [embedded[text] for text in texts]
+        return await self._embed_unique(texts)
+    
+    async def _embed_unique(self, texts: List[str]) -> List[array]:
+        """Embed distinct texts, through the embedding cache when enabled"""
+        if self.embedding_cache is None:
+            return await self._embed_batches(texts)
+        
+        embeddings = await asyncio.to_thread(self.embedding_cache.get_many, texts)
+        misses = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        logger.debug("Embedding cache", hits=len(texts) - len(misses), misses=len(misses))
+        if not misses:
+            return embeddings
+        
+        miss_texts = [texts[i] for i in misses]
+        fresh = await self._embed_batches(miss_texts)
+        for i, embedding in zip(misses, fresh):
+            embeddings[i] = embedding
+        
+        # Zero vectors are failed batches; leave them to be retried next time
+        stored = [(text, embedding) for text, embedding in zip(miss_texts, fresh) if any(embedding)]
+        if stored:
+            await asyncio.to_thread(
+                self.embedding_cache.put_many,
+                [text for text, _ in stored],
+                [embedding for _, embedding in stored]
+            )
+        return embeddings
+    
+    async def _embed_batches(self, texts: List[str]) -> List[array]:
+        """
+        Embed texts in concurrent batches, returned in input order.
+        
+        Texts are sorted by token count before batching, so each request
+        holds similar-sized inputs and one long function doesn't stretch a
+        batch of stubs; a batch closes at EMBEDDING_BATCH_SIZE texts or
+        EMBEDDING_BATCH_TOKENS tokens, the limit OpenAI actually enforces.
+        
+        In-flight requests are bounded per indexer, not per call: concurrent
+        indexing jobs share EMBEDDING_CONCURRENCY slots instead of each
+        adding their own to the OpenAI rate limit.
+        """
+        if self._embedding_slots is None:
+            self._embedding_slots = asyncio.Semaphore(self.EMBEDDING_CONCURRENCY)
+        semaphore = self._embedding_slots
+        
+        async def embed_batch(batch_texts: List[str]) -> List[array]:
+            async with semaphore:
+                return await self._create_embeddings_batch(batch_texts)
+        
+        # Tokens of what is actually sent; tokenizing is CPU work (and may
+        # load the tokenizer), so keep it off the loop
+        tokens = await asyncio.to_thread(
+            _count_tokens, [text[:self.EMBEDDING_INPUT_CHARS] for text in texts]
+        )
+        
+        # Batches of text indices, packed shortest first
+        batches = []
+        batch, batch_tokens = [], 0
+        for i in sorted(range(len(texts)), key=tokens.__getitem__):
+            if batch and (
+                len(batch) == self.EMBEDDING_BATCH_SIZE
+                or batch_tokens + tokens[i] > self.EMBEDDING_BATCH_TOKENS
+            ):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append(i)
+            batch_tokens += tokens[i]
+        if batch:
+            batches.append(batch)
+        
+        results = await asyncio.gather(*[
+            embed_batch([texts[i] for i in batch]) for batch in batches
+        ])
+        
+        # Scatter back to input order
+        embeddings = [None] * len(texts)
+        for batch, batch_embeddings in zip(batches, results):
+            for i, embedding in zip(batch, batch_embeddings):
+                embeddings[i] = embedding
+        return embeddings
+    
+    def _build_vectors(
+        self,
+        repo_id: str,
+        functions: List[Dict],
+        embeddings: List[array]
+    ) -> List[Dict]:
+        """
+        Pinecone records for extracted functions and their embeddings.
+        
+        Functions whose embedding failed (zero vector) are skipped: Pinecone
+        rejects all-zero vectors, and they would never match a query anyway.
+        """
+        # Rounding only shrinks JSON; gRPC would send the same bytes
+        quantize = EMBEDDING_DTYPE == "int8" and not self._pinecone_grpc
+        vectors = []
+        failed = 0
+        
+        for func_data, embedding in zip(functions, embeddings):
+            if not any(embedding):
+                failed += 1
+                continue
+            vectors.append({
+                "id": _vector_id(repo_id, func_data['file_path'], func_data['start_line']),
+                # Python floats only here, one record at a time
+                "values": _quantize_int8(embedding) if quantize else embedding.tolist(),
+                "metadata": {
+                    "repo_id": repo_id,
+                    "file_path": func_data['file_path'],
+                    "name": func_data['name'],
+                    "type": func_data['type'],
+                    "code": func_data['code'][:METADATA_CODE_CHARS],
+                    "start_line": func_data['start_line'],
+                    "end_line": func_data['end_line'],
+                    "language": func_data['language']
+                }
             })
         
-        # Recursively search children
-        for child in tree_node.children:
-            functions.extend(self._extract_functions(child, source_code))
+        if failed:
+            logger.warning("Skipping functions without embeddings", repo_id=repo_id, count=failed)
+        return vectors
+    
+    def _upsert_vectors(self, vectors: List[Dict]) -> None:
+        """
+        Upsert vectors in PINECONE_UPSERT_BATCH chunks, keeping up to
+        PINECONE_UPSERT_CONCURRENCY requests in flight. Blocking; run it
+        off the event loop.
+        """
+        batches = [
+            vectors[i:i + self.PINECONE_UPSERT_BATCH]
+            for i in range(0, len(vectors), self.PINECONE_UPSERT_BATCH)
+        ]
+        if len(batches) <= 1:
+            for batch in batches:
+                self._upsert_batch(batch)
+            return
         
-        return functions
+        workers = min(len(batches), self.PINECONE_UPSERT_CONCURRENCY)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # list() re-raises the first failed upsert
+            list(pool.map(self._upsert_batch, batches))
+    
+    def _upsert_batch(self, batch: List[Dict]) -> None:
+        """Upsert one batch, backing off and retrying transient failures"""
+        _call_with_pinecone_retry(self.index.upsert, vectors=batch)
+    
+    def _delete_file_vectors(self, repo_id: str, file_paths: List[str]) -> None:
+        """
+        Delete every vector of the given files, so functions that were
+        removed, renamed or moved don't linger in search results. Blocking;
+        run it off the event loop.
+        """
+        for i in range(0, len(file_paths), self.PINECONE_DELETE_BATCH):
+            vector_filter = {
+                "repo_id": {"$eq": repo_id},
+                "file_path": {"$in": file_paths[i:i + self.PINECONE_DELETE_BATCH]}
+            }
+            try:
+                _call_with_pinecone_retry(self.index.delete, filter=vector_filter)
+            except Exception as e:
+                # Some index types and API versions reject delete-by-filter
+                logger.warning("Delete by filter failed, deleting by ID", repo_id=repo_id, error=str(e))
+                self._delete_vectors_by_query(vector_filter)
+    
+    def _delete_vectors_by_query(self, vector_filter: Dict) -> None:
+        """Delete the vectors matching a metadata filter by finding their IDs first"""
+        seen = set()
+        while True:
+            results = _call_with_pinecone_retry(
+                self.index.query,
+                vector=_probe_vector(),
+                filter=vector_filter,
+                top_k=self.PINECONE_DELETE_QUERY_TOP_K,
+                include_metadata=False
+            )
+            ids = [match.id for match in results.matches if match.id not in seen]
+            # Done when nothing new matches (deletes may not be visible to queries yet)
+            if not ids:
+                return
+            _call_with_pinecone_retry(self.index.delete, ids=ids)
+            if len(results.matches) < self.PINECONE_DELETE_QUERY_TOP_K:
+                return
+            seen.update(ids)
+    
+    def _extract_functions(self, tree_node, source_code: bytes, language: str) -> List[Dict]:
+        """Extract function/class definitions from AST"""
+        return _extract_definitions(tree_node, source_code, language)
+    
+    def _get_parse_pool(self) -> ProcessPoolExecutor:
+        """Worker processes for parsing, started on first use"""
+        if self._parse_pool is None:
+            # spawn: forking a threaded server process can deadlock on held locks
+            self._parse_pool = ProcessPoolExecutor(
+                max_workers=MAX_PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._parse_pool
+    
+    def close(self) -> None:
+        """Stop the parse worker processes (they are restarted on next use)"""
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown(wait=False, cancel_futures=True)
+            self._parse_pool = None
+    
+    async def _parse_file(self, file_path: str, language: str) -> List[Dict]:
+        """
+        Parse a file and extract its definitions, in the process pool when
+        enabled, else on a thread so the read and parse don't block the loop.
+        """
+        if MAX_PARSE_WORKERS > 1:
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(
+                    self._get_parse_pool(), _parse_file_worker, file_path, language
+                )
+            except BrokenProcessPool as e:
+                logger.warning("Parse worker failed, parsing in-process", file_path=file_path, error=str(e))
+                self._parse_pool = None
+        
+        return await asyncio.to_thread(_parse_file_worker, file_path, language)
     
     async def index_repository(self, repo_id: str, repo_path: str):
         """Index all code in a repository - OPTIMIZED VERSION"""
@@ -214,98 +732,97 @@ class OptimizedCodeIndexer:
             logger.warning("No code files found", repo_id=repo_id)
             return 0
         
-        # Extract all functions from all files (parallel)
-        all_functions_data = []
+        add_breadcrumb("Indexing files", category="indexing", file_count=len(code_files))
+        logger.info("Indexing files", batch_size=self.EMBEDDING_BATCH_SIZE, concurrency=self.EMBEDDING_CONCURRENCY, model=EMBEDDING_MODEL)
         
-        add_breadcrumb("Extracting functions", category="indexing", file_count=len(code_files))
-        for i in range(0, len(code_files), self.FILE_BATCH_SIZE):
-            batch = code_files[i:i + self.FILE_BATCH_SIZE]
-            
-            # Extract functions in parallel
-            batch_results = await asyncio.gather(
-                *[self._extract_functions_from_file(repo_id, str(file_path)) 
-                  for file_path in batch],
-                return_exceptions=True
-            )
-            
-            # Collect valid results
-            for result in batch_results:
-                if isinstance(result, list):
-                    all_functions_data.extend(result)
-            
-            processed = min(i + self.FILE_BATCH_SIZE, len(code_files))
-            logger.debug("File batch processed", processed=processed, total=len(code_files), functions=len(all_functions_data))
+        with track_time("index_pipeline", repo_id=repo_id, files=len(code_files)):
+            total_functions = await self._index_files(repo_id, code_files)
         
-        if not all_functions_data:
+        if not total_functions:
             logger.warning("No functions extracted", repo_id=repo_id)
             return 0
         
-        logger.info("Functions extracted", repo_id=repo_id, count=len(all_functions_data))
-        add_breadcrumb("Functions extracted", category="indexing", count=len(all_functions_data))
-        
-        # Generate embeddings in BATCHES (this is the key optimization)
-        logger.info("Generating embeddings", batch_size=self.EMBEDDING_BATCH_SIZE, model=EMBEDDING_MODEL)
-        
-        # Create rich embedding texts using search enhancer
-        embedding_texts = [
-            self.search_enhancer.create_rich_embedding_text(func)
-            for func in all_functions_data
-        ]
-        
-        all_embeddings = []
-        with track_time("embedding_generation", repo_id=repo_id, total=len(embedding_texts)):
-            for i in range(0, len(embedding_texts), self.EMBEDDING_BATCH_SIZE):
-                batch_texts = embedding_texts[i:i + self.EMBEDDING_BATCH_SIZE]
-                batch_embeddings = await self._create_embeddings_batch(batch_texts)
-                all_embeddings.extend(batch_embeddings)
-                
-                logger.debug("Embeddings generated", progress=len(all_embeddings), total=len(embedding_texts))
-        
-        # Prepare vectors for Pinecone
-        add_breadcrumb("Uploading to Pinecone", category="indexing", vector_count=len(all_functions_data))
-        vectors_to_upsert = []
-        
-        for func_data, embedding in zip(all_functions_data, all_embeddings):
-            func_id = hashlib.md5(
-                f"{repo_id}:{func_data['file_path']}:{func_data['start_line']}".encode()
-            ).hexdigest()
-            
-            vectors_to_upsert.append({
-                "id": func_id,
-                "values": embedding,
-                "metadata": {
-                    "repo_id": repo_id,
-                    "file_path": func_data['file_path'],
-                    "name": func_data['name'],
-                    "type": func_data['type'],
-                    "code": func_data['code'][:1000],
-                    "start_line": func_data['start_line'],
-                    "end_line": func_data['end_line'],
-                    "language": func_data['language']
-                }
-            })
-        
-        # Upsert to Pinecone in batches
-        with track_time("pinecone_upload", repo_id=repo_id, vectors=len(vectors_to_upsert)):
-            for i in range(0, len(vectors_to_upsert), self.PINECONE_UPSERT_BATCH):
-                batch = vectors_to_upsert[i:i + self.PINECONE_UPSERT_BATCH]
-                self.index.upsert(vectors=batch)
-                logger.debug("Vectors uploaded", progress=min(i + self.PINECONE_UPSERT_BATCH, len(vectors_to_upsert)), total=len(vectors_to_upsert))
-        
         elapsed = time.time() - start_time
-        speed = len(all_functions_data) / elapsed if elapsed > 0 else 0
+        speed = total_functions / elapsed if elapsed > 0 else 0
         
         logger.info(
             "Indexing complete",
             repo_id=repo_id,
-            functions=len(all_functions_data),
+            functions=total_functions,
             duration_s=round(elapsed, 2),
             speed=round(speed, 1)
         )
         metrics.increment("indexing_completed")
         metrics.timing("indexing_duration_s", elapsed)
         
-        return len(all_functions_data)
+        return total_functions
+    
+    async def _index_files(self, repo_id: str, code_files: List[str], progress_callback=None) -> int:
+        """
+        Parse, embed and upsert files as a pipeline; returns functions indexed.
+        
+        Extraction feeds EMBEDDING_BATCH_SIZE batches of functions into a
+        bounded queue drained by EMBEDDING_CONCURRENCY workers, each embedding
+        and upserting its batch. Parsing, embedding and upload overlap, and
+        only a few batches are in memory at once. progress_callback, if given,
+        is awaited after each file batch with (files_processed,
+        functions_extracted, total_files).
+        """
+        batch_size = self.EMBEDDING_BATCH_SIZE
+        workers = self.EMBEDDING_CONCURRENCY
+        queue: asyncio.Queue = asyncio.Queue(maxsize=workers)
+        total_files = len(code_files)
+        extracted = 0
+        
+        async def extract():
+            nonlocal extracted
+            pending: List[Dict] = []
+            for i in range(0, total_files, self.FILE_BATCH_SIZE):
+                batch = code_files[i:i + self.FILE_BATCH_SIZE]
+                
+                # Extract functions in parallel
+                batch_results = await asyncio.gather(
+                    *[self._extract_functions_from_file(repo_id, file_path) 
+                      for file_path in batch],
+                    return_exceptions=True
+                )
+                for result in batch_results:
+                    if isinstance(result, list):
+                        pending.extend(result)
+                        extracted += len(result)
+                
+                while len(pending) >= batch_size:
+                    await queue.put(pending[:batch_size])
+                    del pending[:batch_size]
+                
+                processed = min(i + self.FILE_BATCH_SIZE, total_files)
+                if progress_callback:
+                    await progress_callback(processed, extracted, total_files)
+                logger.debug("File batch processed", processed=processed, total=total_files, functions=extracted)
+            
+            if pending:
+                await queue.put(pending)
+            for _ in range(workers):
+                await queue.put(None)
+        
+        async def embed_and_upsert():
+            while (functions := await queue.get()) is not None:
+                # Rich embedding texts from the search enhancer
+                texts = [self.search_enhancer.create_rich_embedding_text(func) for func in functions]
+                embeddings = await self._embed_texts(texts)
+                vectors = self._build_vectors(repo_id, functions, embeddings)
+                await asyncio.to_thread(self._upsert_vectors, vectors)
+        
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(extract())
+                for _ in range(workers):
+                    group.create_task(embed_and_upsert())
+        except ExceptionGroup as e:
+            # Surface the failure itself (e.g. a Pinecone error) to callers
+            raise e.exceptions[0]
+        
+        return extracted
     
     async def _extract_functions_from_file(
         self, 
@@ -316,18 +833,11 @@ class OptimizedCodeIndexer:
         try:
             # Detect language
             language = self._detect_language(file_path)
-            if not language or language not in self.parsers:
+            if not language or language not in LANGUAGES:
                 return []
             
-            # Read file
-            with open(file_path, 'rb') as f:
-                source_code = f.read()
-            
-            # Parse with tree-sitter
-            tree = self.parsers[language].parse(source_code)
-            
-            # Extract functions
-            functions = self._extract_functions(tree.root_node, source_code)
+            # Read, parse with tree-sitter and extract functions
+            functions = await self._parse_file(file_path, language)
             
             # Add metadata to each function
             for func in functions:
@@ -370,11 +880,14 @@ class OptimizedCodeIndexer:
             
             # Step 2: Generate query embedding
             query_embeddings = await self._create_embeddings_batch([search_query])
-            query_embedding = query_embeddings[0]
+            query_embedding = query_embeddings[0].tolist()
             
             # Step 3: Search Pinecone (retrieve more for reranking)
             retrieve_count = max_results * 3 if use_reranking else max_results
-            results = self.index.query(
+            # Off the loop: retries sleep between attempts
+            results = await asyncio.to_thread(
+                _call_with_pinecone_retry,
+                self.index.query,
                 vector=query_embedding,
                 filter={"repo_id": {"$eq": repo_id}},
                 top_k=retrieve_count,
@@ -422,22 +935,13 @@ class OptimizedCodeIndexer:
     ) -> str:
         """Generate natural language explanation of code"""
         try:
-            # Read the file
-            with open(file_path, 'r') as f:
-                code_content = f.read()
-            
-            # If function_name provided, try to find it
+            # Indexed functions carry their code in Pinecone metadata
+            code_content = None
             if function_name:
-                language = self._detect_language(file_path)
-                if language and language in self.parsers:
-                    tree = self.parsers[language].parse(code_content.encode('utf-8'))
-                    functions = self._extract_functions(tree.root_node, code_content.encode('utf-8'))
-                    
-                    # Find matching function
-                    for func in functions:
-                        if func['name'] == function_name:
-                            code_content = func['code']
-                            break
+                code_content = await self._lookup_indexed_code(repo_id, file_path, function_name)
+            
+            if code_content is None:
+                code_content = await asyncio.to_thread(self._read_function_code, file_path, function_name)
             
             # Use OpenAI to explain
             response = await self.openai_client.chat.completions.create(
@@ -463,6 +967,51 @@ class OptimizedCodeIndexer:
             capture_exception(e, operation="explain_code", file_path=file_path)
             return f"Error: {str(e)}"
 
+    async def _lookup_indexed_code(
+        self,
+        repo_id: str,
+        file_path: str,
+        function_name: str
+    ) -> Optional[str]:
+        """Code of an indexed function from its Pinecone metadata, unless truncated there"""
+        try:
+            results = await asyncio.to_thread(
+                _call_with_pinecone_retry,
+                self.index.query,
+                vector=_probe_vector(),
+                filter={
+                    "repo_id": {"$eq": repo_id},
+                    "file_path": {"$eq": file_path},
+                    "name": {"$eq": function_name},
+                },
+                top_k=1,
+                include_metadata=True
+            )
+        except Exception as e:
+            logger.warning("Metadata lookup failed, reading file", file_path=file_path, error=str(e))
+            return None
+        
+        for match in results.matches:
+            code = match.metadata.get("code", "")
+            if code and len(code) < METADATA_CODE_CHARS:
+                return code
+        return None
+    
+    def _read_function_code(self, file_path: str, function_name: Optional[str]) -> str:
+        """File contents, narrowed to the named function when it can be found"""
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+            code_content = f.read()
+        
+        language = self._detect_language(file_path)
+        if function_name and language:
+            source_code = code_content.encode('utf-8')
+            tree = _get_parser(language).parse(source_code)
+            for func in self._extract_functions(tree.root_node, source_code, language):
+                if func['name'] == function_name:
+                    return func['code']
+        
+        return code_content
+    
     async def index_repository_with_progress(
         self,
         repo_id: str,
@@ -495,93 +1044,16 @@ class OptimizedCodeIndexer:
             await progress_callback(0, 0, 0)
             return 0
         
-        # Extract all functions from all files
-        all_functions_data = []
-        files_processed = 0
-        
-        logger.debug("Extracting functions from files")
-        for i in range(0, len(code_files), self.FILE_BATCH_SIZE):
-            batch = code_files[i:i + self.FILE_BATCH_SIZE]
-            
-            # Extract functions in parallel
-            batch_results = await asyncio.gather(
-                *[self._extract_functions_from_file(repo_id, str(file_path)) 
-                  for file_path in batch],
-                return_exceptions=True
-            )
-            
-            # Collect valid results
-            for result in batch_results:
-                if isinstance(result, list):
-                    all_functions_data.extend(result)
-            
-            files_processed = min(i + self.FILE_BATCH_SIZE, total_files)
-            
-            # Send progress update
-            await progress_callback(files_processed, len(all_functions_data), total_files)
-            
-            logger.debug("Processing files", 
-                        processed=files_processed, 
-                        total=total_files, 
-                        functions_extracted=len(all_functions_data))
-        
-        if not all_functions_data:
-            return 0
-        
-        # Generate embeddings in BATCHES
-        logger.debug("Generating embeddings in batches", batch_size=self.EMBEDDING_BATCH_SIZE)
-        
-        # Create rich embedding texts using search enhancer
-        embedding_texts = [
-            self.search_enhancer.create_rich_embedding_text(func)
-            for func in all_functions_data
-        ]
-        
-        all_embeddings = []
-        for i in range(0, len(embedding_texts), self.EMBEDDING_BATCH_SIZE):
-            batch_texts = embedding_texts[i:i + self.EMBEDDING_BATCH_SIZE]
-            batch_embeddings = await self._create_embeddings_batch(batch_texts)
-            all_embeddings.extend(batch_embeddings)
-            
-            logger.debug("Embeddings generated", completed=len(all_embeddings), total=len(embedding_texts))
-        
-        # Prepare vectors for Pinecone
-        logger.debug("Uploading to Pinecone")
-        vectors_to_upsert = []
-        
-        for func_data, embedding in zip(all_functions_data, all_embeddings):
-            func_id = hashlib.md5(
-                f"{repo_id}:{func_data['file_path']}:{func_data['start_line']}".encode()
-            ).hexdigest()
-            
-            vectors_to_upsert.append({
-                "id": func_id,
-                "values": embedding,
-                "metadata": {
-                    "repo_id": repo_id,
-                    "file_path": func_data['file_path'],
-                    "name": func_data['name'],
-                    "type": func_data['type'],
-                    "code": func_data['code'][:1000],
-                    "start_line": func_data['start_line'],
-                    "end_line": func_data['end_line'],
-                    "language": func_data['language']
-                }
-            })
-        
-        # Upsert to Pinecone in batches
-        for i in range(0, len(vectors_to_upsert), self.PINECONE_UPSERT_BATCH):
-            batch = vectors_to_upsert[i:i + self.PINECONE_UPSERT_BATCH]
-            self.index.upsert(vectors=batch)
+        total_functions = await self._index_files(repo_id, code_files, progress_callback)
         
         elapsed = time.time() - start_time
         logger.info("Indexing with progress complete",
                     repo_id=repo_id,
-                    total_functions=len(all_functions_data),
+                    total_functions=total_functions,
                     duration_s=round(elapsed, 2),
-                    speed=round(len(all_functions_data)/elapsed, 1) if elapsed > 0 else 0)
+                    speed=round(total_functions/elapsed, 1) if elapsed > 0 else 0)
         
-        return len(all_functions_data)
+        return total_functions
 
     async def incremental_index_repository(
         self, 
@@ -604,96 +1076,69 @@ class OptimizedCodeIndexer:
             
             # Get changed files
             if last_commit_sha:
-                diff = repo.git.diff(last_commit_sha, current_commit, '--name-only')
-                changed_files = diff.split('\n') if diff else []
+                # One git process in the common case. Repos are shallow clones,
+                # so if the last indexed commit is missing locally, fetch just
+                # its trees (no blobs) and diff again.
+                try:
+                    diff = repo.git.diff(last_commit_sha, current_commit, '--name-status', '-z')
+                except git.GitCommandError:
+                    logger.debug("Fetching last indexed commit", last_commit=last_commit_sha[:8])
+                    repo.git.fetch('--depth=1', '--filter=blob:none', 'origin', last_commit_sha)
+                    diff = repo.git.diff(last_commit_sha, current_commit, '--name-status', '-z')
+                
+                # Added/modified/renamed-to files get re-indexed; deleted and
+                # renamed-from files only lose their vectors
+                changed_files, removed_files = _parse_name_status(diff)
             else:
                 # No previous commit, index everything
                 logger.warning("No previous commit - doing full index")
                 return await self.index_repository(repo_id, repo_path)
             
             # Filter for code files only
-            code_extensions = {'.py', '.js', '.jsx', '.ts', '.tsx'}
-            changed_code_files = [
-                f for f in changed_files 
-                if Path(f).suffix in code_extensions
+            changed_paths = [
+                os.path.join(repo_path, f) for f in changed_files
+                if f.endswith(CODE_EXTENSIONS)
             ]
+            removed_paths = [
+                os.path.join(repo_path, f) for f in removed_files
+                if f.endswith(CODE_EXTENSIONS)
+            ]
+            changed_code_files = changed_paths + removed_paths
             
-            logger.info("Found changed files", total_changes=len(changed_files), code_files=len(changed_code_files))
+            logger.info("Found changed files",
+                        total_changes=len(changed_files) + len(removed_files),
+                        code_files=len(changed_code_files),
+                        removed=len(removed_paths))
             
             if not changed_code_files:
                 logger.info("No code changes detected - skipping indexing")
                 return 0
             
-            # Extract functions from changed files
-            all_functions_data = []
-            
-            for file_path in changed_code_files:
-                full_path = Path(repo_path) / file_path
-                if not full_path.exists():
-                    logger.debug("File deleted - skipping", file_path=file_path)
-                    continue
-                
-                functions = await self._extract_functions_from_file(repo_id, str(full_path))
-                all_functions_data.extend(functions)
-                logger.debug("Processed changed file", file_path=file_path, functions=len(functions))
+            # Drop the old vectors of every changed file before re-indexing it;
+            # removed files only get this step
+            try:
+                await asyncio.to_thread(self._delete_file_vectors, repo_id, changed_code_files)
+            except Exception as e:
+                # Stale results are better than a failed index, but they need to be seen
+                logger.warning("Failed to delete stale vectors", repo_id=repo_id, error=str(e))
+                metrics.increment("stale_vector_delete_failed")
+                capture_exception(e, operation="delete_stale_vectors", repo_id=repo_id)
             
-            if not all_functions_data:
+            total_functions = await self._index_files(repo_id, changed_paths)
+            if not total_functions:
                 logger.info("No functions to index")
                 return 0
             
-            # Generate embeddings in batches
-            logger.debug("Generating embeddings", function_count=len(all_functions_data))
-            
-            # Create rich embedding texts using search enhancer
-            embedding_texts = [
-                self.search_enhancer.create_rich_embedding_text(func)
-                for func in all_functions_data
-            ]
-            
-            all_embeddings = []
-            for i in range(0, len(embedding_texts), self.EMBEDDING_BATCH_SIZE):
-                batch_texts = embedding_texts[i:i + self.EMBEDDING_BATCH_SIZE]
-                batch_embeddings = await self._create_embeddings_batch(batch_texts)
-                all_embeddings.extend(batch_embeddings)
-            
-            # Prepare vectors
-            vectors_to_upsert = []
-            
-            for func_data, embedding in zip(all_functions_data, all_embeddings):
-                func_id = hashlib.md5(
-                    f"{repo_id}:{func_data['file_path']}:{func_data['start_line']}".encode()
-                ).hexdigest()
-                
-                vectors_to_upsert.append({
-                    "id": func_id,
-                    "values": embedding,
-                    "metadata": {
-                        "repo_id": repo_id,
-                        "file_path": func_data['file_path'],
-                        "name": func_data['name'],
-                        "type": func_data['type'],
-                        "code": func_data['code'][:1000],
-                        "start_line": func_data['start_line'],
-                        "end_line": func_data['end_line'],
-                        "language": func_data['language']
-                    }
-                })
-            
-            # Upsert to Pinecone
-            for i in range(0, len(vectors_to_upsert), self.PINECONE_UPSERT_BATCH):
-                batch = vectors_to_upsert[i:i + self.PINECONE_UPSERT_BATCH]
-                self.index.upsert(vectors=batch)
-            
             elapsed = time.time() - start_time
             
             logger.info("Incremental indexing complete",
                         repo_id=repo_id,
                         changed_files=len(changed_code_files),
-                        functions_updated=len(all_functions_data),
+                        functions_updated=total_functions,
                         duration_s=round(elapsed, 2),
-                        speed=round(len(all_functions_data)/elapsed, 1) if elapsed > 0 else 0)
+                        speed=round(total_functions/elapsed, 1) if elapsed > 0 else 0)
             
-            return len(all_functions_data)
+            return total_functions
             
         except Exception as e:
             logger.error("Incremental indexing error - falling back to full index", 
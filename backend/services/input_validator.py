@@ -53,6 +53,14 @@ class InputValidator:
         '\\\\',         # UNC paths
     ]
     
+    # Format patterns, compiled once
+    SSH_URL_PATTERN = re.compile(r'^git@[\w.-]+:[\w.-]+/[\w.-]+(?:\.git)?$')  # git@host:owner/repo[.git]
+    URL_PATH_PATTERN = re.compile(r'^/[\w.-]+/[\w.-]+(?:\.git)?(?:/.*)?$')  # /owner/repo[.git][/...]
+    REPO_NAME_PATTERN = re.compile(r'^[a-zA-Z0-9._-]+$')
+    
+    # ASCII control characters except tab and newline, for str.translate
+    CONTROL_CHARS_TABLE = dict.fromkeys(c for c in (*range(32), 127) if c not in (9, 10))
+    
     # Max sizes
     MAX_QUERY_LENGTH = 500
     MAX_FILE_PATH_LENGTH = 500
@@ -189,8 +197,7 @@ class InputValidator:
                     return False, f"Host '{host}' not in allowed list. Allowed: {', '.join(sorted(allowed_hosts))}"
                 
                 # Validate format: git@host:owner/repo[.git]
-                ssh_pattern = r'^git@[\w.-]+:[\w.-]+/[\w.-]+(?:\.git)?$'
-                if not re.match(ssh_pattern, git_url):
+                if not InputValidator.SSH_URL_PATTERN.match(git_url):
                     return False, "Invalid SSH URL format. Expected: git@host:owner/repo.git"
                 
                 return True, None
@@ -224,8 +231,7 @@ class InputValidator:
                 return False, "Invalid repository URL: missing owner/repo path"
             
             # Path should be /owner/repo or /owner/repo.git
-            path_pattern = r'^/[\w.-]+/[\w.-]+(?:\.git)?(?:/.*)?$'
-            if not re.match(path_pattern, path):
+            if not InputValidator.URL_PATH_PATTERN.match(path):
                 return False, "Invalid repository URL format. Expected: https://host/owner/repo"
             
             return True, None
@@ -305,7 +311,7 @@ class InputValidator:
             return False, "Repository name too long or empty"
         
         # Allow alphanumeric, dash, underscore, dot
-        if not re.match(r'^[a-zA-Z0-9._-]+$', name):
+        if not InputValidator.REPO_NAME_PATTERN.match(name):
             return False, "Repository name contains invalid characters"
         
         return True, None
@@ -323,8 +329,12 @@ class InputValidator:
         if len(sanitized) > max_length:
             sanitized = sanitized[:max_length]
         
-        # Remove control characters except newline/tab
-        sanitized = ''.join(char for char in sanitized if char.isprintable() or char in '\n\t')
+        # Remove control characters except newline/tab. ASCII controls go in
+        # one C pass; only text with non-ASCII characters needs the per-char
+        # isprintable() check (C1 controls, bidi overrides, odd spaces)
+        sanitized = sanitized.translate(InputValidator.CONTROL_CHARS_TABLE)
+        if not sanitized.isascii():
+            sanitized = ''.join(char for char in sanitized if char.isprintable() or char in '\n\t')
         
         return sanitized.strip()
 
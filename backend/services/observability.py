@@ -20,6 +20,7 @@ import time
 import logging
 import json
 from typing import Optional, Any, Dict
+from collections import deque, defaultdict
 from functools import wraps
 from contextlib import contextmanager
 from datetime import datetime
@@ -322,27 +323,25 @@ class Metrics:
     """
     
     def __init__(self):
-        self._counters: Dict[str, int] = {}
-        self._timings: Dict[str, list] = {}
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._timings: Dict[str, deque] = {}
     
     def increment(self, name: str, value: int = 1, **tags):
-        """Increment a counter"""
-        key = f"{name}"
-        self._counters[key] = self._counters.get(key, 0) + value
+        """Increment a counter (hot path: a single in-place dict update)"""
+        self._counters[name] += value
     
     def timing(self, name: str, value_ms: float):
         """Record a timing measurement"""
-        if name not in self._timings:
-            self._timings[name] = []
-        self._timings[name].append(value_ms)
-        # Keep only last 1000 timings
-        if len(self._timings[name]) > 1000:
-            self._timings[name] = self._timings[name][-1000:]
+        # Keep only last 1000 timings (bounded deque drops the oldest in O(1))
+        timings = self._timings.get(name)
+        if timings is None:
+            timings = self._timings.setdefault(name, deque(maxlen=1000))
+        timings.append(value_ms)
     
     def get_stats(self) -> Dict:
         """Get all metrics with basic stats"""
         stats = {
-            "counters": self._counters.copy(),
+            "counters": dict(self._counters),
             "timings": {}
         }
         
@@ -359,7 +358,7 @@ class Metrics:
     
     def reset(self):
         """Reset all metrics"""
-        self._counters = {}
+        self._counters = defaultdict(int)
         self._timings = {}
 
 
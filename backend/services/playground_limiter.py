@@ -188,6 +188,9 @@ class PlaygroundLimiter:
     TTL_DAY = 86400      # 24 hours
     TTL_HOUR = 3600      # 1 hour
 
+    # Every Nth increment re-checks that a counter key still has a TTL
+    TTL_CHECK_INTERVAL = 100
+
     def __init__(self, redis_client=None):
         """
         Initialize the limiter.
@@ -331,6 +334,10 @@ class PlaygroundLimiter:
                 # Store in hash (preserves other fields like searches_used)
                 self.redis.hset(session_key, self.FIELD_INDEXED_REPO, repo_json)
 
+                # HSET on an expired session recreates it without a TTL
+                if self.redis.ttl(session_key) < 0:
+                    self.redis.expire(session_key, self.TTL_DAY)
+
                 metrics.increment("session_repo_indexed")
                 logger.info("Indexed repo stored in session",
                             session_token=session_token[:8],
@@ -587,9 +594,7 @@ class PlaygroundLimiter:
         """Check global circuit breaker."""
         try:
             if record:
-                count = self.redis.incr(self.KEY_GLOBAL)
-                if count == 1:
-                    self.redis.expire(self.KEY_GLOBAL, self.TTL_HOUR)
+                count = self._incr_with_ttl(self.KEY_GLOBAL, self.TTL_HOUR)
             else:
                 count = int(self.redis.get(self.KEY_GLOBAL) or 0)
 
@@ -644,9 +649,7 @@ class PlaygroundLimiter:
             ip_key = f"{self.KEY_IP}{ip_hash}"
 
             if record:
-                count = self.redis.incr(ip_key)
-                if count == 1:
-                    self.redis.expire(ip_key, self.TTL_DAY)
+                count = self._incr_with_ttl(ip_key, self.TTL_DAY)
             else:
                 count = int(self.redis.get(ip_key) or 0)
 
@@ -661,6 +664,23 @@ class PlaygroundLimiter:
     # Helper Methods
     # -------------------------------------------------------------------------
 
+    def _incr_with_ttl(self, key: str, ttl: int) -> int:
+        """
+        Increment a counter key, keeping it bounded by a TTL.
+
+        The TTL is set on the first increment. If that EXPIRE was lost
+        (e.g. timeout between INCR and EXPIRE) the key would never be
+        evicted, so every TTL_CHECK_INTERVAL increments the TTL is lazily
+        re-applied. Keeps the key space bounded without a cleanup job.
+        """
+        count = self.redis.incr(key)
+        if count == 1:
+            self.redis.expire(key, ttl)
+        elif count % self.TTL_CHECK_INTERVAL == 0 and self.redis.ttl(key) < 0:
+            logger.warning("Counter key missing TTL, re-applying", key=key)
+            self.redis.expire(key, ttl)
+        return count
+
     def _get_midnight_utc(self) -> datetime:
         """Get next midnight UTC for reset time."""
         now = datetime.now(timezone.utc)
@@ -48,6 +48,7 @@ class RateLimiter:
             return True, None
         
         limit = self.limits.get(tier, self.limits['free'])
+        # Wall clock on purpose: window keys are shared across workers via Redis
         now = time.time()
         
         # Keys for different time windows
@@ -109,7 +109,15 @@ class RepositoryManager:
             # Clone the repository
             logger.info("Cloning repository", git_url=git_url, local_path=str(local_path))
             metrics.increment("repos_cloned")
-            git.Repo.clone_from(git_url, local_path, branch=branch, depth=1)
+            # Indexing only reads HEAD: shallow, single branch, no tags
+            git.Repo.clone_from(
+                git_url,
+                local_path,
+                branch=branch,
+                depth=1,
+                single_branch=True,
+                no_tags=True
+            )
             
             # Create DB record with ownership
             repo = self.db.create_repository(
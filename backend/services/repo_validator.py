@@ -4,6 +4,7 @@ Analyzes repository size before indexing to enforce tier limits.
 
 Part of #94 (repo size limits) implementation.
 """
+import os
 from pathlib import Path
 from dataclasses import dataclass
 from typing import Set, Optional
@@ -227,31 +228,36 @@ class RepoValidator:
         """
         Find all code files in repository (assumes path validated by caller).
         
+        Walks with an explicit stack of os.scandir() iterators so file type
+        comes from the directory entry (no extra stat per file) and skipped
+        directories are pruned before descending.
+        
         Returns:
             Tuple of (code_files, error_message)
             If error_message is not None, the scan was incomplete
         """
         code_files = []
-        repo_root = Path(repo_path)
         scan_error = None
+        stack = [repo_path]
         
         try:
-            for file_path in repo_root.rglob('*'):
-                # Skip directories
-                if file_path.is_dir():
-                    continue
-                
-                # Skip symlinks (security: prevent scanning outside repo)
-                if file_path.is_symlink():
-                    continue
-                
-                # Skip files in excluded directories
-                if any(skip_dir in file_path.parts for skip_dir in self.SKIP_DIRS):
-                    continue
-                
-                # Check extension
-                if file_path.suffix.lower() in self.CODE_EXTENSIONS:
-                    code_files.append(file_path)
+            while stack:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        # Skip symlinks (security: prevent scanning outside repo)
+                        if entry.is_symlink():
+                            continue
+                        
+                        if entry.is_dir(follow_symlinks=False):
+                            # Prune excluded directories
+                            if entry.name not in self.SKIP_DIRS:
+                                stack.append(entry.path)
+                            continue
+                        
+                        # Check extension
+                        _, ext = os.path.splitext(entry.name)
+                        if ext.lower() in self.CODE_EXTENSIONS:
+                            code_files.append(Path(entry.path))
                     
         except PermissionError as e:
             logger.warning("Permission denied during repo scan", error=str(e))
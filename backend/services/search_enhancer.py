@@ -10,6 +10,25 @@ import os
 
 from services.observability import logger, capture_exception
 
+# Patterns for the rich embedding text, compiled once (run on every indexed function)
+PY_DOCSTRING_PATTERNS = (
+    re.compile(r'"""(.*?)"""', re.DOTALL),  # Triple double quotes
+    re.compile(r"'''(.*?)'''", re.DOTALL),  # Triple single quotes
+)
+PY_DEF_COMMENT_PATTERN = re.compile(r'def\s+\w+[^:]+:\s*#\s*(.+)')
+JSDOC_PATTERN = re.compile(r'/\*\*(.*?)\*/', re.DOTALL)
+JSDOC_STAR_PATTERN = re.compile(r'\s*\*\s*')
+JS_LINE_COMMENT_PATTERN = re.compile(r'//\s*(.+)')
+PY_PARAMS_PATTERN = re.compile(r'def\s+\w+\s*\(([^)]*)\)')
+JS_PARAMS_PATTERN = re.compile(r'(?:function\s+\w+|(?:async\s+)?(?:const|let|var)?\s*\w+\s*=\s*(?:async\s*)?\(?|(?:async\s+)?)\s*\(([^)]*)\)')
+PARAM_NAME_END_PATTERN = re.compile(r'[:\=]')
+PY_RETURN_TYPE_PATTERN = re.compile(r'->\s*([^:]+):')
+TS_RETURN_TYPE_PATTERN = re.compile(r'\):\s*([^{]+)\s*{')
+CALL_PATTERN = re.compile(r'(\w+)\s*\(')
+CALL_KEYWORDS = frozenset({'if', 'for', 'while', 'with', 'def', 'class', 'return',
+                           'function', 'const', 'let', 'var', 'async', 'await'})
+MAX_CALLS = 15
+
 
 class SearchEnhancer:
     """Enhances search quality through various techniques"""
@@ -66,31 +85,27 @@ Output: authentication auth login verify user token jwt session authenticate val
         """Extract docstring/comment from function code"""
         if language == 'python':
             # Python docstrings
-            patterns = [
-                r'"""(.*?)"""',  # Triple double quotes
-                r"'''(.*?)'''",  # Triple single quotes
-            ]
-            for pattern in patterns:
-                match = re.search(pattern, code, re.DOTALL)
+            for pattern in PY_DOCSTRING_PATTERNS:
+                match = pattern.search(code)
                 if match:
                     return match.group(1).strip()[:200]
             
             # Single line comment after def
-            match = re.search(r'def\s+\w+[^:]+:\s*#\s*(.+)', code)
+            match = PY_DEF_COMMENT_PATTERN.search(code)
             if match:
                 return match.group(1).strip()
                 
         else:  # JavaScript/TypeScript
             # JSDoc comments
-            match = re.search(r'/\*\*(.*?)\*/', code, re.DOTALL)
+            match = JSDOC_PATTERN.search(code)
             if match:
                 doc = match.group(1)
                 # Clean up JSDoc formatting
-                doc = re.sub(r'\s*\*\s*', ' ', doc)
+                doc = JSDOC_STAR_PATTERN.sub(' ', doc)
                 return doc.strip()[:200]
             
             # Single line comments
-            match = re.search(r'//\s*(.+)', code)
+            match = JS_LINE_COMMENT_PATTERN.search(code)
             if match:
                 return match.group(1).strip()
         
@@ -102,7 +117,7 @@ Output: authentication auth login verify user token jwt session authenticate val
         
         if language == 'python':
             # Match def function_name(params):
-            match = re.search(r'def\s+\w+\s*\(([^)]*)\)', code)
+            match = PY_PARAMS_PATTERN.search(code)
             if match:
                 param_str = match.group(1)
                 # Extract parameter names (handle type hints)
@@ -110,19 +125,19 @@ Output: authentication auth login verify user token jwt session authenticate val
                     param = param.strip()
                     if param and param != 'self' and param != 'cls':
                         # Remove type hints and defaults
-                        param_name = re.split(r'[:\=]', param)[0].strip()
+                        param_name = PARAM_NAME_END_PATTERN.split(param)[0].strip()
                         if param_name and not param_name.startswith('*'):
                             params.append(param_name)
         else:  # JavaScript/TypeScript
             # Match function signatures
-            match = re.search(r'(?:function\s+\w+|(?:async\s+)?(?:const|let|var)?\s*\w+\s*=\s*(?:async\s*)?\(?|(?:async\s+)?)\s*\(([^)]*)\)', code)
+            match = JS_PARAMS_PATTERN.search(code)
             if match:
                 param_str = match.group(1)
                 for param in param_str.split(','):
                     param = param.strip()
                     if param:
                         # Remove type annotations
-                        param_name = re.split(r'[:\=]', param)[0].strip()
+                        param_name = PARAM_NAME_END_PATTERN.split(param)[0].strip()
                         if param_name:
                             params.append(param_name)
         
@@ -131,30 +146,35 @@ Output: authentication auth login verify user token jwt session authenticate val
     def extract_return_type(self, code: str, language: str) -> str:
         """Extract return type annotation if present"""
         if language == 'python':
-            match = re.search(r'->\s*([^:]+):', code)
+            match = PY_RETURN_TYPE_PATTERN.search(code)
             if match:
                 return match.group(1).strip()
         else:  # TypeScript
-            match = re.search(r'\):\s*([^{]+)\s*{', code)
+            match = TS_RETURN_TYPE_PATTERN.search(code)
             if match:
                 return match.group(1).strip()
         return ""
     
     def extract_imports_used(self, code: str, language: str) -> List[str]:
-        """Extract modules/functions that are called in the code"""
-        calls = set()
+        """
+        Extract modules/functions that are called in the code.
+        
+        The first MAX_CALLS distinct calls in source order: a stable order
+        keeps the embedding text (and so its cache key) the same across runs,
+        and scanning stops once enough are found.
+        """
+        calls = {}
         
         # Find function calls
-        call_pattern = r'(\w+)\s*\('
-        for match in re.finditer(call_pattern, code):
+        for match in CALL_PATTERN.finditer(code):
             call = match.group(1)
             # Filter out language keywords
-            keywords = {'if', 'for', 'while', 'with', 'def', 'class', 'return', 
-                       'function', 'const', 'let', 'var', 'async', 'await'}
-            if call not in keywords and not call[0].isupper():  # Exclude class instantiations
-                calls.add(call)
+            if call not in CALL_KEYWORDS and not call[0].isupper():  # Exclude class instantiations
+                calls[call] = None
+                if len(calls) == MAX_CALLS:
+                    break
         
-        return list(calls)[:15]  # Limit to 15 calls
+        return list(calls)
     
     def create_rich_embedding_text(self, func_data: Dict) -> str:
         """
@@ -213,17 +233,29 @@ Output: authentication auth login verify user token jwt session authenticate val
         Compute a simple keyword matching score.
         This supplements semantic search with exact matches.
         """
-        query_terms = set(query.lower().split())
+        return self._keyword_score(set(query.lower().split()), code, name)
+    
+    @staticmethod
+    def _keyword_score(query_terms: set, code: str, name: str) -> float:
+        """
+        Keyword score for an already lowercased, split query.
         
-        # Check name match (highest weight)
+        Each term found in the name is worth 0.5 and each found in the code
+        0.1, capped at 0.3, so scanning stops once the cap is reached: at the
+        first name hit, or the third code hit.
+        """
         name_lower = name.lower()
-        name_score = sum(1 for term in query_terms if term in name_lower) * 0.5
+        if any(term in name_lower for term in query_terms):
+            return 0.3
         
-        # Check code match
         code_lower = code.lower()
-        code_score = sum(1 for term in query_terms if term in code_lower) * 0.1
-        
-        return min(name_score + code_score, 0.3)  # Cap at 0.3 boost
+        hits = 0
+        for term in query_terms:
+            if term in code_lower:
+                hits += 1
+                if hits == 3:
+                    return 0.3
+        return hits * 0.1
     
     def rerank_results(
         self, 
@@ -237,11 +269,14 @@ Output: authentication auth login verify user token jwt session authenticate val
         if not boost_keyword_matches:
             return results
         
+        # Split the query once, not per candidate
+        query_terms = set(query.lower().split())
+        
         reranked = []
         for result in results:
             semantic_score = result.get('score', 0)
-            keyword_boost = self.compute_keyword_score(
-                query, 
+            keyword_boost = self._keyword_score(
+                query_terms, 
                 result.get('code', ''),
                 result.get('name', '')
             )
@@ -4,7 +4,7 @@ Analyzes team coding patterns, naming conventions, and best practices
 """
 from pathlib import Path
 from typing import Dict, List, Set
-from collections import defaultdict, Counter
+from collections import Counter
 import re
 
 # Tree-sitter
@@ -12,8 +12,9 @@ Used by:
 - #94: Repo size limits
 - #95: Repo count limits
 """
+import time
 from dataclasses import dataclass
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from enum import Enum
 
 from services.observability import logger, metrics
@@ -76,6 +77,31 @@ TIER_LIMITS: Dict[UserTier, TierLimits] = {
 }
 
 
+def _usage_payload(tier: UserTier, limits: TierLimits, repo_count: int) -> Dict[str, Any]:
+    """Usage summary body shared by the dashboard and API-key responses"""
+    return {
+        "tier": tier.value,
+        "repositories": {
+            "current": repo_count,
+            "limit": limits.max_repos,
+            "display": f"{repo_count}/{limits.max_repos if limits.max_repos else 'unlimited'}"
+        },
+        "limits": {
+            "max_files_per_repo": limits.max_files_per_repo,
+            "max_functions_per_repo": limits.max_functions_per_repo,
+            "playground_searches_per_day": limits.playground_searches_per_day,
+        },
+        "features": {
+            "priority_indexing": limits.priority_indexing,
+            "mcp_access": limits.mcp_access,
+        }
+    }
+
+
+# Built once; returned as-is for callers without a user_id. Don't mutate.
+FREE_USAGE_DEFAULTS: Dict[str, Any] = _usage_payload(UserTier.FREE, TIER_LIMITS[UserTier.FREE], 0)
+
+
 @dataclass
 class LimitCheckResult:
     """Result of a limit check"""
@@ -128,10 +154,15 @@ class UserLimitsService:
             raise HTTPException(400, result.to_dict())
     """
     
+    USAGE_CACHE_TTL_SECONDS = 10  # Dashboard polls; tolerate brief staleness
+    USAGE_CACHE_MAX_ENTRIES = 10_000
+    
     def __init__(self, supabase_client, redis_client=None):
         self.supabase = supabase_client
         self.redis = redis_client
         self._tier_cache_ttl = 300  # Cache tier for 5 minutes
+        # user_id -> (monotonic expiry, usage summary)
+        self._usage_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
     
     def _validate_user_id(self, user_id: str) -> bool:
         """Validate user_id is not empty"""
@@ -203,6 +234,7 @@ class UserLimitsService:
     
     def invalidate_tier_cache(self, user_id: str) -> None:
         """Invalidate cached tier (call after tier upgrade)"""
+        self.invalidate_usage_cache(user_id)
         if self.redis and self._validate_user_id(user_id):
             try:
                 cache_key = f"user:tier:{user_id}"
@@ -389,49 +421,33 @@ class UserLimitsService:
         """
         Get complete usage summary for user.
         Useful for dashboard display.
+        
+        Cached in-process per user for USAGE_CACHE_TTL_SECONDS. Limit
+        enforcement (check_repo_count) never reads this cache.
         """
         if not self._validate_user_id(user_id):
             # Return free tier defaults for invalid user
-            limits = TIER_LIMITS[UserTier.FREE]
-            return {
-                "tier": "free",
-                "repositories": {
-                    "current": 0,
-                    "limit": limits.max_repos,
-                    "display": f"0/{limits.max_repos}"
-                },
-                "limits": {
-                    "max_files_per_repo": limits.max_files_per_repo,
-                    "max_functions_per_repo": limits.max_functions_per_repo,
-                    "playground_searches_per_day": limits.playground_searches_per_day,
-                },
-                "features": {
-                    "priority_indexing": limits.priority_indexing,
-                    "mcp_access": limits.mcp_access,
-                }
-            }
+            return FREE_USAGE_DEFAULTS
+        
+        cached = self._usage_cache.get(user_id)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
         
         tier = self.get_user_tier(user_id)
         limits = self.get_limits(tier)
         repo_count = self.get_user_repo_count(user_id)
         
-        return {
-            "tier": tier.value,
-            "repositories": {
-                "current": repo_count,
-                "limit": limits.max_repos,
-                "display": f"{repo_count}/{limits.max_repos if limits.max_repos else 'unlimited'}"
-            },
-            "limits": {
-                "max_files_per_repo": limits.max_files_per_repo,
-                "max_functions_per_repo": limits.max_functions_per_repo,
-                "playground_searches_per_day": limits.playground_searches_per_day,
-            },
-            "features": {
-                "priority_indexing": limits.priority_indexing,
-                "mcp_access": limits.mcp_access,
-            }
-        }
+        summary = _usage_payload(tier, limits, repo_count)
+        
+        now = time.monotonic()
+        if len(self._usage_cache) >= self.USAGE_CACHE_MAX_ENTRIES:
+            self._usage_cache = {k: v for k, v in self._usage_cache.items() if v[0] > now}
+        self._usage_cache[user_id] = (now + self.USAGE_CACHE_TTL_SECONDS, summary)
+        return summary
+    
+    def invalidate_usage_cache(self, user_id: str) -> None:
+        """Drop the in-process usage summary (call after repo add/remove)"""
+        self._usage_cache.pop(user_id, None)
 
 
 # Singleton instance (initialized in dependencies.py)
@@ -5,7 +5,7 @@ Proper dependency mocking for FastAPI testing
 import pytest
 import sys
 from pathlib import Path
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 import os
 
 # Set test environment BEFORE imports
@@ -161,7 +161,13 @@ def mock_git():
         repo.active_branch.name = "main"
         mock.return_value = repo
         mock.clone_from.return_value = repo
-        yield mock
+        # Anonymous indexing clones via the git CLI; keep background jobs off
+        # the network (tests of the real clone import it at module level)
+        import git
+        offline = git.GitCommandError("clone", 128, "network disabled in tests")
+        with patch('services.anonymous_indexer.clone_for_indexing',
+                   new_callable=AsyncMock, side_effect=offline):
+            yield mock
 
 
 @pytest.fixture
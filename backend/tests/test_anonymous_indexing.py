@@ -8,6 +8,7 @@ import pytest
 from unittest.mock import patch, MagicMock, AsyncMock
 from datetime import datetime, timezone, timedelta
 import json
+import subprocess
 
 # Import directly - conftest.py handles external service mocking
 from routes.playground import (
@@ -19,6 +20,8 @@ from services.anonymous_indexer import (
     JobStatus,
     JobProgress,
     JobStats,
+    clone_for_indexing,
+    _resolve_temp_dir,
 )
 
 
@@ -87,8 +90,8 @@ class TestAnonymousIndexingJob:
     def mock_redis(self):
         """Create a mock Redis client."""
         redis = MagicMock()
-        redis.get.return_value = None
-        redis.setex.return_value = True
+        redis.hgetall.return_value = {}
+        redis.register_script.return_value.return_value = 1
         return redis
 
     @pytest.fixture
@@ -131,52 +134,95 @@ class TestAnonymousIndexingJob:
         assert job_data["file_count"] == 50
 
         # Check Redis was called
-        mock_redis.setex.assert_called_once()
-        call_args = mock_redis.setex.call_args
+        pipe = mock_redis.pipeline.return_value
+        pipe.hset.assert_called_once()
+        call_args = pipe.hset.call_args
         assert "anon_job:idx_test123456" in call_args[0]
+        assert json.loads(call_args[1]["mapping"]["file_count"]) == 50
+        pipe.expire.assert_called_once_with("anon_job:idx_test123456", 3600)
+        pipe.execute.assert_called_once()
 
     def test_get_job_exists(self, job_manager, mock_redis):
         """Get existing job from Redis."""
-        mock_redis.get.return_value = json.dumps({
-            "job_id": "idx_test123456",
-            "status": "processing"
-        })
+        mock_redis.hgetall.return_value = {
+            b"job_id": b'"idx_test123456"',
+            b"status": b'"processing"',
+            b"file_count": b"50",
+            b"progress": b"null",
+        }
 
         job = job_manager.get_job("idx_test123456")
         assert job is not None
         assert job["status"] == "processing"
+        assert job["file_count"] == 50
+        assert job["progress"] is None
 
     def test_get_job_not_found(self, job_manager, mock_redis):
         """Get non-existent job returns None."""
-        mock_redis.get.return_value = None
+        mock_redis.hgetall.return_value = {}
         job = job_manager.get_job("idx_nonexistent")
         assert job is None
 
+    def test_get_job_ignores_stub_hash(self, job_manager, mock_redis):
+        """A hash without job_id (late write after expiry) is not a job."""
+        mock_redis.hgetall.return_value = {b"status": b'"processing"'}
+        assert job_manager.get_job("idx_test123456") is None
+
+    def test_get_job_legacy_string_key(self, job_manager, mock_redis):
+        """A job left as a JSON string (WRONGTYPE for HGETALL) is treated as missing."""
+        from redis.exceptions import ResponseError
+        mock_redis.hgetall.side_effect = ResponseError(
+            "WRONGTYPE Operation against a key holding the wrong kind of value"
+        )
+        assert job_manager.get_job("idx_test123456") is None
+
     def test_update_status(self, job_manager, mock_redis):
         """Update job status in Redis."""
-        # Setup existing job
-        mock_redis.get.return_value = json.dumps({
-            "job_id": "idx_test123456",
-            "status": "queued",
-            "updated_at": "2025-01-01T00:00:00Z"
-        })
-
         result = job_manager.update_status(
             "idx_test123456",
             JobStatus.PROCESSING
         )
 
         assert result is True
-        # Check Redis setex was called to update
-        assert mock_redis.setex.called
+        fields = self._script_fields(mock_redis)
+        assert fields["status"] == "processing"
+        assert "job_id" not in fields
+        mock_redis.get.assert_not_called()
+        mock_redis.hgetall.assert_not_called()
+
+    def test_update_status_missing_job(self, job_manager, mock_redis):
+        """Update of an expired/unknown job returns False (script wrote nothing)."""
+        mock_redis.register_script.return_value.return_value = 0
+
+        result = job_manager.update_status("idx_test123456", JobStatus.PROCESSING)
+
+        assert result is False
+
+    def test_update_progress_single_call(self, job_manager, mock_redis):
+        """Progress writes are one script call: no read, no separate EXISTS."""
+        result = job_manager.update_progress(
+            "idx_test123456", files_processed=5, functions_found=12, files_total=10
+        )
+
+        assert result is True
+        mock_redis.exists.assert_not_called()
+        mock_redis.pipeline.assert_not_called()
+        script = mock_redis.register_script.return_value
+        script.assert_called_once()
+        assert script.call_args[1]["keys"] == ["anon_job:idx_test123456"]
+        ttl, channel, event = script.call_args[1]["args"][:3]
+        assert ttl == 3600
+        assert channel == "anon_job_events:idx_test123456"
+        assert json.loads(event)["progress"]["files_processed"] == 5
+
+    @staticmethod
+    def _script_fields(mock_redis) -> dict:
+        """Decode the field/value pairs passed to the update script."""
+        args = mock_redis.register_script.return_value.call_args[1]["args"][3:]
+        return {args[i]: json.loads(args[i + 1]) for i in range(0, len(args), 2)}
 
     def test_update_status_with_progress(self, job_manager, mock_redis):
         """Update status with progress data."""
-        mock_redis.get.return_value = json.dumps({
-            "job_id": "idx_test123456",
-            "status": "cloning"
-        })
-
         progress = JobProgress(
             files_total=100,
             files_processed=50,
@@ -193,11 +239,6 @@ class TestAnonymousIndexingJob:
 
     def test_update_status_completed_with_stats(self, job_manager, mock_redis):
         """Update status to completed with stats."""
-        mock_redis.get.return_value = json.dumps({
-            "job_id": "idx_test123456",
-            "status": "processing"
-        })
-
         stats = JobStats(
             files_indexed=100,
             functions_found=500,
@@ -215,11 +256,6 @@ class TestAnonymousIndexingJob:
 
     def test_update_status_failed_with_error(self, job_manager, mock_redis):
         """Update status to failed with error."""
-        mock_redis.get.return_value = json.dumps({
-            "job_id": "idx_test123456",
-            "status": "cloning"
-        })
-
         result = job_manager.update_status(
             "idx_test123456",
             JobStatus.FAILED,
@@ -230,6 +266,148 @@ class TestAnonymousIndexingJob:
         assert result is True
 
 
+# =============================================================================
+# JOB QUEUE TESTS
+# =============================================================================
+
+class TestJobQueue:
+    """Tests for the wait queue and concurrency cap on indexing jobs."""
+
+    @pytest.fixture
+    def job_manager(self):
+        redis = MagicMock()
+        redis.zrank.return_value = None
+        return AnonymousIndexingJob(redis)
+
+    def test_enqueue_adds_and_prunes(self, job_manager):
+        job_manager.enqueue("idx_abc123def456")
+
+        pipe = job_manager.redis.pipeline.return_value
+        key, mapping = pipe.zadd.call_args[0]
+        assert key == AnonymousIndexingJob.QUEUE_KEY
+        assert list(mapping) == ["idx_abc123def456"]
+        pipe.zremrangebyscore.assert_called_once()
+        pipe.execute.assert_called_once()
+
+    def test_queue_position_is_one_based(self, job_manager):
+        job_manager.redis.zrank.return_value = 0
+        assert job_manager.queue_position("idx_abc123def456") == 1
+
+    def test_queue_position_none_when_not_waiting(self, job_manager):
+        assert job_manager.queue_position("idx_abc123def456") is None
+
+    @pytest.mark.asyncio
+    async def test_concurrent_jobs_are_capped(self, job_manager):
+        import asyncio
+        from services import anonymous_indexer
+
+        running = 0
+        peak = 0
+
+        async def fake_index_job(*args):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        with patch.object(anonymous_indexer, "_job_slots", asyncio.Semaphore(2)), \
+             patch.object(anonymous_indexer, "_index_job", fake_index_job):
+            await asyncio.gather(*(
+                anonymous_indexer.run_indexing_job(
+                    job_manager, None, None, f"idx_{i:012d}", "sess",
+                    "https://github.com/o/r", "o", "r", "main", 10
+                )
+                for i in range(5)
+            ))
+
+        assert peak == 2
+        assert job_manager.redis.zrem.call_count >= 5
+
+    @pytest.mark.asyncio
+    async def test_enqueue_failure_marks_job_failed(self, job_manager):
+        from redis.exceptions import ConnectionError
+        from services import anonymous_indexer
+
+        job_manager.redis.pipeline.return_value.execute.side_effect = ConnectionError("down")
+        job_manager.redis.zrem.side_effect = ConnectionError("down")
+        index_job = AsyncMock()
+
+        with patch.object(anonymous_indexer, "_index_job", index_job), \
+             patch.object(anonymous_indexer, "capture_exception") as capture, \
+             patch.object(job_manager, "update_status") as update_status:
+            await anonymous_indexer.run_indexing_job(
+                job_manager, None, None, "idx_abc123def456", "sess",
+                "https://github.com/o/r", "o", "r", "main", 10
+            )
+
+        index_job.assert_not_called()
+        capture.assert_called_once()
+        args, kwargs = update_status.call_args
+        assert args == ("idx_abc123def456", JobStatus.FAILED)
+        assert kwargs["error_message"] == "down"
+
+
+# =============================================================================
+# CLONE TESTS
+# =============================================================================
+
+class TestCloneForIndexing:
+    """Tests for the sparse partial clone used by anonymous indexing."""
+
+    @pytest.fixture
+    def source_repo(self, tmp_path):
+        """Local git repo with code and non-code files."""
+        src = tmp_path / "src"
+        (src / "pkg").mkdir(parents=True)
+        (src / "pkg" / "app.py").write_text("def main():\n    pass\n")
+        (src / "index.ts").write_text("export function f() {}\n")
+        (src / "logo.png").write_bytes(b"\x89PNG" + b"\0" * 64)
+        (src / "package-lock.json").write_text("{}\n")
+        run = lambda *args: subprocess.run(["git", *args], cwd=src, check=True, capture_output=True)
+        run("init", "-q", "-b", "main")
+        run("-c", "user.name=t", "-c", "user.email=t@t", "add", ".")
+        run("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "init")
+        return src
+
+    @pytest.mark.asyncio
+    async def test_checks_out_only_code_files(self, source_repo, tmp_path):
+        dest = tmp_path / "clone"
+
+        await clone_for_indexing(f"file://{source_repo}", dest, "main", timeout=60)
+
+        files = sorted(
+            str(p.relative_to(dest)) for p in dest.rglob("*")
+            if p.is_file() and ".git" not in p.parts
+        )
+        assert files == ["index.ts", "pkg/app.py"]
+
+    @pytest.mark.asyncio
+    async def test_missing_branch_raises_git_error(self, source_repo, tmp_path):
+        import git
+
+        with pytest.raises(git.GitCommandError):
+            await clone_for_indexing(f"file://{source_repo}", tmp_path / "clone", "nope", timeout=60)
+
+
+class TestResolveTempDir:
+    """Tests for choosing the clone scratch directory."""
+
+    def test_env_override(self, monkeypatch):
+        monkeypatch.setenv("ANON_TEMP_DIR", "/custom/dir")
+        assert _resolve_temp_dir() == "/custom/dir"
+
+    def test_small_shm_falls_back_to_tmp(self, monkeypatch):
+        monkeypatch.delenv("ANON_TEMP_DIR", raising=False)
+        monkeypatch.setattr("os.statvfs", lambda _: MagicMock(f_bavail=10, f_frsize=4096))
+        assert _resolve_temp_dir() == "/tmp/anon_repos"
+
+    def test_roomy_shm_preferred(self, monkeypatch):
+        monkeypatch.delenv("ANON_TEMP_DIR", raising=False)
+        monkeypatch.setattr("os.statvfs", lambda _: MagicMock(f_bavail=1 << 20, f_frsize=4096))
+        assert _resolve_temp_dir() == "/dev/shm/anon_repos"
+
+
 # =============================================================================
 # JOB DATACLASS TESTS
 # =============================================================================
@@ -554,6 +732,7 @@ class TestStatusEndpoint:
             "created_at": "2024-01-01T00:00:00Z",
             "updated_at": "2024-01-01T00:00:00Z",
         }
+        mock_job_manager.queue_position.return_value = 3
         mock_job_class.return_value = mock_job_manager
 
         response = client.get("/api/v1/playground/index/idx_test123456")
@@ -562,6 +741,23 @@ class TestStatusEndpoint:
         data = response.json()
         assert data["status"] == "queued"
         assert data["message"] == "Job is queued for processing"
+        assert data["queue_position"] == 3
+
+    @patch('routes.playground.AnonymousIndexingJob')
+    def test_epoch_ms_updated_at_is_formatted(self, mock_job_class, client):
+        """updated_at is stored as epoch ms and returned as ISO 8601."""
+        mock_job_manager = MagicMock()
+        mock_job_manager.get_job.return_value = {
+            "job_id": "idx_test123456",
+            "status": "processing",
+            "created_at": "2024-01-01T00:00:00+00:00",
+            "updated_at": 1704067230500,
+        }
+        mock_job_class.return_value = mock_job_manager
+
+        response = client.get("/api/v1/playground/index/idx_test123456")
+
+        assert response.json()["updated_at"] == "2024-01-01T00:00:30.500000+00:00"
 
     @patch('routes.playground.AnonymousIndexingJob')
     def test_processing_job_returns_progress(self, mock_job_class, client):
@@ -682,6 +878,123 @@ class TestStatusEndpoint:
 
 
 
+class TestStatusEventStream:
+    """Tests for GET /playground/index/{job_id}/events (SSE)."""
+
+    @pytest.fixture
+    def client(self):
+        from fastapi.testclient import TestClient
+        from main import app
+        return TestClient(app)
+
+    @pytest.fixture
+    def pubsub(self):
+        pubsub = MagicMock()
+        pubsub.subscribe = AsyncMock()
+        pubsub.aclose = AsyncMock()
+        pubsub.get_message = AsyncMock()
+        with patch('routes.playground.get_async_redis') as get_redis:
+            get_redis.return_value.pubsub.return_value = pubsub
+            yield pubsub
+
+    @staticmethod
+    def _events(response):
+        return [
+            json.loads(line[len("data: "):])
+            for line in response.text.splitlines()
+            if line.startswith("data: ")
+        ]
+
+    @patch('routes.playground.AnonymousIndexingJob')
+    def test_streams_updates_until_complete(self, mock_job_class, client, pubsub):
+        mock_job_class.events_channel.return_value = "anon_job_events:idx_test123456"
+        mock_job_class.return_value.get_job.return_value = {
+            "job_id": "idx_test123456",
+            "status": "cloning",
+            "owner": "user",
+            "repo_name": "repo",
+        }
+        pubsub.get_message.side_effect = [
+            {"data": json.dumps({"status": "processing", "progress": {
+                "files_processed": 5, "files_total": 10, "functions_found": 12}})},
+            None,  # heartbeat
+            {"data": json.dumps({"status": "completed", "repo_id": "anon_test123456"})},
+        ]
+
+        response = client.get("/api/v1/playground/index/idx_test123456/events")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert ": keepalive" in response.text
+        events = self._events(response)
+        assert [e["status"] for e in events] == ["cloning", "processing", "completed"]
+        assert events[1]["progress"]["percent_complete"] == 50
+        assert events[2]["repo_id"] == "anon_test123456"
+        pubsub.subscribe.assert_awaited_once_with("anon_job_events:idx_test123456")
+        pubsub.aclose.assert_awaited()
+
+    @patch('routes.playground.AnonymousIndexingJob')
+    def test_queued_job_streams_queue_position(self, mock_job_class, client, pubsub):
+        """Snapshot and heartbeats carry the queue position, like the polling endpoint."""
+        queued = {"job_id": "idx_test123456", "status": "queued"}
+        mock_job_class.return_value.get_job.side_effect = [queued, dict(queued)]
+        mock_job_class.return_value.queue_position.side_effect = [3, 2]
+        pubsub.get_message.side_effect = [
+            None,  # heartbeat while queued
+            {"data": json.dumps({"status": "cloning"})},
+            {"data": json.dumps({"status": "completed", "repo_id": "anon_test123456"})},
+        ]
+
+        response = client.get("/api/v1/playground/index/idx_test123456/events")
+
+        events = self._events(response)
+        assert [(e["status"], e.get("queue_position")) for e in events] == [
+            ("queued", 3), ("queued", 2), ("cloning", None), ("completed", None),
+        ]
+
+    @patch('routes.playground.AnonymousIndexingJob')
+    def test_ends_when_job_expires(self, mock_job_class, client, pubsub):
+        """A job whose record expired mid-stream (dead worker) ends the stream."""
+        mock_job_class.return_value.get_job.side_effect = [
+            {"job_id": "idx_test123456", "status": "processing"},
+            None,
+        ]
+        pubsub.get_message.side_effect = [None]
+
+        response = client.get("/api/v1/playground/index/idx_test123456/events")
+
+        events = self._events(response)
+        assert events[0]["status"] == "processing"
+        assert events[-1]["error"] == "job_not_found"
+        assert ": keepalive" not in response.text
+        pubsub.aclose.assert_awaited()
+
+    @patch('routes.playground.JOB_EVENTS_MAX_SECONDS', 0)
+    @patch('routes.playground.AnonymousIndexingJob')
+    def test_stream_capped_at_job_ttl(self, mock_job_class, client, pubsub):
+        mock_job_class.return_value.get_job.return_value = {
+            "job_id": "idx_test123456", "status": "processing",
+        }
+
+        response = client.get("/api/v1/playground/index/idx_test123456/events")
+
+        assert [e["status"] for e in self._events(response)] == ["processing"]
+        pubsub.get_message.assert_not_awaited()
+
+    @patch('routes.playground.AnonymousIndexingJob')
+    def test_missing_job_returns_404(self, mock_job_class, client, pubsub):
+        mock_job_class.return_value.get_job.return_value = None
+
+        response = client.get("/api/v1/playground/index/idx_missing12345/events")
+
+        assert response.status_code == 404
+        pubsub.aclose.assert_awaited_once()
+
+    def test_invalid_job_id_returns_400(self, client, pubsub):
+        response = client.get("/api/v1/playground/index/bad/events")
+        assert response.status_code == 400
+
+
 # =============================================================================
 # Issue #128: Search User-Indexed Repos Tests
 # =============================================================================
@@ -154,3 +154,34 @@ class TestCostControls:
         )
         # Should either cap at 50 or fail because repo doesn't exist
         assert response.status_code in [200, 404, 500]
+
+
+class TestHTTPCaching:
+    """Test ETag / prebuilt responses on read-mostly endpoints"""
+    
+    def test_usage_returns_etag(self, client, valid_headers):
+        """Usage response should carry an ETag"""
+        response = client.get(f"{API_PREFIX}/users/usage", headers=valid_headers)
+        assert response.status_code == 200
+        assert response.headers.get("etag")
+    
+    def test_usage_not_modified_on_matching_etag(self, client, valid_headers):
+        """Matching If-None-Match should return 304 with no body"""
+        first = client.get(f"{API_PREFIX}/users/usage", headers=valid_headers)
+        etag = first.headers["etag"]
+        
+        second = client.get(
+            f"{API_PREFIX}/users/usage",
+            headers={**valid_headers, "If-None-Match": etag}
+        )
+        assert second.status_code == 304
+        assert second.content == b""
+    
+    def test_playground_repos_lists_catalog(self, client_no_auth):
+        """Demo repo list should come from the prebuilt response"""
+        from routes.playground import DEMO_REPO_CATALOG
+        
+        response = client_no_auth.get(f"{API_PREFIX}/playground/repos")
+        assert response.status_code == 200
+        ids = [r["id"] for r in response.json()["repos"]]
+        assert ids == [repo_id for repo_id, _, _ in DEMO_REPO_CATALOG]
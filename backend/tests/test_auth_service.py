@@ -0,0 +1,119 @@
+"""
+Tests for SupabaseAuthService JWT verification and its in-process cache.
+"""
+import time
+import pytest
+import jwt
+from unittest.mock import MagicMock, patch
+from fastapi import HTTPException
+
+SECRET = "test-jwt-secret-with-enough-bytes-for-hs256"
+
+
+def make_token(exp_in: int = 3600, **claims) -> str:
+    payload = {
+        "sub": "user-123",
+        "email": "dev@example.com",
+        "aud": "authenticated",
+        "exp": int(time.time()) + exp_in,
+        "user_metadata": {"tier": "pro"},
+    }
+    payload.update(claims)
+    return jwt.encode(payload, SECRET, algorithm="HS256")
+
+
+@pytest.fixture
+def auth_service(monkeypatch):
+    monkeypatch.setenv("SUPABASE_URL", "https://test.supabase.co")
+    monkeypatch.setenv("SUPABASE_ANON_KEY", "anon-key")
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", SECRET)
+    with patch("services.auth.create_client", return_value=MagicMock()):
+        from services.auth import SupabaseAuthService
+        return SupabaseAuthService()
+
+
+class TestVerifyJwt:
+    """Tests for verify_jwt()."""
+
+    def test_local_decode_skips_supabase(self, auth_service):
+        user = auth_service.verify_jwt(f"Bearer {make_token()}")
+
+        assert user["user_id"] == "user-123"
+        assert user["email"] == "dev@example.com"
+        assert user["metadata"] == {"tier": "pro"}
+        auth_service.client.auth.get_user.assert_not_called()
+
+    def test_expired_token_rejected(self, auth_service):
+        with pytest.raises(HTTPException) as exc:
+            auth_service.verify_jwt(make_token(exp_in=-10))
+
+        assert exc.value.status_code == 401
+        auth_service.client.auth.get_user.assert_not_called()
+
+    def test_falls_back_to_supabase_and_caches(self, auth_service):
+        """Tokens we can't verify locally go to Supabase once, then hit the cache."""
+        auth_service.jwt_secret = None
+        remote_user = MagicMock(id="user-456", email="x@example.com",
+                                created_at="2025-01-01", user_metadata={})
+        auth_service.client.auth.get_user.return_value = MagicMock(user=remote_user)
+
+        first = auth_service.verify_jwt("opaque-token")
+        second = auth_service.verify_jwt("opaque-token")
+
+        assert first == second
+        assert first["user_id"] == "user-456"
+        auth_service.client.auth.get_user.assert_called_once()
+
+    def test_revoked_token_rejected(self, auth_service):
+        token = make_token()
+        auth_service.verify_jwt(token)
+
+        auth_service.revoke_token(f"Bearer {token}")
+
+        with pytest.raises(HTTPException) as exc:
+            auth_service.verify_jwt(token)
+        assert exc.value.status_code == 401
+        assert exc.value.detail == "Token has been revoked"
+
+    def test_rejected_by_supabase_keeps_detail(self, auth_service):
+        auth_service.jwt_secret = None
+        auth_service.client.auth.get_user.return_value = MagicMock(user=None)
+
+        with pytest.raises(HTTPException) as exc:
+            auth_service.verify_jwt("opaque-token")
+        assert exc.value.detail == "Invalid or expired token"
+
+    def test_supabase_result_cached_no_longer_than_exp(self, auth_service):
+        auth_service.jwt_secret = None
+        remote_user = MagicMock(id="user-456", email="x@example.com",
+                                created_at="2025-01-01", user_metadata={})
+        auth_service.client.auth.get_user.return_value = MagicMock(user=remote_user)
+        token = make_token(exp_in=10)
+
+        auth_service.verify_jwt(token)
+
+        [(expires_at, _)] = auth_service._jwt_cache.values()
+        assert expires_at <= jwt.decode(token, options={"verify_signature": False})["exp"]
+
+    def test_cache_is_bounded(self, auth_service):
+        with patch("services.auth.JWT_CACHE_MAX_ENTRIES", 2):
+            for i in range(3):
+                auth_service.verify_jwt(make_token(sub=f"user-{i}"))
+
+        assert len(auth_service._jwt_cache) == 2
+
+
+class TestGetAuthService:
+    """Tests for the get_auth_service() singleton."""
+
+    def test_builds_client_once(self, monkeypatch):
+        from services.auth import get_auth_service
+        monkeypatch.setenv("SUPABASE_URL", "https://test.supabase.co")
+        monkeypatch.setenv("SUPABASE_ANON_KEY", "anon-key")
+        get_auth_service.cache_clear()
+        try:
+            with patch("services.auth.create_client", return_value=MagicMock()) as create:
+                assert get_auth_service() is get_auth_service()
+            create.assert_called_once()
+        finally:
+            get_auth_service.cache_clear()
@@ -4,6 +4,15 @@ Tests for CacheService - specifically the generic get/set methods.
 import pytest
 from unittest.mock import MagicMock, patch
 import json
+import orjson
+
+
+@pytest.fixture
+def cache_service():
+    """CacheService on a mock Redis client (overridden where from_url is needed)."""
+    with patch('services.cache.redis.Redis', return_value=MagicMock()):
+        from services.cache import CacheService
+        return CacheService()
 
 
 class TestCacheServiceGenericMethods:
@@ -69,7 +78,7 @@ class TestCacheServiceGenericMethods:
         mock_redis.setex.assert_called_once_with(
             "validate:test",
             300,
-            json.dumps(test_data)
+            orjson.dumps(test_data)
         )
     
     def test_set_uses_default_ttl(self, cache_service, mock_redis):
@@ -97,3 +106,82 @@ class TestCacheServiceGenericMethods:
         result = cache_service.set("validate:test", {"data": "value"})
         
         assert result is False
+
+
+class TestCacheKeys:
+    """Test cache key derivation."""
+
+    def test_embedding_key_covers_full_text(self, cache_service):
+        """Texts sharing a long prefix must not share an embedding key."""
+        prefix = "x" * 100
+        cache_service.set_embedding(prefix + "a", [0.1])
+        cache_service.set_embedding(prefix + "b", [0.2])
+
+        keys = [c[0][0] for c in cache_service.redis.setex.call_args_list]
+        assert len(set(keys)) == 2
+        assert all(k.startswith("emb32:") for k in keys)
+
+    def test_bytes_key_matches_str_parts(self, cache_service):
+        """A single bytes arg hashes the same as its decoded string."""
+        assert cache_service._make_key("emb", b"abc") == cache_service._make_key("emb", "abc")
+
+    def test_embedding_round_trips_as_float32(self, cache_service):
+        """Embeddings are stored as packed float32, not JSON."""
+        cache_service.set_embedding("def f(): pass", [0.5, -1.25, 3.0])
+
+        stored = cache_service.redis.setex.call_args[0][2]
+        assert isinstance(stored, bytes) and len(stored) == 12
+
+        cache_service.redis.get.return_value = stored
+        assert cache_service.get_embedding("def f(): pass") == [0.5, -1.25, 3.0]
+
+
+class TestRepoInvalidation:
+    """Test tracked-key invalidation for search results."""
+
+    def test_set_search_results_tracks_key(self, cache_service):
+        cache_service.set_search_results("query", "repo-1", [{"name": "f"}], ttl=60)
+
+        pipe = cache_service.redis.pipeline.return_value
+        key = pipe.setex.call_args[0][0]
+        assert key.startswith("search:{repo-1}:")
+        pipe.sadd.assert_called_once_with("repo_keys:{repo-1}", key)
+        pipe.expire.assert_called_once_with("repo_keys:{repo-1}", 120)
+        pipe.execute.assert_called_once()
+
+    def test_invalidate_repo_deletes_tracked_keys(self, cache_service):
+        cache_service.redis.smembers.return_value = {b"search:{repo-1}:aaa", b"search:{repo-1}:bbb"}
+
+        cache_service.invalidate_repo("repo-1")
+
+        cache_service.redis.keys.assert_not_called()
+        deleted = cache_service.redis.delete.call_args[0]
+        assert set(deleted) == {b"search:{repo-1}:aaa", b"search:{repo-1}:bbb", "repo_keys:{repo-1}"}
+
+    def test_repo_keys_share_hash_tag(self, cache_service):
+        """Search keys and the index SET hash to the same cluster slot."""
+        key = cache_service._search_key("repo-1", "query")
+        assert "{repo-1}" in key
+        assert "{repo-1}" in cache_service._repo_index_key("repo-1")
+        assert cache_service._search_key("repo-2", "query") != key
+
+
+class TestPayloadCompression:
+    """Test transparent compression of large cached payloads."""
+
+    def test_large_payload_round_trips_compressed(self, cache_service):
+        results = [{"code": "def handler(request):\n    return None\n" * 20, "score": 0.9}]
+
+        cache_service.set_search_results("query", "repo-1", results)
+
+        stored = cache_service.redis.pipeline.return_value.setex.call_args[0][2]
+        assert len(stored) < len(orjson.dumps(results))
+
+        cache_service.redis.get.return_value = stored
+        assert cache_service.get_search_results("query", "repo-1") == results
+
+    def test_small_payload_stored_as_plain_json(self, cache_service):
+        cache_service.set("validate:x", {"valid": True})
+
+        stored = cache_service.redis.setex.call_args[0][2]
+        assert stored == orjson.dumps({"valid": True})
@@ -0,0 +1,422 @@
+"""
+Tests for DependencyAnalyzer.
+Covers import extraction, graph building and impact analysis on a small repo.
+"""
+import os
+
+import pytest
+from unittest.mock import patch, MagicMock
+
+from services import dependency_analyzer as da
+from services.dependency_analyzer import DependencyAnalyzer
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return DependencyAnalyzer()
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path_factory, monkeypatch):
+    """Keep the per-file analysis cache out of the home directory."""
+    path = tmp_path_factory.mktemp("deps_cache")
+    monkeypatch.setattr(da, "DEPENDENCY_CACHE_DIR", str(path))
+    return path
+
+
+@pytest.fixture
+def close_pool():
+    """Shut down the shared analysis pool a parallel test started."""
+    yield
+    da.close_analysis_pool()
+
+
+@pytest.fixture
+def repo_tree(tmp_path):
+    """Small mixed Python/JS repo with a skipped node_modules dir."""
+    files = {
+        "pkg/__init__.py": "",
+        "pkg/core.py": (
+            "import os\n"
+            "from pkg import util\n"
+            "from pkg.util import helper\n"
+            "\n"
+            "def f():\n"
+            "    import json\n"
+        ),
+        "pkg/util.py": "import sys, re as regex\n\ndef helper():\n    pass\n",
+        "tests/test_core.py": "from pkg.core import f\n",
+        "web/app.js": (
+            "import x from './lib';\n"
+            "const y = require('./helpers');\n"
+            "export { z } from './lib';\n"
+        ),
+        "web/lib.ts": "import React from 'react';\nexport const z = 1;\n",
+        "web/helpers.js": "module.exports = {};\n",
+        "node_modules/dep/index.js": "require('./other');\n",
+    }
+    for rel, content in files.items():
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return tmp_path
+
+
+def _edge_set(graph):
+    return {(e["source"], e["target"]) for e in graph["edges"]}
+
+
+class TestAnalyzeFile:
+    """Tests for analyze_file_dependencies()."""
+
+    def test_python_imports(self, analyzer, repo_tree):
+        result = analyzer.analyze_file_dependencies(str(repo_tree / "pkg" / "core.py"))
+
+        assert result["language"] == "python"
+        assert set(result["imports"]) == {"os", "pkg", "pkg.util", "json"}
+
+    def test_python_import_list_with_alias(self, analyzer, repo_tree):
+        result = analyzer.analyze_file_dependencies(str(repo_tree / "pkg" / "util.py"))
+
+        assert set(result["imports"]) == {"sys", "re"}
+
+    def test_js_imports_requires_and_reexports(self, analyzer, repo_tree):
+        result = analyzer.analyze_file_dependencies(str(repo_tree / "web" / "app.js"))
+
+        assert result["language"] == "javascript"
+        assert set(result["imports"]) == {"./lib", "./helpers"}
+
+    def test_js_side_effect_and_nested_require(self, analyzer, tmp_path):
+        path = tmp_path / "index.ts"
+        path.write_text(
+            "import './styles.css';\n"
+            "register(require(\"./plugin\"));\n"
+            "load('./not-an-import');\n"
+        )
+
+        result = analyzer.analyze_file_dependencies(str(path))
+
+        assert set(result["imports"]) == {"./styles.css", "./plugin"}
+
+    def test_relative_python_imports_keep_dots(self, analyzer, tmp_path):
+        path = tmp_path / "mod.py"
+        path.write_text("from . import a\nfrom ..pkg.sub import b\nimport x.y as z\n")
+
+        result = analyzer.analyze_file_dependencies(str(path))
+
+        assert set(result["imports"]) == {".", "..pkg.sub", "x.y"}
+
+    def test_parsers_are_per_thread(self):
+        import threading
+        from services.dependency_analyzer import _get_parser
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(_get_parser("python")))
+        thread.start()
+        thread.join()
+
+        assert _get_parser("python") is _get_parser("python")
+        assert other[0] is not _get_parser("python")
+        assert _get_parser("typescript") is not _get_parser("javascript")
+
+    def test_import_depth_cap(self, analyzer, tmp_path, monkeypatch):
+        path = tmp_path / "mod.py"
+        path.write_text(
+            "import a\n"
+            "try:\n    import b\nexcept ImportError:\n    pass\n"
+            "class K:\n    def m(self):\n        import c\n"
+        )
+
+        assert set(analyzer.analyze_file_dependencies(str(path))["imports"]) == {"a", "b", "c"}
+
+        monkeypatch.setattr(da, "IMPORT_MAX_DEPTH", 3)
+        assert set(analyzer.analyze_file_dependencies(str(path))["imports"]) == {"a", "b"}
+
+    def test_unknown_language(self, analyzer, tmp_path):
+        path = tmp_path / "notes.md"
+        path.write_text("# notes\n")
+
+        result = analyzer.analyze_file_dependencies(str(path))
+
+        assert result["imports"] == []
+        assert result["language"] == "unknown"
+
+
+class TestBuildDependencyGraph:
+    """Tests for build_dependency_graph()."""
+
+    def test_nodes_skip_vendored_dirs(self, analyzer, repo_tree):
+        graph = analyzer.build_dependency_graph(str(repo_tree))
+
+        ids = {n["id"] for n in graph["nodes"]}
+        assert "web/app.js" in ids
+        assert "pkg/core.py" in ids
+        assert not any(i.startswith("node_modules") for i in ids)
+
+    def test_skips_symlinks(self, analyzer, repo_tree, tmp_path_factory):
+        import os
+        outside = tmp_path_factory.mktemp("outside")
+        (outside / "secret.py").write_text("import os\n")
+        os.symlink(outside, repo_tree / "linked_dir")
+        os.symlink(outside / "secret.py", repo_tree / "linked.py")
+
+        files = analyzer._find_code_files(repo_tree)
+
+        assert all("secret" not in f.name and "linked" not in f.name for f in files)
+        assert len(files) == 7
+
+    def test_relative_js_imports_become_edges(self, analyzer, repo_tree):
+        graph = analyzer.build_dependency_graph(str(repo_tree))
+
+        assert _edge_set(graph) == {("web/app.js", "web/lib.ts"), ("web/app.js", "web/helpers.js")}
+        assert graph["metrics"]["total_edges"] == 2
+
+    def test_parallel_matches_serial(self, analyzer, repo_tree, monkeypatch, close_pool):
+        monkeypatch.setattr(da, "DEPENDENCY_CACHE_DIR", "")
+        serial = analyzer.build_dependency_graph(str(repo_tree))
+
+        with patch.object(da, "PARALLEL_MIN_FILES", 0), patch.object(da, "MAX_PARSE_WORKERS", 2):
+            parallel = analyzer.build_dependency_graph(str(repo_tree))
+
+        assert {k: set(v) for k, v in parallel["dependencies"].items()} == \
+            {k: set(v) for k, v in serial["dependencies"].items()}
+        assert _edge_set(parallel) == _edge_set(serial)
+
+    def test_parallel_builds_reuse_pool(self, analyzer, repo_tree, monkeypatch, close_pool):
+        monkeypatch.setattr(da, "DEPENDENCY_CACHE_DIR", "")
+        pool = MagicMock()
+        pool.map.side_effect = lambda fn, paths, chunksize: map(da._analyze_worker, paths)
+
+        with patch.object(da, "PARALLEL_MIN_FILES", 0), patch.object(da, "MAX_PARSE_WORKERS", 2), \
+                patch.object(da, "ProcessPoolExecutor", return_value=pool) as make_pool:
+            analyzer.build_dependency_graph(str(repo_tree))
+            analyzer.build_dependency_graph(str(repo_tree))
+            da.close_analysis_pool()
+
+        make_pool.assert_called_once()
+        assert pool.map.call_count == 2
+        pool.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+
+
+class TestAnalyzeSerial:
+    """Tests for the read-ahead serial path."""
+
+    def test_results_in_input_order(self, analyzer, repo_tree, monkeypatch):
+        monkeypatch.setattr(da, "READ_AHEAD_FILES", 2)
+        paths = [str(repo_tree / p) for p in ("web/app.js", "pkg/util.py", "web/lib.ts", "pkg/core.py")]
+
+        results = analyzer._analyze_serial(paths)
+
+        assert [r["file"] for r in results] == paths
+        assert set(results[1]["imports"]) == {"sys", "re"}
+
+    def test_unreadable_file_reports_error(self, analyzer, repo_tree):
+        paths = [str(repo_tree / "missing.py"), str(repo_tree / "pkg" / "util.py")]
+
+        results = analyzer._analyze_serial(paths)
+
+        assert results[0]["imports"] == [] and "error" in results[0]
+        assert set(results[1]["imports"]) == {"sys", "re"}
+
+
+class TestDependencyCache:
+    """Tests for reusing per-file analysis across builds."""
+
+    def test_unchanged_files_are_not_reparsed(self, analyzer, repo_tree):
+        first = analyzer.build_dependency_graph(str(repo_tree))
+
+        with patch.object(analyzer, "analyze_file_dependencies") as analyze:
+            second = analyzer.build_dependency_graph(str(repo_tree))
+
+        analyze.assert_not_called()
+        assert second["dependencies"] == first["dependencies"]
+        assert _edge_set(second) == _edge_set(first)
+
+    def test_changed_file_is_reparsed(self, analyzer, repo_tree):
+        analyzer.build_dependency_graph(str(repo_tree))
+        (repo_tree / "web" / "lib.ts").write_text("import './helpers';\n")
+
+        graph = analyzer.build_dependency_graph(str(repo_tree))
+
+        assert graph["dependencies"]["web/lib.ts"] == ["./helpers"]
+        assert ("web/lib.ts", "web/helpers.js") in _edge_set(graph)
+
+    def test_corrupt_cache_is_ignored(self, analyzer, repo_tree, cache_dir):
+        analyzer.build_dependency_graph(str(repo_tree))
+        for path in cache_dir.iterdir():
+            path.write_text("{not json")
+
+        graph = analyzer.build_dependency_graph(str(repo_tree))
+
+        assert len(graph["nodes"]) == 7
+
+    def test_format_version_is_part_of_cache_key(self, analyzer, repo_tree, monkeypatch):
+        path = analyzer._file_cache_path(repo_tree)
+        monkeypatch.setattr(da, "DEPENDENCY_CACHE_VERSION", da.DEPENDENCY_CACHE_VERSION + 1)
+
+        assert analyzer._file_cache_path(repo_tree) != path
+
+    def test_stale_cache_files_are_pruned(self, analyzer, repo_tree, cache_dir):
+        stale = cache_dir / "stale.json"
+        recent = cache_dir / "recent.json"
+        stale.write_text("{}")
+        recent.write_text("{}")
+        os.utime(stale, (0, 0))
+
+        analyzer.build_dependency_graph(str(repo_tree))
+
+        assert not stale.exists()
+        assert recent.exists()
+        assert os.path.exists(analyzer._file_cache_path(repo_tree))
+
+
+class TestResolveImport:
+    """Tests for _resolve_import_to_file()."""
+
+    FILES = {
+        "web/app.js", "web/lib.ts", "web/lib/index.js", "web/ui/index.tsx",
+        "web/shared.py", "src/util.py", "src/util/__init__.py",
+    }
+
+    def resolve(self, analyzer, import_path, source):
+        language = analyzer._detect_language(source)
+        index = analyzer._build_resolution_index(
+            self.FILES,
+            da.RESOLVE_RELATIVE_EXTENSIONS[language],
+            da.RESOLVE_ABSOLUTE_SUFFIXES[language],
+        )
+        return analyzer._resolve_import_to_file(import_path, source, index)
+
+    def test_extension_order_follows_source_language(self, analyzer):
+        assert self.resolve(analyzer, "./lib", "web/main.ts") == "web/lib.ts"
+        assert self.resolve(analyzer, "./lib", "web/app.js") == "web/lib/index.js"
+
+    def test_directory_index(self, analyzer):
+        assert self.resolve(analyzer, "./ui", "web/app.js") == "web/ui/index.tsx"
+
+    def test_parent_directory(self, analyzer):
+        assert self.resolve(analyzer, "../web/lib.ts", "src/main.ts") == "web/lib.ts"
+
+    def test_js_never_resolves_to_python(self, analyzer):
+        assert self.resolve(analyzer, "./shared", "web/app.js") is None
+        assert self.resolve(analyzer, "./shared", "web/other.py") == "web/shared.py"
+
+    def test_absolute_path(self, analyzer):
+        assert self.resolve(analyzer, "src/util", "web/app.js") is None
+        assert self.resolve(analyzer, "web/lib", "web/app.js") == "web/lib.ts"
+
+    def test_external_package(self, analyzer):
+        assert self.resolve(analyzer, "react", "web/app.js") is None
+
+
+class TestGraphMetrics:
+    """Tests for _calculate_graph_metrics()."""
+
+    def test_top_files_by_degree(self, analyzer):
+        sources = [f"f{i}" for i in range(12)] + ["f0"] * 3
+        targets = ["hub"] * 12 + [f"f{i}" for i in range(1, 4)]
+
+        result = analyzer._calculate_graph_metrics(sources, targets)
+
+        assert result["most_critical_files"][0] == {"file": "hub", "dependents": 12}
+        assert len(result["most_critical_files"]) == 4
+        assert result["most_complex_files"][0] == {"file": "f0", "dependencies": 4}
+        assert len(result["most_complex_files"]) == 10
+        assert result["avg_dependencies"] == 15 / 12
+        assert result["total_edges"] == 15
+
+
+class TestFileImpact:
+    """Tests for get_file_impact()."""
+
+    def test_dependents_and_tests(self, analyzer, repo_tree):
+        graph = analyzer.build_dependency_graph(str(repo_tree))
+
+        impact = analyzer.get_file_impact(str(repo_tree), "web/lib.ts", graph)
+
+        assert impact["direct_dependents"] == ["web/app.js"]
+        assert impact["all_dependents"] == ["web/app.js"]
+        assert impact["risk_level"] == "low"
+
+    def test_direct_dependencies(self, analyzer, repo_tree):
+        graph = analyzer.build_dependency_graph(str(repo_tree))
+
+        impact = analyzer.get_file_impact(str(repo_tree), "web/app.js", graph)
+
+        assert sorted(impact["direct_dependencies"]) == ["web/helpers.js", "web/lib.ts"]
+        assert impact["dependency_count"] == 2
+        assert impact["all_dependents"] == []
+
+    def test_finds_test_files(self, analyzer, repo_tree):
+        graph = analyzer.build_dependency_graph(str(repo_tree))
+
+        impact = analyzer.get_file_impact(str(repo_tree), "pkg/core.py", graph)
+
+        assert impact["test_files"] == ["tests/test_core.py"]
+
+    def test_test_file_patterns(self, analyzer):
+        nodes = [{"id": i} for i in [
+            "tests/test_core.py", "core_test.go.py", "web/core.test.ts", "web/core.spec.js",
+            "pkg/core.py", "tests/test_other.py", "web/corex.ts",
+        ]]
+
+        result = analyzer._find_test_files("pkg/core.py", nodes)
+
+        assert result == ["tests/test_core.py", "core_test.go.py", "web/core.test.ts", "web/core.spec.js"]
+
+    def test_test_file_names_are_literal(self, analyzer):
+        nodes = [{"id": "tests/test_aXb.py"}, {"id": "tests/test_a.b.py"}]
+
+        assert analyzer._find_test_files("src/a.b.py", nodes) == ["tests/test_a.b.py"]
+
+    def test_transitive_dependents(self, analyzer):
+        dependents_map = {"a": ["b", "c"], "b": ["d"], "c": ["d"], "d": ["a"]}
+
+        result = analyzer._find_transitive_dependents("a", dependents_map)
+
+        assert sorted(result) == ["b", "c", "d"]
+
+
+class TestSaveToCache:
+    """Tests for save_to_cache()."""
+
+    def test_reverse_dependencies(self, analyzer):
+        graph = {
+            "dependencies": {"a.js": ["./b", "./b.js"], "b.js": [], "c.js": ["./b"]},
+            "edges": [
+                {"source": "a.js", "target": "b.js"},
+                {"source": "a.js", "target": "b.js"},
+                {"source": "c.js", "target": "b.js"},
+            ],
+            "metrics": {},
+        }
+        db = MagicMock()
+
+        with patch("services.supabase_service.get_supabase_service", return_value=db):
+            analyzer.save_to_cache("repo-1", graph)
+
+        rows = {r["file_path"]: r for r in db.upsert_file_dependencies.call_args[0][1]}
+        assert rows["b.js"]["depended_by"] == ["a.js", "c.js"]
+        assert rows["b.js"]["dependent_count"] == 2
+        assert rows["a.js"]["depended_by"] == []
+        assert rows["a.js"]["depends_on"] == ["b.js", "b.js"]
+
+    def test_upserts_in_batches_after_clear(self, analyzer):
+        graph = {
+            "dependencies": {f"f{i}.py": [] for i in range(5)},
+            "edges": [],
+            "metrics": {"avg_dependencies": 0},
+        }
+        db = MagicMock()
+        calls = []
+        db.clear_file_dependencies.side_effect = lambda repo_id: calls.append("clear")
+        db.upsert_file_dependencies.side_effect = lambda repo_id, rows: calls.append(len(rows))
+
+        with patch("services.supabase_service.get_supabase_service", return_value=db), \
+             patch.object(da, "FILE_DEPS_UPSERT_BATCH", 2):
+            analyzer.save_to_cache("repo-1", graph)
+
+        assert calls[0] == "clear"
+        assert sorted(calls[1:]) == [1, 2, 2]
+        db.upsert_repository_insights.assert_called_once()
+        assert db.upsert_repository_insights.call_args[0][1]["total_files"] == 5
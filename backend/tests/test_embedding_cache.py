@@ -0,0 +1,53 @@
+"""
+Tests for the on-disk EmbeddingCache.
+"""
+from array import array
+
+import pytest
+
+from services.embedding_cache import EmbeddingCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(str(tmp_path / "cache" / "embeddings.sqlite3"), "text-embedding-3-small")
+
+
+class TestEmbeddingCache:
+
+    def test_round_trip_in_input_order(self, cache):
+        cache.put_many(["a", "b"], [array("f", [1.0, 2.0]), array("f", [3.0, 4.0])])
+
+        assert cache.get_many(["b", "missing", "a"]) == [
+            array("f", [3.0, 4.0]),
+            None,
+            array("f", [1.0, 2.0]),
+        ]
+
+    def test_model_is_part_of_key(self, cache):
+        cache.put_many(["a"], [array("f", [1.0])])
+        other = EmbeddingCache(cache.path, "text-embedding-3-large")
+
+        assert other.get_many(["a"]) == [None]
+
+    def test_lookups_span_chunks(self, cache, monkeypatch):
+        monkeypatch.setattr("services.embedding_cache.LOOKUP_CHUNK_SIZE", 2)
+        texts = [str(i) for i in range(5)]
+        cache.put_many(texts, [array("f", [float(i)]) for i in range(5)])
+
+        assert cache.get_many(texts) == [array("f", [float(i)]) for i in range(5)]
+
+    def test_prunes_oldest_rows(self, tmp_path):
+        cache = EmbeddingCache(str(tmp_path / "e.sqlite3"), "m", max_rows=2)
+        cache.put_many(["a"], [array("f", [1.0])])
+        cache.put_many(["b", "c"], [array("f", [2.0]), array("f", [3.0])])
+
+        assert cache.get_many(["a", "b", "c"]) == [None, array("f", [2.0]), array("f", [3.0])]
+
+    def test_unusable_path_acts_as_miss(self, tmp_path):
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+        cache = EmbeddingCache(str(blocker / "e.sqlite3"), "m")
+
+        cache.put_many(["a"], [array("f", [1.0])])
+        assert cache.get_many(["a"]) == [None]
@@ -0,0 +1,800 @@
+"""
+Tests for OptimizedCodeIndexer internals that don't need OpenAI/Pinecone.
+"""
+import asyncio
+import base64
+import os
+import sys
+from array import array
+from unittest.mock import AsyncMock, MagicMock, call, patch
+import threading
+import pytest
+
+from services.embedding_cache import EmbeddingCache
+from services.indexer_optimized import (
+    EMBEDDING_DIMENSIONS, OptimizedCodeIndexer, _count_tokens, _extract_definitions, _get_parser,
+    _parse_name_status, _quantize_int8, _vector_id,
+)
+
+
+@pytest.fixture
+def indexer(monkeypatch):
+    # Token counts from the length estimate: loading the tokenizer needs network
+    monkeypatch.setattr("services.indexer_optimized._token_encoding", lambda: None)
+    indexer = OptimizedCodeIndexer()
+    indexer.embedding_cache = None
+    return indexer
+
+
+class TestPineconeClient:
+    """Tests for REST/gRPC client selection."""
+
+    def test_rest_by_default(self):
+        from services.indexer_optimized import _create_pinecone_client
+        with patch("services.indexer_optimized.Pinecone") as rest:
+            assert _create_pinecone_client() is rest.return_value
+
+    def test_grpc_when_enabled(self, monkeypatch):
+        from services.indexer_optimized import _create_pinecone_client
+        monkeypatch.setattr("services.indexer_optimized.PINECONE_USE_GRPC", True)
+        grpc_module = MagicMock()
+        monkeypatch.setitem(sys.modules, "pinecone.grpc", grpc_module)
+
+        assert _create_pinecone_client() is grpc_module.PineconeGRPC.return_value
+
+    def test_falls_back_to_rest_without_grpc_extra(self, monkeypatch):
+        from services.indexer_optimized import _create_pinecone_client
+        monkeypatch.setattr("services.indexer_optimized.PINECONE_USE_GRPC", True)
+        monkeypatch.setitem(sys.modules, "pinecone.grpc", None)
+        with patch("services.indexer_optimized.Pinecone") as rest:
+            assert _create_pinecone_client() is rest.return_value
+
+
+class TestOpenAIClient:
+    """Tests for the pooled OpenAI HTTP client."""
+
+    def test_passes_pooled_http_client(self):
+        import httpx
+        from services.indexer_optimized import OPENAI_HTTP_TIMEOUT, _create_openai_client
+        with patch("services.indexer_optimized.AsyncOpenAI") as openai_cls:
+            _create_openai_client()
+
+        http_client = openai_cls.call_args.kwargs["http_client"]
+        assert isinstance(http_client, httpx.AsyncClient)
+        assert http_client.timeout == OPENAI_HTTP_TIMEOUT
+
+
+class TestCountTokens:
+    """Tests for token counting used in batch packing."""
+
+    def test_uses_tokenizer(self, monkeypatch):
+        encoding = MagicMock()
+        encoding.encode_ordinary_batch.return_value = [[1, 2, 3], [4]]
+        monkeypatch.setattr("services.indexer_optimized._token_encoding", lambda: encoding)
+
+        assert _count_tokens(["def f(): pass", "x"]) == [3, 1]
+
+    def test_estimates_without_tokenizer(self, monkeypatch):
+        monkeypatch.setattr("services.indexer_optimized._token_encoding", lambda: None)
+
+        assert _count_tokens(["", "x" * 40]) == [1, 11]
+
+
+class TestEmbedTexts:
+    """Tests for _embed_texts() batching and concurrency."""
+
+    @pytest.mark.asyncio
+    async def test_preserves_order_across_batches(self, indexer, monkeypatch):
+        monkeypatch.setattr(indexer, "EMBEDDING_BATCH_SIZE", 3)
+
+        async def fake_batch(texts):
+            # Later batches finish first
+            await asyncio.sleep(0.01 / (int(texts[0]) + 1))
+            return [[float(t)] for t in texts]
+
+        monkeypatch.setattr(indexer, "_create_embeddings_batch", fake_batch)
+
+        texts = [str(i) for i in range(10)]
+        embeddings = await indexer._embed_texts(texts)
+
+        assert embeddings == [[float(i)] for i in range(10)]
+
+    @pytest.mark.asyncio
+    async def test_bounds_in_flight_requests(self, indexer, monkeypatch):
+        monkeypatch.setattr(indexer, "EMBEDDING_BATCH_SIZE", 1)
+        monkeypatch.setattr(indexer, "EMBEDDING_CONCURRENCY", 2)
+        in_flight = 0
+        peak = 0
+
+        async def fake_batch(texts):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.001)
+            in_flight -= 1
+            return [[0.0] for _ in texts]
+
+        monkeypatch.setattr(indexer, "_create_embeddings_batch", fake_batch)
+
+        await indexer._embed_texts([str(i) for i in range(8)])
+
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_bound_shared_across_calls(self, indexer, monkeypatch):
+        monkeypatch.setattr(indexer, "EMBEDDING_BATCH_SIZE", 1)
+        monkeypatch.setattr(indexer, "EMBEDDING_CONCURRENCY", 3)
+        in_flight = 0
+        peak = 0
+
+        async def fake_batch(texts):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.001)
+            in_flight -= 1
+            return [[0.0] for _ in texts]
+
+        monkeypatch.setattr(indexer, "_create_embeddings_batch", fake_batch)
+
+        # Two indexing jobs at once still get three slots between them
+        await asyncio.gather(
+            indexer._embed_texts([f"a{i}" for i in range(6)]),
+            indexer._embed_texts([f"b{i}" for i in range(6)]),
+        )
+
+        assert peak == 3
+
+    @pytest.mark.asyncio
+    async def test_empty_input(self, indexer):
+        assert await indexer._embed_texts([]) == []
+
+    @pytest.mark.asyncio
+    async def test_duplicate_texts_embedded_once(self, indexer, monkeypatch):
+        sent = []
+
+        async def fake_batch(texts):
+            sent.extend(texts)
+            return [array("f", [float(len(t))]) for t in texts]
+
+        monkeypatch.setattr(indexer, "_create_embeddings_batch", fake_batch)
+
+        embeddings = await indexer._embed_texts(["aa", "b", "aa", "b", "ccc"])
+
+        assert sorted(sent) == ["aa", "b", "ccc"]
+        assert embeddings == [array("f", [n]) for n in (2.0, 1.0, 2.0, 1.0, 3.0)]
+
+    @pytest.mark.asyncio
+    async def test_batches_grouped_by_length(self, indexer, monkeypatch):
+        monkeypatch.setattr(indexer, "EMBEDDING_BATCH_SIZE", 2)
+        batches = []
+
+        async def fake_batch(texts):
+            batches.append(texts)
+            return [array("f", [float(len(t))]) for t in texts]
+
+        monkeypatch.setattr(indexer, "_create_embeddings_batch", fake_batch)
+
+        texts = ["x" * n for n in (40, 1, 30, 2)]
+        embeddings = await indexer._embed_texts(texts)
+
+        assert sorted(batches) == [["x", "xx"], ["x" * 30, "x" * 40]]
+        assert embeddings == [array("f", [n]) for n in (40.0, 1.0, 30.0, 2.0)]
+
+    @pytest.mark.asyncio
+    async def test_batches_capped_by_tokens(self, indexer, monkeypatch):
+        monkeypatch.setattr(indexer, "EMBEDDING_BATCH_TOKENS", 10)
+        monkeypatch.setattr("services.indexer_optimized._count_tokens", lambda texts: [4] * len(texts))
+        batches = []
+
+        async def fake_batch(texts):
+            batches.append(len(texts))
+            return [array("f", [0.0]) for _ in texts]
+
+        monkeypatch.setattr(indexer, "_create_embeddings_batch", fake_batch)
+
+        await indexer._embed_texts(["aaaa", "bbbb", "cccc", "dddd"])
+
+        assert batches == [2, 2]
+
+    @pytest.mark.asyncio
+    async def test_cached_texts_skip_the_api(self, indexer, tmp_path, monkeypatch):
+        indexer.embedding_cache = EmbeddingCache(str(tmp_path / "emb.sqlite3"), "test-model")
+        sent = []
+
+        async def fake_batch(texts):
+            sent.extend(texts)
+            return [array("f", [float(len(t)), 1.0]) for t in texts]
+
+        monkeypatch.setattr(indexer, "_create_embeddings_batch", fake_batch)
+
+        first = await indexer._embed_texts(["a", "bb"])
+        second = await indexer._embed_texts(["bb", "ccc", "a"])
+
+        assert sent == ["a", "bb", "ccc"]
+        assert second == [first[1], array("f", [3.0, 1.0]), first[0]]
+
+    @pytest.mark.asyncio
+    async def test_failed_embeddings_not_cached(self, indexer, tmp_path, monkeypatch):
+        indexer.embedding_cache = EmbeddingCache(str(tmp_path / "emb.sqlite3"), "test-model")
+
+        async def failing_batch(texts):
+            return [array("f", [0.0, 0.0]) for _ in texts]
+
+        monkeypatch.setattr(indexer, "_create_embeddings_batch", failing_batch)
+        await indexer._embed_texts(["a"])
+
+        assert indexer.embedding_cache.get_many(["a"]) == [None]
+
+
+class TestDiscoverCodeFiles:
+    """Tests for _discover_code_files()."""
+
+    def test_finds_code_and_prunes_skipped_dirs(self, indexer, tmp_path):
+        for rel in ["app.py", "src/ui.tsx", "src/README.md", "node_modules/lib/index.js", "src/.next/page.js"]:
+            path = tmp_path / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text("")
+
+        files = indexer._discover_code_files(str(tmp_path))
+
+        assert sorted(os.path.relpath(f, tmp_path) for f in files) == ["app.py", os.path.join("src", "ui.tsx")]
+
+
+class TestDetectLanguage:
+
+    @pytest.mark.parametrize("path,language", [
+        ("src/app.py", "python"),
+        ("ui/App.JSX", "javascript"),
+        ("lib/types.d.ts", "typescript"),
+        ("README.md", None),
+        ("Makefile", None),
+        ("dir.py/file", None),
+    ])
+    def test_detects_by_extension(self, indexer, path, language):
+        assert indexer._detect_language(path) == language
+
+
+class TestVectorId:
+    """Vector IDs must not change, or re-indexing duplicates vectors."""
+
+    def test_id_is_stable(self):
+        assert _vector_id("repo-1", "src/app.py", 12) == "1eda061dd148679fbfa1a6add4d232ba"
+
+
+class TestBuildVectors:
+    """Tests for Pinecone record construction."""
+
+    FUNC = {"file_path": "a.py", "name": "f", "type": "function_definition",
+            "code": "x" * 2000, "start_line": 3, "end_line": 9, "language": "python"}
+
+    def test_builds_records(self, indexer):
+        [vector] = indexer._build_vectors("repo-1", [self.FUNC], [array("f", [0.5, -0.25])])
+
+        assert vector["id"] == _vector_id("repo-1", "a.py", 3)
+        assert vector["values"] == [0.5, -0.25]
+        assert vector["metadata"]["repo_id"] == "repo-1"
+        assert len(vector["metadata"]["code"]) == 1000
+
+    def test_int8_values_when_enabled(self, indexer, monkeypatch):
+        monkeypatch.setattr("services.indexer_optimized.EMBEDDING_DTYPE", "int8")
+
+        [vector] = indexer._build_vectors("repo-1", [self.FUNC], [array("f", [0.5, -0.25])])
+
+        assert vector["values"] == [127.0, -64.0]
+
+    def test_int8_skipped_on_grpc_client(self, indexer, monkeypatch):
+        monkeypatch.setattr("services.indexer_optimized.EMBEDDING_DTYPE", "int8")
+        monkeypatch.setattr(indexer, "_pinecone_grpc", True)
+
+        [vector] = indexer._build_vectors("repo-1", [self.FUNC], [array("f", [0.5, -0.25])])
+
+        assert vector["values"] == [0.5, -0.25]
+
+    def test_skips_failed_embeddings(self, indexer):
+        other = dict(self.FUNC, start_line=20)
+
+        vectors = indexer._build_vectors(
+            "repo-1", [self.FUNC, other], [array("f", [0.0, 0.0]), array("f", [0.5, 0.5])]
+        )
+
+        assert [v["id"] for v in vectors] == [_vector_id("repo-1", "a.py", 20)]
+
+    def test_quantize_keeps_direction(self):
+        embedding = array("f", [0.013 * ((i * 7919) % 97 - 48) for i in range(1536)])
+        quantized = _quantize_int8(embedding)
+
+        dot = sum(a * b for a, b in zip(embedding, quantized))
+        norms = (sum(a * a for a in embedding) * sum(b * b for b in quantized)) ** 0.5
+        assert dot / norms > 0.999
+        assert all(v.is_integer() and -127 <= v <= 127 for v in quantized)
+
+    def test_quantize_leaves_zero_vector(self):
+        assert _quantize_int8(array("f", [0.0, 0.0])) == [0.0, 0.0]
+
+
+class TestCreateEmbeddingsBatch:
+    """Tests for embedding response decoding."""
+
+    @pytest.mark.asyncio
+    async def test_unpacks_base64_float32(self, indexer, monkeypatch):
+        packed = base64.b64encode(array("f", [0.5, -1.0, 2.0]).tobytes()).decode()
+        create = AsyncMock(return_value=MagicMock(data=[MagicMock(embedding=packed)]))
+        monkeypatch.setattr(indexer.openai_client.embeddings, "create", create)
+
+        [embedding] = await indexer._create_embeddings_batch(["def f(): pass"])
+
+        assert create.call_args.kwargs["encoding_format"] == "base64"
+        assert "dimensions" not in create.call_args.kwargs
+        assert embedding == array("f", [0.5, -1.0, 2.0])
+
+    @pytest.mark.asyncio
+    async def test_requests_shortened_dimensions(self, indexer, monkeypatch):
+        packed = base64.b64encode(array("f", [0.5]).tobytes()).decode()
+        create = AsyncMock(return_value=MagicMock(data=[MagicMock(embedding=packed)]))
+        monkeypatch.setattr(indexer.openai_client.embeddings, "create", create)
+        monkeypatch.setattr("services.indexer_optimized.EMBEDDING_REQUEST_OPTIONS", {"dimensions": 512})
+
+        await indexer._create_embeddings_batch(["def f(): pass"])
+
+        assert create.call_args.kwargs["dimensions"] == 512
+
+    @pytest.mark.asyncio
+    async def test_zero_vectors_on_error(self, indexer, monkeypatch):
+        monkeypatch.setattr(indexer.openai_client.embeddings, "create", AsyncMock(side_effect=RuntimeError("boom")))
+        monkeypatch.setattr("services.indexer_optimized.capture_exception", MagicMock())
+
+        embeddings = await indexer._create_embeddings_batch(["a", "b"])
+
+        assert len(embeddings) == 2
+        assert not any(embeddings[0]) and len(embeddings[0]) == EMBEDDING_DIMENSIONS
+
+
+class TestUpsertVectors:
+    """Tests for _upsert_vectors() batching."""
+
+    def test_upserts_every_batch(self, indexer, monkeypatch):
+        monkeypatch.setattr(indexer, "PINECONE_UPSERT_BATCH", 3)
+        indexer.index.upsert.reset_mock()
+        vectors = [{"id": str(i)} for i in range(10)]
+
+        indexer._upsert_vectors(vectors)
+
+        sent = [c.kwargs["vectors"] for c in indexer.index.upsert.call_args_list]
+        assert sorted(len(batch) for batch in sent) == [1, 3, 3, 3]
+        assert sorted(v["id"] for batch in sent for v in batch) == sorted(v["id"] for v in vectors)
+
+    def test_propagates_upsert_failure(self, indexer, monkeypatch):
+        monkeypatch.setattr(indexer, "PINECONE_UPSERT_BATCH", 1)
+        indexer.index.upsert.side_effect = RuntimeError("pinecone down")
+        try:
+            with pytest.raises(RuntimeError):
+                indexer._upsert_vectors([{"id": "a"}, {"id": "b"}])
+        finally:
+            indexer.index.upsert.side_effect = None
+
+
+class TestPineconeRetry:
+    """Tests for retrying transient Pinecone failures."""
+
+    @staticmethod
+    def api_error(status, headers=None):
+        error = Exception(f"HTTP {status}")
+        error.status = status
+        error.headers = headers or {}
+        return error
+
+    def test_retries_rate_limit(self, indexer, monkeypatch):
+        sleeps = []
+        monkeypatch.setattr("services.indexer_optimized.time.sleep", sleeps.append)
+        indexer.index.upsert.reset_mock()
+        indexer.index.upsert.side_effect = [self.api_error(429, {"retry-after": "2"}), None]
+        try:
+            indexer._upsert_vectors([{"id": "a"}])
+        finally:
+            indexer.index.upsert.side_effect = None
+
+        assert indexer.index.upsert.call_count == 2
+        assert sleeps == [2.0]
+
+    def test_client_errors_not_retried(self, indexer, monkeypatch):
+        monkeypatch.setattr("services.indexer_optimized.time.sleep", MagicMock())
+        indexer.index.upsert.reset_mock()
+        indexer.index.upsert.side_effect = self.api_error(400)
+        try:
+            with pytest.raises(Exception, match="HTTP 400"):
+                indexer._upsert_vectors([{"id": "a"}])
+        finally:
+            indexer.index.upsert.side_effect = None
+
+        assert indexer.index.upsert.call_count == 1
+
+    def test_gives_up_after_max_retries(self, indexer, monkeypatch):
+        monkeypatch.setattr("services.indexer_optimized.time.sleep", MagicMock())
+        monkeypatch.setattr("services.indexer_optimized.PINECONE_MAX_RETRIES", 2)
+        indexer.index.upsert.reset_mock()
+        indexer.index.upsert.side_effect = ConnectionResetError("reset")
+        try:
+            with pytest.raises(ConnectionResetError):
+                indexer._upsert_vectors([{"id": "a"}])
+        finally:
+            indexer.index.upsert.side_effect = None
+
+        assert indexer.index.upsert.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_search_query_retried(self, indexer, monkeypatch):
+        monkeypatch.setattr("services.indexer_optimized.time.sleep", MagicMock())
+        monkeypatch.setattr(indexer, "_create_embeddings_batch", AsyncMock(return_value=[array("f", [0.5])]))
+        match = MagicMock(score=0.9, metadata={"name": "f", "code": "def f(): pass"})
+        indexer.index.query.reset_mock()
+        indexer.index.query.side_effect = [self.api_error(429), MagicMock(matches=[match])]
+        try:
+            results = await indexer.semantic_search(
+                "f", "repo-1", use_query_expansion=False, use_reranking=False
+            )
+        finally:
+            indexer.index.query.side_effect = None
+
+        assert indexer.index.query.call_count == 2
+        assert [r["name"] for r in results] == ["f"]
+
+    def test_delete_retried(self, indexer, monkeypatch):
+        monkeypatch.setattr("services.indexer_optimized.time.sleep", MagicMock())
+        indexer.index.delete.reset_mock()
+        indexer.index.delete.side_effect = [self.api_error(503), None]
+        try:
+            indexer._delete_file_vectors("repo-1", ["/repo/a.py"])
+        finally:
+            indexer.index.delete.side_effect = None
+
+        assert indexer.index.delete.call_count == 2
+
+    def test_rejected_filter_delete_falls_back_to_ids(self, indexer, monkeypatch):
+        monkeypatch.setattr(indexer, "PINECONE_DELETE_QUERY_TOP_K", 2)
+        page = [MagicMock(id="v1"), MagicMock(id="v2")]
+        indexer.index.delete.reset_mock()
+        indexer.index.query.reset_mock()
+        indexer.index.delete.side_effect = [self.api_error(400), None, None]
+        indexer.index.query.side_effect = [MagicMock(matches=page), MagicMock(matches=[MagicMock(id="v3")])]
+        try:
+            indexer._delete_file_vectors("repo-1", ["/repo/a.py"])
+        finally:
+            indexer.index.delete.side_effect = None
+            indexer.index.query.side_effect = None
+
+        vector_filter = {"repo_id": {"$eq": "repo-1"}, "file_path": {"$in": ["/repo/a.py"]}}
+        assert indexer.index.query.call_args.kwargs["filter"] == vector_filter
+        assert indexer.index.delete.call_args_list[1:] == [call(ids=["v1", "v2"]), call(ids=["v3"])]
+
+
+class TestParseFile:
+    """Tests for _extract_functions_from_file() parsing paths."""
+
+    SOURCE = "class Greeter:\n    def greet(self):\n        return 'hi'\n\ndef main():\n    pass\n"
+
+    @pytest.fixture
+    def py_file(self, tmp_path):
+        path = tmp_path / "app.py"
+        path.write_text(self.SOURCE)
+        return str(path)
+
+    @pytest.mark.asyncio
+    async def test_extracts_definitions_in_process(self, indexer, py_file, monkeypatch):
+        monkeypatch.setattr("services.indexer_optimized.MAX_PARSE_WORKERS", 1)
+
+        functions = await indexer._extract_functions_from_file("repo", py_file)
+
+        assert [f["name"] for f in functions] == ["Greeter", "greet", "main"]
+        assert all(f["file_path"] == py_file and f["language"] == "python" for f in functions)
+        assert indexer._parse_pool is None
+
+    @pytest.mark.asyncio
+    async def test_process_pool_matches_in_process(self, indexer, py_file, monkeypatch):
+        monkeypatch.setattr("services.indexer_optimized.MAX_PARSE_WORKERS", 1)
+        expected = await indexer._extract_functions_from_file("repo", py_file)
+
+        monkeypatch.setattr("services.indexer_optimized.MAX_PARSE_WORKERS", 2)
+        try:
+            functions = await indexer._extract_functions_from_file("repo", py_file)
+            assert indexer._parse_pool is not None
+        finally:
+            if indexer._parse_pool:
+                indexer._parse_pool.shutdown()
+
+        assert functions == expected
+
+    @pytest.mark.asyncio
+    async def test_close_stops_pool(self, indexer, py_file, monkeypatch):
+        monkeypatch.setattr("services.indexer_optimized.MAX_PARSE_WORKERS", 2)
+        await indexer._extract_functions_from_file("repo", py_file)
+        pool = indexer._parse_pool
+
+        indexer.close()
+
+        assert indexer._parse_pool is None
+        with pytest.raises(RuntimeError):
+            pool.submit(len, "x")
+
+    @pytest.mark.asyncio
+    async def test_missing_file_keeps_pool(self, indexer, tmp_path, monkeypatch):
+        monkeypatch.setattr("services.indexer_optimized.MAX_PARSE_WORKERS", 2)
+        try:
+            assert await indexer._extract_functions_from_file("repo", str(tmp_path / "gone.py")) == []
+            # A read error in the worker is the file's problem, not the pool's
+            assert indexer._parse_pool is not None
+        finally:
+            if indexer._parse_pool:
+                indexer._parse_pool.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_large_file_parsed_via_mmap(self, indexer, tmp_path, monkeypatch):
+        monkeypatch.setattr("services.indexer_optimized.MAX_PARSE_WORKERS", 1)
+        monkeypatch.setattr("services.indexer_optimized.MMAP_MIN_BYTES", 1)
+        path = tmp_path / "big.py"
+        path.write_text(self.SOURCE + "def caf\u00e9():\n    pass\n")
+
+        functions = await indexer._extract_functions_from_file("repo", str(path))
+
+        assert [f["name"] for f in functions] == ["Greeter", "greet", "main", "caf\u00e9"]
+
+    @pytest.mark.asyncio
+    async def test_empty_file(self, indexer, tmp_path, monkeypatch):
+        monkeypatch.setattr("services.indexer_optimized.MAX_PARSE_WORKERS", 1)
+        path = tmp_path / "empty.py"
+        path.write_text("")
+
+        assert await indexer._extract_functions_from_file("repo", str(path)) == []
+
+    @pytest.mark.asyncio
+    async def test_unsupported_file_is_skipped(self, indexer, tmp_path):
+        path = tmp_path / "README.md"
+        path.write_text("# readme")
+        assert await indexer._extract_functions_from_file("repo", str(path)) == []
+
+
+class TestParserPool:
+    """Tests for per-thread parser reuse."""
+
+    def test_parser_reused_within_thread(self):
+        assert _get_parser("python") is _get_parser("python")
+        assert _get_parser("python") is not _get_parser("javascript")
+
+    def test_threads_get_their_own_parser(self):
+        main_parser = _get_parser("python")
+        seen = []
+        thread = threading.Thread(target=lambda: seen.append(_get_parser("python")))
+        thread.start()
+        thread.join()
+
+        assert seen[0] is not main_parser
+
+
+class TestExtractDefinitions:
+    """Tests for the AST walk that collects definitions."""
+
+    def _extract(self, language, source):
+        source_code = source.encode()
+        tree = _get_parser(language).parse(source_code)
+        return _extract_definitions(tree.root_node, source_code, language)
+
+    def test_nested_definitions_in_document_order(self):
+        functions = self._extract("python", "def outer():\n    def inner():\n        pass\n\nclass C:\n    pass\n")
+
+        assert [(f["name"], f["start_line"]) for f in functions] == [("outer", 0), ("inner", 1), ("C", 4)]
+        assert functions[1]["code"] == "def inner():\n        pass"
+
+    def test_js_method_and_arrow_names(self):
+        functions = self._extract("javascript", "class A {\n  greet() {}\n}\nconst f = () => 1;\n")
+
+        assert [(f["name"], f["type"]) for f in functions] == [
+            ("greet", "method_definition"),
+            ("anonymous", "arrow_function"),
+        ]
+
+    def test_mixed_kinds_sorted_by_position(self):
+        source = "class A { m() { const x = () => 1 } }\nfunction f() {}\n"
+        functions = self._extract("javascript", source)
+
+        assert [f["type"] for f in functions] == ["method_definition", "arrow_function", "function_declaration"]
+
+    def test_non_ascii_source(self):
+        functions = self._extract("python", "def f():\n    return 'h\u00e9llo'\n")
+
+        assert functions[0]["code"].endswith("'h\u00e9llo'")
+
+
+class TestIndexPipeline:
+    """Tests for the streaming parse -> embed -> upsert pipeline."""
+
+    @pytest.fixture
+    def repo(self, tmp_path):
+        for i in range(5):
+            (tmp_path / f"mod{i}.py").write_text(f"def a{i}():\n    pass\n\ndef b{i}():\n    pass\n")
+        return tmp_path
+
+    @pytest.fixture
+    def pipeline_indexer(self, indexer, monkeypatch):
+        monkeypatch.setattr("services.indexer_optimized.MAX_PARSE_WORKERS", 1)
+        monkeypatch.setattr(indexer, "EMBEDDING_BATCH_SIZE", 3)
+        monkeypatch.setattr(indexer, "FILE_BATCH_SIZE", 2)
+
+        async def fake_batch(texts):
+            return [array("f", [1.0, 0.0]) for _ in texts]
+
+        monkeypatch.setattr(indexer, "_create_embeddings_batch", fake_batch)
+        indexer.index.upsert.reset_mock()
+        return indexer
+
+    @pytest.mark.asyncio
+    async def test_indexes_every_function_with_progress(self, pipeline_indexer, repo):
+        progress = []
+
+        async def on_progress(files, functions, total):
+            progress.append((files, functions, total))
+
+        count = await pipeline_indexer.index_repository_with_progress("repo-1", str(repo), on_progress)
+
+        assert count == 10
+        upserted = [v for c in pipeline_indexer.index.upsert.call_args_list for v in c.kwargs["vectors"]]
+        assert sorted(v["metadata"]["name"] for v in upserted) == sorted(
+            f"{p}{i}" for p in "ab" for i in range(5)
+        )
+        assert all(len(c.kwargs["vectors"]) <= 3 for c in pipeline_indexer.index.upsert.call_args_list)
+        assert progress == [(2, 4, 5), (4, 8, 5), (5, 10, 5)]
+
+    @pytest.mark.asyncio
+    async def test_upsert_failure_propagates(self, pipeline_indexer, repo):
+        pipeline_indexer.index.upsert.side_effect = RuntimeError("pinecone down")
+        try:
+            with pytest.raises(RuntimeError, match="pinecone down"):
+                await pipeline_indexer._index_files("repo-1", pipeline_indexer._discover_code_files(str(repo)))
+        finally:
+            pipeline_indexer.index.upsert.side_effect = None
+
+    @pytest.mark.asyncio
+    async def test_no_functions(self, pipeline_indexer, tmp_path):
+        (tmp_path / "empty.py").write_text("x = 1\n")
+
+        files = pipeline_indexer._discover_code_files(str(tmp_path))
+
+        assert await pipeline_indexer._index_files("repo-1", files) == 0
+        pipeline_indexer.index.upsert.assert_not_called()
+
+
+class TestExplainCode:
+    """Tests for explain_code() code lookup."""
+
+    SOURCE = "def helper():\n    return 1\n\ndef target():\n    return 'café'\n"
+
+    @pytest.fixture
+    def explain_indexer(self, indexer, monkeypatch):
+        create = AsyncMock(return_value=MagicMock(choices=[MagicMock(message=MagicMock(content="ok"))]))
+        monkeypatch.setattr(indexer.openai_client.chat.completions, "create", create)
+        return indexer
+
+    def _prompt(self, indexer):
+        return indexer.openai_client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+
+    @pytest.mark.asyncio
+    async def test_uses_pinecone_metadata(self, explain_indexer, monkeypatch):
+        match = MagicMock(metadata={"code": "def target(): pass"})
+        monkeypatch.setattr(explain_indexer.index, "query", MagicMock(return_value=MagicMock(matches=[match])))
+
+        result = await explain_indexer.explain_code("repo-1", "/missing/file.py", "target")
+
+        assert result == "ok"
+        assert "def target(): pass" in self._prompt(explain_indexer)
+        query_filter = explain_indexer.index.query.call_args.kwargs["filter"]
+        assert query_filter["name"] == {"$eq": "target"}
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_parsing_file(self, explain_indexer, tmp_path, monkeypatch):
+        monkeypatch.setattr(explain_indexer.index, "query", MagicMock(return_value=MagicMock(matches=[])))
+        path = tmp_path / "mod.py"
+        path.write_bytes(self.SOURCE.encode() + b"# \xff\n")
+
+        await explain_indexer.explain_code("repo-1", str(path), "target")
+
+        prompt = self._prompt(explain_indexer)
+        assert "def target():" in prompt and "helper" not in prompt
+
+    @pytest.mark.asyncio
+    async def test_truncated_metadata_reads_file(self, explain_indexer, tmp_path, monkeypatch):
+        match = MagicMock(metadata={"code": "x" * 1000})
+        monkeypatch.setattr(explain_indexer.index, "query", MagicMock(return_value=MagicMock(matches=[match])))
+        path = tmp_path / "mod.py"
+        path.write_text(self.SOURCE)
+
+        await explain_indexer.explain_code("repo-1", str(path), "target")
+
+        assert "def target():" in self._prompt(explain_indexer)
+
+
+class TestIncrementalIndex:
+    """Tests for changed-file detection in incremental_index_repository()."""
+
+    @pytest.fixture
+    def repo_dir(self, tmp_path):
+        (tmp_path / "a.py").write_text("")
+        (tmp_path / "with space.py").write_text("")
+        return tmp_path
+
+    @pytest.fixture
+    def git_repo(self, monkeypatch):
+        repo = MagicMock()
+        repo.head.commit.hexsha = "c" * 40
+        monkeypatch.setattr("git.Repo", MagicMock(return_value=repo))
+        return repo
+
+    @pytest.fixture
+    def indexed(self, indexer, monkeypatch):
+        calls = []
+
+        async def fake_index_files(repo_id, files, progress_callback=None):
+            calls.append(sorted(files))
+            return len(files)
+
+        monkeypatch.setattr(indexer, "_index_files", fake_index_files)
+        return calls
+
+    @pytest.mark.asyncio
+    async def test_single_diff_when_commit_present(self, indexer, repo_dir, git_repo, indexed):
+        git_repo.git.diff.return_value = "M\0a.py\0A\0with space.py\0D\0deleted.py\0M\0README.md\0"
+
+        count = await indexer.incremental_index_repository("repo-1", str(repo_dir), "b" * 40)
+
+        assert count == 2
+        assert indexed == [[str(repo_dir / "a.py"), str(repo_dir / "with space.py")]]
+        git_repo.git.diff.assert_called_once()
+        git_repo.git.fetch.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_deletes_vectors_of_changed_and_removed_files(self, indexer, repo_dir, git_repo, indexed):
+        git_repo.git.diff.return_value = "M\0a.py\0D\0deleted.py\0R087\0old.py\0with space.py\0M\0README.md\0"
+        indexer.index.delete.reset_mock()
+
+        await indexer.incremental_index_repository("repo-1", str(repo_dir), "b" * 40)
+
+        indexer.index.delete.assert_called_once_with(filter={
+            "repo_id": {"$eq": "repo-1"},
+            "file_path": {"$in": [
+                str(repo_dir / "a.py"), str(repo_dir / "with space.py"),
+                str(repo_dir / "deleted.py"), str(repo_dir / "old.py"),
+            ]},
+        })
+        assert indexed == [[str(repo_dir / "a.py"), str(repo_dir / "with space.py")]]
+        assert "--name-status" in git_repo.git.diff.call_args.args
+
+    @pytest.mark.asyncio
+    async def test_failed_stale_delete_is_reported(self, indexer, repo_dir, git_repo, indexed, monkeypatch):
+        git_repo.git.diff.return_value = "M\0a.py\0"
+        monkeypatch.setattr(indexer, "_delete_file_vectors", MagicMock(side_effect=Exception("HTTP 400")))
+        capture = MagicMock()
+        monkeypatch.setattr("services.indexer_optimized.capture_exception", capture)
+
+        with patch("services.indexer_optimized.metrics") as metrics:
+            count = await indexer.incremental_index_repository("repo-1", str(repo_dir), "b" * 40)
+
+        assert count == 1
+        metrics.increment.assert_any_call("stale_vector_delete_failed")
+        assert capture.call_args.kwargs["operation"] == "delete_stale_vectors"
+
+    def test_parse_name_status(self):
+        changed, removed = _parse_name_status(
+            "A\0new.py\0M\0line\nbreak.py\0D\0gone.py\0R100\0from.py\0to.py\0C075\0src.py\0copy.py\0"
+        )
+
+        assert changed == ["new.py", "line\nbreak.py", "to.py", "copy.py"]
+        assert removed == ["gone.py", "from.py"]
+
+    @pytest.mark.asyncio
+    async def test_fetches_missing_commit_and_retries(self, indexer, repo_dir, git_repo, indexed):
+        import git
+        git_repo.git.diff.side_effect = [git.GitCommandError("diff", 128, "bad object"), "M\0a.py\0"]
+
+        count = await indexer.incremental_index_repository("repo-1", str(repo_dir), "b" * 40)
+
+        assert count == 1
+        git_repo.git.fetch.assert_called_once_with('--depth=1', '--filter=blob:none', 'origin', "b" * 40)
+        assert git_repo.git.diff.call_count == 2
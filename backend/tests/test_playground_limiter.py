@@ -461,6 +461,39 @@ class TestHelperMethods:
         assert token1 != token2
         assert len(token1) > 20  # Should be reasonably long
 
+    def test_incr_with_ttl_sets_ttl_on_first_hit(self, limiter, mock_redis):
+        """First increment should set the TTL."""
+        mock_redis.incr.return_value = 1
+
+        assert limiter._incr_with_ttl("playground:ip:abc", 86400) == 1
+        mock_redis.expire.assert_called_once_with("playground:ip:abc", 86400)
+
+    def test_incr_with_ttl_repairs_missing_ttl(self, limiter, mock_redis):
+        """Periodic check should re-apply a lost TTL."""
+        mock_redis.incr.return_value = limiter.TTL_CHECK_INTERVAL
+        mock_redis.ttl.return_value = -1
+
+        limiter._incr_with_ttl("playground:global:hourly", 3600)
+
+        mock_redis.expire.assert_called_once_with("playground:global:hourly", 3600)
+
+    def test_incr_with_ttl_skips_check_between_intervals(self, limiter, mock_redis):
+        """Increments between checks should not touch TTL."""
+        mock_redis.incr.return_value = 7
+
+        limiter._incr_with_ttl("playground:ip:abc", 86400)
+
+        mock_redis.ttl.assert_not_called()
+        mock_redis.expire.assert_not_called()
+
+    def test_set_indexed_repo_restores_missing_ttl(self, limiter, mock_redis):
+        """HSET on an expired session should not leave a TTL-less key."""
+        mock_redis.ttl.return_value = -1
+
+        limiter.set_indexed_repo("token", {"repo_id": "abc"})
+
+        mock_redis.expire.assert_called_with("playground:session:token", 86400)
+
 
 # =============================================================================
 # INTEGRATION-STYLE TESTS
@@ -0,0 +1,71 @@
+"""
+Tests for RepoValidator (Issue #94).
+Covers the directory walk used to count code files before indexing.
+"""
+import os
+import pytest
+
+from services.repo_validator import RepoValidator
+
+
+@pytest.fixture
+def validator():
+    return RepoValidator()
+
+
+@pytest.fixture
+def repo_tree(tmp_path):
+    """Small repo with code, non-code, and skipped directories."""
+    (tmp_path / "src" / "pkg").mkdir(parents=True)
+    (tmp_path / "src" / "app.py").write_text("def main():\n    pass\n")
+    (tmp_path / "src" / "pkg" / "util.TS").write_text("function f() {}\n")
+    (tmp_path / "README.md").write_text("# readme\n")
+    (tmp_path / "node_modules" / "dep").mkdir(parents=True)
+    (tmp_path / "node_modules" / "dep" / "index.js").write_text("function x() {}\n")
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".git" / "hook.py").write_text("def hook(): pass\n")
+    return tmp_path
+
+
+class TestFindCodeFiles:
+    """Tests for _find_code_files()."""
+
+    def test_counts_code_files_only(self, validator, repo_tree):
+        files, error = validator._find_code_files(str(repo_tree))
+
+        assert error is None
+        names = sorted(f.name for f in files)
+        assert names == ["app.py", "util.TS"]
+
+    def test_prunes_skip_dirs(self, validator, repo_tree):
+        files, _ = validator._find_code_files(str(repo_tree))
+
+        assert not any("node_modules" in f.parts or ".git" in f.parts for f in files)
+
+    def test_skips_symlinks(self, validator, repo_tree, tmp_path_factory):
+        outside = tmp_path_factory.mktemp("outside")
+        (outside / "secret.py").write_text("def leak(): pass\n")
+        os.symlink(outside, repo_tree / "linked_dir")
+        os.symlink(outside / "secret.py", repo_tree / "linked.py")
+
+        files, _ = validator._find_code_files(str(repo_tree))
+
+        assert all("secret" not in f.name and "linked" not in f.name for f in files)
+
+
+class TestAnalyzeRepo:
+    """Tests for analyze_repo()."""
+
+    def test_small_repo_estimate(self, validator, repo_tree):
+        analysis = validator.analyze_repo(str(repo_tree))
+
+        assert analysis.success
+        assert analysis.file_count == 2
+        assert analysis.estimated_functions == 2 * RepoValidator.AVG_FUNCTIONS_PER_FILE
+        assert analysis.sampled is False
+
+    def test_missing_path_fails_closed(self, validator, tmp_path):
+        analysis = validator.analyze_repo(str(tmp_path / "missing"))
+
+        assert not analysis.success
+        assert analysis.file_count == 0
@@ -0,0 +1,77 @@
+"""
+Tests for SearchEnhancer keyword scoring and reranking.
+"""
+import pytest
+from unittest.mock import MagicMock
+
+from services.search_enhancer import SearchEnhancer
+
+
+@pytest.fixture
+def enhancer():
+    return SearchEnhancer(MagicMock())
+
+
+class TestKeywordScore:
+
+    @pytest.mark.parametrize("query,code,name,expected", [
+        ("auth", "def login(): pass", "authenticate", 0.3),
+        ("token", "token = 1", "parse", 0.1),
+        ("token user", "token = user", "parse", 0.2),
+        ("token user session jwt", "token user session jwt", "parse", 0.3),
+        ("missing", "def f(): pass", "f", 0.0),
+        ("", "anything", "name", 0.0),
+    ])
+    def test_scores(self, enhancer, query, code, name, expected):
+        assert enhancer.compute_keyword_score(query, code, name) == pytest.approx(expected)
+
+    def test_case_insensitive(self, enhancer):
+        assert enhancer.compute_keyword_score("Token", "TOKEN = 1", "x") == pytest.approx(0.1)
+
+
+class TestRerank:
+
+    def test_keyword_match_lifts_result(self, enhancer):
+        results = [
+            {"name": "render", "code": "def render(): pass", "score": 0.80},
+            {"name": "verify_token", "code": "def verify_token(): pass", "score": 0.75},
+        ]
+
+        reranked = enhancer.rerank_results("token", results)
+
+        assert [r["name"] for r in reranked] == ["verify_token", "render"]
+        assert reranked[0]["keyword_boost"] == pytest.approx(0.3)
+        assert reranked[0]["semantic_score"] == 0.75
+
+    def test_boost_disabled_returns_input(self, enhancer):
+        results = [{"name": "a", "score": 0.1}]
+        assert enhancer.rerank_results("a", results, boost_keyword_matches=False) is results
+
+
+class TestRichEmbeddingText:
+
+    def test_calls_in_source_order(self, enhancer):
+        code = "def f(x):\n    y = parse(x)\n    if check(y):\n        log(y)\n    return parse(y)\n"
+
+        assert enhancer.extract_imports_used(code, "python") == ["f", "parse", "check", "log"]
+
+    def test_calls_capped(self, enhancer):
+        code = "\n".join(f"call_{i}()" for i in range(40))
+
+        assert enhancer.extract_imports_used(code, "python") == [f"call_{i}" for i in range(15)]
+
+    def test_rich_text_fields(self, enhancer):
+        text = enhancer.create_rich_embedding_text({
+            "name": "load",
+            "type": "function_definition",
+            "file_path": "/repo/pkg/io.py",
+            "language": "python",
+            "code": 'def load(path: str, mode="r") -> bytes:\n    """Read a file."""\n    return read(path)\n',
+        })
+
+        assert "# Function Definition: load" in text
+        assert "# File: pkg/io.py" in text
+        assert "# Purpose: Read a file." in text
+        assert "# Parameters: path, mode" in text
+        assert "# Returns: bytes" in text
+        assert "# Uses: load, read" in text
@@ -0,0 +1,43 @@
+"""
+Tests for UserLimitsService usage summary caching.
+"""
+import pytest
+from unittest.mock import MagicMock, patch
+
+from services.user_limits import UserLimitsService
+
+
+@pytest.fixture
+def service():
+    supabase = MagicMock()
+    supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = \
+        MagicMock(data=[{"tier": "pro"}], count=2)
+    return UserLimitsService(supabase, redis_client=None)
+
+
+class TestUsageSummaryCache:
+    """Tests for the in-process usage summary cache."""
+
+    def test_repeated_calls_hit_cache(self, service):
+        first = service.get_usage_summary("user-1")
+        second = service.get_usage_summary("user-1")
+
+        assert first is second
+        assert first["tier"] == "pro"
+        # tier lookup + repo count, once
+        assert service.supabase.table.call_count == 2
+
+    def test_cache_expires(self, service):
+        with patch("services.user_limits.time.monotonic", return_value=1000.0):
+            service.get_usage_summary("user-1")
+        with patch("services.user_limits.time.monotonic", return_value=1000.0 + service.USAGE_CACHE_TTL_SECONDS + 1):
+            service.get_usage_summary("user-1")
+
+        assert service.supabase.table.call_count == 4
+
+    def test_invalidate_usage_cache(self, service):
+        service.get_usage_summary("user-1")
+        service.invalidate_usage_cache("user-1")
+        service.get_usage_summary("user-1")
+
+        assert service.supabase.table.call_count == 4
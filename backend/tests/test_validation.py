@@ -409,6 +409,14 @@ class TestStringSanitization:
         sanitized = InputValidator.sanitize_string("test\x01\x02\x03data")
         assert '\x01' not in sanitized
     
+    def test_keeps_newlines_and_tabs(self):
+        """Test newline/tab survive while other controls are dropped"""
+        assert InputValidator.sanitize_string("a\tb\nc\rd\x7f") == "a\tb\ncd"
+    
+    def test_non_ascii_non_printable_removed(self):
+        """Test Unicode controls are removed but printable Unicode is kept"""
+        assert InputValidator.sanitize_string("caf\u00e9\u202e\x85 \u00fcber") == "caf\u00e9 \u00fcber"
+    
     def test_length_limiting(self):
         """Test length limiting works"""
         long_string = "a" * 1000